@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : BenchmarkUtil.py
+@Author: SangYu
+@Date  : 2019/5/15 10:05
+@Desc  : 基准测试工具：计时、百分位统计、结果保存与回归比较
+"""
+import gc
+import json
+import os
+import platform
+import time
+
+# 基准测试结果目录
+result_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "result")
+
+
+# 计算百分位数（最近秩法）
+def percentile(sorted_values: list, percent: float) -> float:
+    """
+    计算百分位数（最近秩法）
+    :param sorted_values: 已排序的数值列表
+    :param percent: 百分位，如99
+    :return: 百分位数
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-len(sorted_values) * percent // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# 统计单次调用耗时列表
+def summarize_latency(latency_list: list, total_time: float = None) -> dict:
+    """
+    统计单次调用耗时
+    :param latency_list: 单次调用耗时列表(s)
+    :param total_time: 总耗时(s)，为None时取单次耗时之和
+    :return: {"count", "throughput", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}
+    """
+    sorted_latency = sorted(latency_list)
+    count = len(sorted_latency)
+    if total_time is None:
+        total_time = sum(sorted_latency)
+    if count == 0:
+        return {"count": 0}
+    return {"count": count,
+            "throughput": count / total_time if total_time > 0 else 0.0,
+            "mean_ms": sum(sorted_latency) * 1000 / count,
+            "p50_ms": percentile(sorted_latency, 50) * 1000,
+            "p95_ms": percentile(sorted_latency, 95) * 1000,
+            "p99_ms": percentile(sorted_latency, 99) * 1000,
+            "max_ms": sorted_latency[-1] * 1000}
+
+
+# 运行一项基准测试
+def run_benchmark(func, inputs: list, repeat: int = 5, warmup: int = 1) -> dict:
+    """
+    运行一项基准测试：依次以inputs中的每个输入调用func，共repeat轮，记录每次调用的耗时
+    测试期间关闭垃圾回收，减少抖动
+    :param func: 被测函数，接受一个输入参数
+    :param inputs: 输入列表
+    :param repeat: 计时轮数
+    :param warmup: 预热轮数（不计时）
+    :return: 耗时统计
+    """
+    for i_round in range(warmup):
+        for item in inputs:
+            func(item)
+    latency_list = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start_time = time.perf_counter()
+        for i_round in range(repeat):
+            for item in inputs:
+                call_start = time.perf_counter()
+                func(item)
+                latency_list.append(time.perf_counter() - call_start)
+        total_time = time.perf_counter() - start_time
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return summarize_latency(latency_list, total_time)
+
+
+# 保存基准测试结果
+def save_benchmark_result(results: dict, file_path: str = None) -> str:
+    """
+    保存基准测试结果为json（附带运行环境信息）
+    :param results: 测试项名 -> 耗时统计
+    :param file_path: 输出路径，为None时按时间命名保存到result目录
+    :return: 输出路径
+    """
+    if file_path is None:
+        os.makedirs(result_dir, exist_ok=True)
+        file_path = os.path.join(result_dir, "benchmark_%s.json" % time.strftime("%Y%m%d_%H%M%S"))
+    record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "results": results}
+    with open(file_path, "w", encoding="utf-8") as f_result:
+        json.dump(record, f_result, ensure_ascii=False, indent=2)
+    return file_path
+
+
+# 与历史结果比较，找出性能回退的测试项
+def compare_benchmark_result(baseline_path: str, results: dict, key: str = "p95_ms", threshold: float = 0.1) -> list:
+    """
+    与历史结果比较，找出性能回退的测试项
+    :param baseline_path: 历史结果json路径
+    :param results: 本次测试结果
+    :param key: 比较的统计量
+    :param threshold: 允许的相对增幅，超过即视为回退
+    :return: [(测试项名, 历史值, 本次值, 相对变化)]
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f_baseline:
+        baseline = json.load(f_baseline)["results"]
+    regression_list = []
+    for name, stats in results.items():
+        if name not in baseline or key not in stats or key not in baseline[name]:
+            continue
+        old_value = baseline[name][key]
+        new_value = stats[key]
+        if old_value > 0 and (new_value - old_value) / old_value > threshold:
+            regression_list.append((name, old_value, new_value, (new_value - old_value) / old_value))
+    return regression_list
+
+
+# 输出基准测试结果表
+def print_benchmark_result(results: dict):
+    print("%-28s%10s%14s%10s%10s%10s" % ("测试项", "次数", "吞吐(次/s)", "p50(ms)", "p95(ms)", "p99(ms)"))
+    for name, stats in results.items():
+        if "skipped" in stats:
+            print("%-28s跳过：%s" % (name, stats["skipped"]))
+        elif stats.get("count"):
+            print("%-28s%10d%14.1f%10.3f%10.3f%10.3f" % (name, stats["count"], stats["throughput"],
+                                                       stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]))
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : MacroBenchmark.py
+@Author: SangYu
+@Date  : 2019/5/15 16:30
+@Desc  : 端到端基准测试：使用常问问题集对模板问答进行测试，记录吞吐量与延迟分布
+"""
+import csv
+import os
+import time
+
+from Benchmark.BenchmarkUtil import summarize_latency, save_benchmark_result, print_benchmark_result
+from Benchmark.MemoryBackend import use_memory_backend
+from FileRead.FileNameRead import read_all_file_list
+from Log.Logger import MyLog
+from Monitor.Tracer import set_tracing, reset_trace, get_trace_stats
+
+# 常问问题集（预处理后的csv）目录
+frequent_question_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     "InformationGet", "Information", "大学", "常问问题集", "预处理")
+# 预处理后的常问问题集文件名后缀
+frequent_question_suffix = "常用问题集(预处理).csv"
+
+
+# 读取常问问题集中的问题
+def load_frequent_questions(dir_path: str = frequent_question_dir, limit_per_school: int = 0) -> list:
+    """
+    读取常问问题集中的问题（按文件名排序，保证多次测试顺序一致）
+    :param dir_path: 常问问题集目录
+    :param limit_per_school: 每个学校最多读取的问题数，0表示不限制
+    :return: [(学校名, 问题)]
+    """
+    question_list = []
+    for file in sorted(read_all_file_list(dir_path)):
+        school_name = os.path.basename(file)
+        if not school_name.endswith(frequent_question_suffix):
+            continue
+        school_name = school_name[:-len(frequent_question_suffix)]
+        with open(file, "r", encoding="utf-8") as csvfile:
+            csv_reader = csv.reader(csvfile)
+            # 跳过表头
+            next(csv_reader, None)
+            school_count = 0
+            for row in csv_reader:
+                if len(row) != 5:
+                    continue
+                question_list.append((school_name, row[3]))
+                school_count += 1
+                if limit_per_school and school_count >= limit_per_school:
+                    break
+    return question_list
+
+
+# 问答结果分类
+def answer_category(answer: list) -> str:
+    if answer == ["问句条件词为空，无法构建查询语句！"]:
+        return "mysql_string_null"
+    elif answer == ["问句条件词只有学校，查询过宽！"]:
+        return "mysql_string_only_school"
+    elif answer == ["查询结果为空！"]:
+        return "answer_null"
+    return "answer_not_null"
+
+
+# 运行端到端基准测试
+def run_macro_benchmark(limit_per_school: int = 50, repeat: int = 1, memory_backend: bool = True,
+                        trace: bool = True) -> dict:
+    """
+    使用常问问题集运行端到端基准测试
+    :param limit_per_school: 每个学校最多测试的问题数，0表示不限制
+    :param repeat: 测试轮数
+    :param memory_backend: 是否使用内存数据库代替MySQL
+    :param trace: 是否记录各阶段耗时
+    :return: 测试项名 -> 耗时统计（端到端测试结果附带问答结果分类计数与各阶段耗时）
+    """
+    from QuestionAnswer.TemplateAnswerQuestion import answer_question_by_template
+    if memory_backend:
+        use_memory_backend()
+    question_list = load_frequent_questions(limit_per_school=limit_per_school)
+    if not question_list:
+        return {"end_to_end": {"skipped": "常问问题集为空"}}
+    set_tracing(trace)
+    reset_trace()
+    category_count = {}
+    latency_list = []
+    start_time = time.perf_counter()
+    for i_round in range(repeat):
+        for school_name, question in question_list:
+            call_start = time.perf_counter()
+            mid_result, answer = answer_question_by_template(question, 1, school_name)
+            latency_list.append(time.perf_counter() - call_start)
+            category = answer_category(answer)
+            category_count[category] = category_count.get(category, 0) + 1
+    total_time = time.perf_counter() - start_time
+    result = summarize_latency(latency_list, total_time)
+    result["categories"] = category_count
+    if trace:
+        result["stages"] = get_trace_stats()
+        set_tracing(False)
+    return {"end_to_end": result}
+
+
+if __name__ == '__main__':
+    main_logger = MyLog(logger=__name__).getlog()
+    main_logger.info("start...")
+    # 模板路径等相对路径以QuestionAnalysis等同级目录为基准
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    macro_results = run_macro_benchmark()
+    print_benchmark_result(macro_results)
+    main_logger.info("结果已保存至%s", save_benchmark_result({"macro." + name: stats
+                                                             for name, stats in macro_results.items()}))
+    main_logger.info("end...")
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : MemoryBackend.py
+@Author: SangYu
+@Date  : 2019/5/15 10:40
+@Desc  : 基准测试使用的内存数据库（sqlite），表结构与MySQL中的招生计划、录取分数表一致
+"""
+import random
+import sqlite3
+import threading
+
+from InformationGet.MysqlOperation import set_connection_factory
+
+# 生成数据使用的学校、省份、专业、类别
+school_list = ["北京大学", "北京大学医学部", "清华大学", "复旦大学", "复旦大学上海医学部", "上海交通大学",
+               "上海交通大学医学部", "浙江大学", "南京大学", "中国科学技术大学", "哈尔滨工业大学", "西安交通大学"]
+district_list = ["北京", "天津", "河北", "山西", "内蒙古", "辽宁", "吉林", "黑龙江", "上海", "江苏", "浙江", "安徽",
+                 "福建", "江西", "山东", "河南", "湖北", "湖南", "广东", "广西", "海南", "重庆", "四川", "贵州",
+                 "云南", "陕西", "甘肃", "青海", "宁夏", "新疆"]
+major_list = ["软件工程", "计算机科学与技术", "电子信息工程", "机械工程", "土木工程", "临床医学", "数学与应用数学",
+              "物理学", "化学", "经济学", "法学", "汉语言文学"]
+classy_list = ["理工", "文史"]
+year_list = [2014, 2015, 2016, 2017, 2018]
+
+# noinspection SqlResolve,SqlNoDataSourceInspection
+create_table_sql = [
+    "CREATE TABLE admission_plan("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, school VARCHAR(30), district VARCHAR(10), year INT,"
+    "major VARCHAR(100), classy varchar(10), numbers varchar(10))",
+    "CREATE TABLE admission_score_pro("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, school VARCHAR(30), year INT, district VARCHAR(10),"
+    "batch varchar(30), classy varchar(10), line varchar(30))",
+    "CREATE TABLE admission_score_major("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, school VARCHAR(30), district VARCHAR(10), year INT,"
+    "major VARCHAR(100), classy varchar(30), highest varchar(10) NULL, average varchar(10) NULL,"
+    "lowest varchar(10), amount varchar(10) NULL)",
+]
+
+
+class MemoryDatabase:
+    """
+    内存数据库，所有连接共享同一个sqlite连接（只读查询，使用锁保证线程安全）
+    """
+
+    def __init__(self, seed: int = 0):
+        """
+        :param seed: 生成数据的随机种子，相同种子生成相同数据，保证多次测试结果可比
+        """
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.lock = threading.Lock()
+        cursor = self.connection.cursor()
+        for sql in create_table_sql:
+            cursor.execute(sql)
+        self.fill_data(random.Random(seed))
+        self.connection.commit()
+
+    # noinspection SqlResolve,SqlNoDataSourceInspection
+    def fill_data(self, rand: random.Random):
+        """
+        按学校、省份、年份、专业、类别生成数据
+        :param rand: 随机数生成器
+        :return:
+        """
+        plan_rows = []
+        score_pro_rows = []
+        score_major_rows = []
+        for school in school_list:
+            for district in district_list:
+                for year in year_list:
+                    for classy in classy_list:
+                        line = rand.randint(600, 700)
+                        score_pro_rows.append((school, year, district, "本科一批", classy, str(line)))
+                        for major in rand.sample(major_list, 4):
+                            plan_rows.append((school, district, year, major, classy, str(rand.randint(1, 20))))
+                            lowest = line + rand.randint(0, 10)
+                            score_major_rows.append((school, district, year, major, classy, str(lowest + 15),
+                                                     str(lowest + 5), str(lowest), str(rand.randint(1, 20))))
+        cursor = self.connection.cursor()
+        cursor.executemany("insert into admission_plan(school, district, year, major, classy, numbers) "
+                           "values (?, ?, ?, ?, ?, ?)", plan_rows)
+        cursor.executemany("insert into admission_score_pro(school, year, district, batch, classy, line) "
+                           "values (?, ?, ?, ?, ?, ?)", score_pro_rows)
+        cursor.executemany("insert into admission_score_major(school, district, year, major, classy, highest, "
+                           "average, lowest, amount) values (?, ?, ?, ?, ?, ?, ?, ?, ?)", score_major_rows)
+
+    def connect(self, db_name: str):
+        """
+        连接工厂，返回共享连接的包装
+        :param db_name: 数据库名（忽略）
+        :return: 数据库连接
+        """
+        return MemoryConnection(self)
+
+
+class MemoryConnection:
+    """
+    内存数据库连接，提供MysqlOperation中使用到的cursor()/commit()接口
+    """
+
+    def __init__(self, database: MemoryDatabase):
+        self.database = database
+
+    def cursor(self):
+        return MemoryCursor(self.database)
+
+    def commit(self):
+        with self.database.lock:
+            self.database.connection.commit()
+
+    def close(self):
+        pass
+
+
+class MemoryCursor:
+    """
+    内存数据库游标，执行时持有数据库锁并一次取出结果
+    """
+
+    def __init__(self, database: MemoryDatabase):
+        self.database = database
+        self.description = None
+        self.rows = []
+        # 下一条未读取记录的位置（分批读取时不复制、不移动剩余记录）
+        self.position = 0
+        self.rowcount = -1
+
+    def execute(self, sql: str, params=()):
+        # MySQL的占位符为%s，sqlite为?
+        sql = sql.replace("%s", "?")
+        with self.database.lock:
+            cursor = self.database.connection.cursor()
+            cursor.execute(sql, params)
+            self.description = cursor.description
+            self.rows = cursor.fetchall()
+            self.position = 0
+            self.rowcount = cursor.rowcount
+
+    def executemany(self, sql: str, seq_params):
+        sql = sql.replace("%s", "?")
+        with self.database.lock:
+            cursor = self.database.connection.cursor()
+            cursor.executemany(sql, seq_params)
+            self.rowcount = cursor.rowcount
+
+    def fetchall(self) -> list:
+        rows = self.rows[self.position:] if self.position else self.rows
+        self.rows = []
+        self.position = 0
+        return rows
+
+    def fetchmany(self, size: int = 1) -> list:
+        rows = self.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+    def fetchone(self):
+        if self.position < len(self.rows):
+            self.position += 1
+            return self.rows[self.position - 1]
+        return None
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+
+# 使用内存数据库替换MySQL连接
+def use_memory_backend(seed: int = 0) -> MemoryDatabase:
+    """
+    使用内存数据库替换MySQL连接（之后mysql_query_sentence等函数均查询内存数据库）
+    :param seed: 生成数据的随机种子
+    :return: 内存数据库
+    """
+    database = MemoryDatabase(seed)
+    set_connection_factory(database.connect)
+    return database
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : MicroBenchmark.py
+@Author: SangYu
+@Date  : 2019/5/15 14:12
+@Desc  : 问答流程各环节的微基准测试（模板匹配、编辑距离、关键词规范化、地点/时间识别、SQL构造、答句构造）
+"""
+import os
+import sys
+
+from Benchmark.BenchmarkUtil import run_benchmark, save_benchmark_result, print_benchmark_result
+from Log.Logger import MyLog
+
+# 测试问句（覆盖招生计划、录取分数两类问题）
+sample_questions = ["哈工大2015年软件工程在河南招多少人？",
+                    "清华大学去年在北京的录取分数线是多少？",
+                    "北大前年临床医学在山东招生人数？",
+                    "浙江大学2017年计算机科学与技术理科录取分数是多少？",
+                    "复旦大学今年在上海招生计划",
+                    "南京大学16年法学文科在江苏的最低分？"]
+# 抽象问句
+sample_ab_questions = ["学校年份专业在省份招多少人？",
+                       "学校年份在省份的录取分数线是多少？",
+                       "学校年份专业在省份招生人数？",
+                       "学校年份专业类别录取分数是多少？",
+                       "学校年份在省份招生计划",
+                       "学校年份专业类别在省份的最低分？"]
+# 关键词
+sample_keywords = [{"search_year": "2015年", "search_school": "哈工大", "search_major": "软件工程",
+                    "search_district": "河南", "search_classy": "", "search_batch": "",
+                    "search_table": "admission_plan"},
+                   {"search_year": "去年", "search_school": "清华大学", "search_major": "",
+                    "search_district": "北京", "search_classy": "", "search_batch": "",
+                    "search_table": "admission_score"},
+                   {"search_year": "16年", "search_school": "南大", "search_major": "法学",
+                    "search_district": "江苏", "search_classy": "文史", "search_batch": "",
+                    "search_table": "admission_score"}]
+# 规范化后的关键词
+sample_keywords_normalize = [{"search_year": "2015", "search_school": "哈尔滨工业大学", "search_major": "软件工程",
+                              "search_district": "河南", "search_classy": "", "search_batch": "",
+                              "search_table": "admission_plan"},
+                             {"search_year": "2017", "search_school": "浙江大学",
+                              "search_major": "计算机科学与技术", "search_district": "浙江", "search_classy": "理工",
+                              "search_batch": "", "search_table": "admission_score_major"}]
+# 模板问句、模板答句与查询结果
+sample_template_questions = ["(school)(year)(major)(district)(classy)招生人数是多少？",
+                             "(school)(year)(major)在(district)招多少人？",
+                             "(school)(year)(major)(classy)录取分数是多少？"]
+sample_answer_template = "(school)(year)年(major)专业在(district)的(classy)类招生人数为(numbers)人。"
+sample_result_items = [{"id": i_item, "school": "哈尔滨工业大学", "district": "河南", "year": 2015,
+                        "major": "软件工程", "classy": "理工", "numbers": str(i_item % 20 + 1)}
+                       for i_item in range(20)]
+
+
+# 构造编辑距离的备选句子（模板文件不存在时使用）
+def build_candidate_sentences() -> list:
+    subjects = ["学校", "学校年份", "学校年份专业", "学校专业", "学校年份专业类别", "学校年份类别"]
+    places = ["", "在省份", "省份"]
+    targets = ["招多少人？", "招生人数是多少？", "招生计划", "录取分数是多少？", "录取分数线是多少？", "的最低分？",
+               "的最高分？", "的平均分？", "录取人数是多少？"]
+    return [subject + place + target for subject in subjects for place in places for target in targets]
+
+
+# 加载模板问句（替换模板词后的句子），模板文件不存在时使用构造的备选句子
+def load_template_sentences(template_sentence_type: str = "admission_plan") -> list:
+    template_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "TemplateLoad", "Template", template_sentence_type)
+    if not os.path.exists(template_path):
+        return build_candidate_sentences()
+    from TemplateLoad.QuestionTemplate import load_template_by_file
+    fq_condition, fq_target, ts_answers, ts_questions = load_template_by_file(template_path)
+    temp_sentence = []
+    for sentence in ts_questions:
+        for fqc in fq_condition:
+            key_en, key_ch = fqc.split(" ")[:2]
+            sentence = sentence.replace("(" + key_en + ")", key_ch).split("--")[0]
+        temp_sentence.append(sentence)
+    return temp_sentence
+
+
+def case_template_match():
+    from QuestionAnalysis.QuestionPretreatment import find_question_match_template
+    return lambda ab_question: find_question_match_template(ab_question, "admission_plan"), sample_ab_questions
+
+
+def case_edit_distance():
+    from SimilarityCalculate.SentenceSimilartity import edit_distance
+    sentences = load_template_sentences()
+    return lambda ab_question: edit_distance(ab_question, sentences), sample_ab_questions
+
+
+def case_ngram_index_search():
+    from SimilarityCalculate.SentenceSimilartity import NGramIndex
+    template_index = NGramIndex(load_template_sentences())
+    return lambda ab_question: template_index.search(ab_question, 1), sample_ab_questions
+
+
+def case_keyword_normalize():
+    from QuestionAnalysis.QuestionPretreatment import question_keyword_normalize
+    return question_keyword_normalize, sample_keywords
+
+
+def case_location_ner():
+    from QuestionAnalysis.LocationNER import text_to_location
+    return text_to_location, sample_questions
+
+
+def case_province_normalize():
+    from QuestionAnalysis.LocationNER import province_normalize
+    return province_normalize, ["河南", "北京市", "石家庄", "哈尔滨", "江苏省"]
+
+
+def case_time_ner():
+    from QuestionAnalysis.TimeNER import text_to_year
+    return text_to_year, sample_questions
+
+
+def case_year_normalize():
+    from QuestionAnalysis.TimeNER import year_normalize
+    return year_normalize, ["2015年", "15年", "二零一五年", "一五年", "2019"]
+
+
+def case_sql_build():
+    from TemplateLoad.QuestionTemplate import build_mysql_string_by_template_and_keymap
+    inputs = [(template, keyword) for template in sample_template_questions for keyword in sample_keywords_normalize]
+    return (lambda item: build_mysql_string_by_template_and_keymap(item[0], item[1]["search_table"], item[1]),
+            inputs)
+
+
+def case_answer_render():
+    from TemplateLoad.QuestionTemplate import build_mysql_answer_string_by_template
+    return lambda item: build_mysql_answer_string_by_template(sample_answer_template, item), sample_result_items
+
+
+# 微基准测试项：测试项名 -> 构造函数（返回被测函数与输入列表）
+micro_benchmark_cases = {
+    "template_match": case_template_match,
+    "edit_distance": case_edit_distance,
+    "ngram_index_search": case_ngram_index_search,
+    "keyword_normalize": case_keyword_normalize,
+    "location_ner": case_location_ner,
+    "province_normalize": case_province_normalize,
+    "time_ner": case_time_ner,
+    "year_normalize": case_year_normalize,
+    "sql_build": case_sql_build,
+    "answer_render": case_answer_render,
+}
+
+
+# 运行微基准测试
+def run_micro_benchmark(case_names: list = None, repeat: int = 20, warmup: int = 2) -> dict:
+    """
+    运行微基准测试，依赖缺失（如未安装pyhanlp、distance或模板文件不存在）的测试项记为跳过
+    :param case_names: 测试项名列表，为None时运行全部
+    :param repeat: 计时轮数
+    :param warmup: 预热轮数
+    :return: 测试项名 -> 耗时统计
+    """
+    results = {}
+    for name in case_names or list(micro_benchmark_cases):
+        try:
+            func, inputs = micro_benchmark_cases[name]()
+            results[name] = run_benchmark(func, inputs, repeat, warmup)
+        except (ImportError, OSError) as e:
+            results[name] = {"skipped": "%s: %s" % (type(e).__name__, e)}
+    return results
+
+
+if __name__ == '__main__':
+    main_logger = MyLog(logger=__name__).getlog()
+    main_logger.info("start...")
+    # 模板路径等相对路径以QuestionAnalysis等同级目录为基准
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    micro_results = run_micro_benchmark(sys.argv[1:] or None)
+    print_benchmark_result(micro_results)
+    main_logger.info("结果已保存至%s", save_benchmark_result({"micro." + name: stats
+                                                             for name, stats in micro_results.items()}))
+    main_logger.info("end...")
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : RunBenchmark.py
+@Author: SangYu
+@Date  : 2019/5/15 17:20
+@Desc  : 运行全部基准测试，保存结果并与历史结果比较
+用法：python RunBenchmark.py [历史结果json路径]
+"""
+import os
+import sys
+
+from Benchmark.BenchmarkUtil import save_benchmark_result, compare_benchmark_result, print_benchmark_result
+from Benchmark.MicroBenchmark import run_micro_benchmark
+from Benchmark.MacroBenchmark import run_macro_benchmark
+from Log.Logger import MyLog, get_logger
+
+
+# 运行全部基准测试
+def run_all_benchmark(baseline_path: str = None) -> tuple:
+    """
+    运行全部基准测试（微基准与端到端），保存结果，并与历史结果比较
+    :param baseline_path: 历史结果json路径，为None时不比较
+    :return: 结果保存路径，性能回退的测试项列表
+    """
+    function_logger = get_logger("run_all_benchmark")
+    results = {}
+    function_logger.info("开始运行微基准测试...")
+    for name, stats in run_micro_benchmark().items():
+        results["micro." + name] = stats
+    function_logger.info("开始运行端到端基准测试...")
+    for name, stats in run_macro_benchmark().items():
+        results["macro." + name] = stats
+    print_benchmark_result(results)
+    result_path = save_benchmark_result(results)
+    function_logger.info("结果已保存至%s", result_path)
+    regression_list = []
+    if baseline_path:
+        regression_list = compare_benchmark_result(baseline_path, results)
+        for name, old_value, new_value, change in regression_list:
+            function_logger.warning("%s性能回退：p95 %.3fms -> %.3fms(+%.1f%%)", name, old_value, new_value,
+                                    change * 100)
+    return result_path, regression_list
+
+
+if __name__ == '__main__':
+    main_logger = MyLog(logger=__name__).getlog()
+    main_logger.info("start...")
+    # 模板路径等相对路径以QuestionAnalysis等同级目录为基准
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    run_all_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
+    main_logger.info("end...")
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : ColumnarRead.py
+@Author: SangYu
+@Date  : 2019/5/19 15:20
+@Desc  : 列存文件的写入与读取：每个字符串列存为偏移数组（uint64，行数+1个）与utf-8内容块，
+读取时使用mmap，可按行迭代或随机访问某行某列，不需要将整个文件读入内存
+文件格式：魔数(8字节) | 文件头长度(uint32) | 文件头(json) | 补齐到8字节 | 各列偏移数组 | 各列内容块
+"""
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+# 文件魔数
+columnar_magic = b"QACOL\x001\x00"
+
+
+class ColumnarWriter:
+    """
+    列存文件写入（流式）：各列内容先写入临时文件，偏移保存在内存中（每行每列8字节），关闭时合并为列存文件
+    用法：
+    with ColumnarWriter(file_path, ["question", "answer"]) as writer:
+        writer.append(["问题", "回答"])
+    """
+
+    def __init__(self, file_path: str, column_names: list):
+        """
+        :param file_path: 列存文件路径
+        :param column_names: 列名列表
+        """
+        self.file_path = file_path
+        self.column_names = list(column_names)
+        self.row_count = 0
+        self.offsets = [array("Q", [0]) for _ in self.column_names]
+        self.temp_dir = tempfile.mkdtemp(prefix="columnar_", dir=os.path.dirname(os.path.abspath(file_path)))
+        self.blob_files = [open(os.path.join(self.temp_dir, str(i_column)), "wb")
+                           for i_column in range(len(self.column_names))]
+
+    def append(self, row):
+        """
+        写入一行
+        :param row: 各列的值（字符串，顺序与列名一致）
+        :return:
+        """
+        if len(row) != len(self.column_names):
+            raise ValueError("行的列数为%d，应为%d" % (len(row), len(self.column_names)))
+        for i_column, value in enumerate(row):
+            data = value.encode("utf-8")
+            self.blob_files[i_column].write(data)
+            column_offsets = self.offsets[i_column]
+            column_offsets.append(column_offsets[-1] + len(data))
+        self.row_count += 1
+
+    def close(self):
+        """
+        合并为列存文件（先写临时文件再替换）并删除临时文件
+        :return:
+        """
+        try:
+            for blob_file in self.blob_files:
+                blob_file.close()
+            columns = []
+            # 先以占位值计算文件头长度，再计算各段位置
+            header = {"rows": self.row_count, "byteorder": sys.byteorder, "columns": columns}
+            for name in self.column_names:
+                columns.append({"name": name, "offsets_pos": 0, "blob_pos": 0, "blob_len": 0})
+            header_size = len(json.dumps(header, ensure_ascii=False).encode("utf-8")) + 64 * len(columns)
+            position = align8(len(columnar_magic) + 4 + header_size)
+            for column, column_offsets in zip(columns, self.offsets):
+                column["offsets_pos"] = position
+                position += column_offsets.itemsize * len(column_offsets)
+            for column, column_offsets in zip(columns, self.offsets):
+                column["blob_pos"] = position
+                column["blob_len"] = column_offsets[-1]
+                position += column_offsets[-1]
+            header_data = json.dumps(header, ensure_ascii=False).encode("utf-8")
+            header_data += b" " * (header_size - len(header_data))
+            temp_path = self.file_path + ".tmp"
+            with open(temp_path, "wb") as file:
+                file.write(columnar_magic)
+                file.write(struct.pack("<I", header_size))
+                file.write(header_data)
+                file.write(b"\x00" * (align8(file.tell()) - file.tell()))
+                for column_offsets in self.offsets:
+                    column_offsets.tofile(file)
+                for i_column in range(len(self.column_names)):
+                    with open(os.path.join(self.temp_dir, str(i_column)), "rb") as blob_file:
+                        shutil.copyfileobj(blob_file, file, 1 << 20)
+            os.replace(temp_path, self.file_path)
+        finally:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for blob_file in self.blob_files:
+                blob_file.close()
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        return False
+
+
+# 按8字节对齐
+def align8(position: int) -> int:
+    return (position + 7) & ~7
+
+
+class ColumnarReader:
+    """
+    列存文件读取（mmap）：
+    len(reader)为行数，reader.get(i, "question")读取一个值，reader.row(i)读取一行（字典），
+    reader.column("question")迭代一列，for row in reader迭代所有行
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.file = open(file_path, "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mmap[:len(columnar_magic)] != columnar_magic:
+            self.close()
+            raise ValueError("%s不是列存文件" % file_path)
+        header_size = struct.unpack_from("<I", self.mmap, len(columnar_magic))[0]
+        header_start = len(columnar_magic) + 4
+        header = json.loads(self.mmap[header_start:header_start + header_size].decode("utf-8"))
+        self.row_count = header["rows"]
+        self.column_names = [column["name"] for column in header["columns"]]
+        self.column_index = {name: i_column for i_column, name in enumerate(self.column_names)}
+        self.blob_pos = [column["blob_pos"] for column in header["columns"]]
+        self.offsets = []
+        for column in header["columns"]:
+            offsets_view = memoryview(self.mmap)[column["offsets_pos"]:column["offsets_pos"] + 8 * (self.row_count + 1)]
+            if header["byteorder"] == sys.byteorder:
+                self.offsets.append(offsets_view.cast("Q"))
+            else:
+                # 字节序不同时复制并转换（只有偏移数组，内容块不需要）
+                column_offsets = array("Q", offsets_view.tobytes())
+                column_offsets.byteswap()
+                offsets_view.release()
+                self.offsets.append(column_offsets)
+
+    def __len__(self):
+        return self.row_count
+
+    def get(self, i_row: int, column_name: str) -> str:
+        """
+        读取某行某列的值
+        :param i_row: 行号
+        :param column_name: 列名
+        :return: 值
+        """
+        if not 0 <= i_row < self.row_count:
+            raise IndexError("行号%d超出范围" % i_row)
+        i_column = self.column_index[column_name]
+        column_offsets = self.offsets[i_column]
+        start = self.blob_pos[i_column]
+        return self.mmap[start + column_offsets[i_row]:start + column_offsets[i_row + 1]].decode("utf-8")
+
+    def row(self, i_row: int) -> dict:
+        return {name: self.get(i_row, name) for name in self.column_names}
+
+    def column(self, column_name: str, start: int = 0, stop: int = None):
+        """
+        迭代一列
+        :param column_name: 列名
+        :param start: 起始行号
+        :param stop: 结束行号（不包含），为None时到最后一行
+        :return: 值生成器
+        """
+        i_column = self.column_index[column_name]
+        column_offsets = self.offsets[i_column]
+        blob_pos = self.blob_pos[i_column]
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        for i_row in range(start, stop):
+            yield self.mmap[blob_pos + column_offsets[i_row]:blob_pos + column_offsets[i_row + 1]].decode("utf-8")
+
+    def __iter__(self):
+        for i_row in range(self.row_count):
+            yield self.row(i_row)
+
+    def close(self):
+        for column_offsets in getattr(self, "offsets", []):
+            if isinstance(column_offsets, memoryview):
+                column_offsets.release()
+        self.offsets = []
+        self.mmap.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : FrequentQuestionRead.py
+@Author: SangYu
+@Date  : 2019/5/21 10:05
+@Desc  : 常用问题集(csv)的读取：流式写入列存文件（抓取后的预处理与数据预处理共用）
+"""
+import csv
+
+from FileRead.ColumnarRead import ColumnarWriter
+
+# 常用问题集的列（标题、来源、时间、问题、回答）
+frequent_question_columns = ["title", "from", "time", "question", "answer"]
+
+
+# 将常用问题集(csv)写入列存文件
+def frequent_question_csv_to_columnar(csv_path: str, columnar_path: str, normalize_row=None) -> int:
+    """
+    将常用问题集(csv)写入列存文件：逐行读取、写入，不在内存中保存整个问题集
+    不足五个字段的行跳过，第一条五个字段的行为表头
+    :param csv_path: 常用问题集(csv)路径
+    :param columnar_path: 列存文件路径
+    :param normalize_row: 每行写入前的处理函数(行)->行，为None时原样写入
+    :return: 写入的问题数
+    """
+    with open(csv_path, "r", encoding="utf-8") as csvfile, \
+            ColumnarWriter(columnar_path, frequent_question_columns) as writer:
+        is_head = True
+        for row in csv.reader(csvfile):
+            if len(row) != len(frequent_question_columns):
+                continue
+            # 第一条记录为表头
+            if is_head:
+                is_head = False
+                continue
+            writer.append(normalize_row(row) if normalize_row else row)
+        return writer.row_count
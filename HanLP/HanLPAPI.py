@@ -5,20 +5,33 @@
 @Date  : 2018/12/27 14:56
 @Desc  : HanLP平台的API
 """
-from pyhanlp import *
 from Log.Logger import MyLog
+from LazyLoad.LazyImport import LazyObject
+from Monitor.Tracer import trace_span
+from Monitor.Metrics import timed
+
+
+# 加载HanLP分词器（导入pyhanlp时会启动JVM，因此延迟到首次分词时进行）
+def load_nlp_tokenizer():
+    from pyhanlp import JClass
+    return JClass("com.hankcs.hanlp.tokenizer.NLPTokenizer")
+
+
+hanlp_nlp_tokenizer = LazyObject(load_nlp_tokenizer)
 
 
 # 分词（有词性标注）
 def hanlp_nlp_segmentor(sentence):
-    nlp_tokenizer = JClass("com.hankcs.hanlp.tokenizer.NLPTokenizer")
-    return str(nlp_tokenizer.analyze(sentence)).split(" ")
+    nlp_tokenizer = hanlp_nlp_tokenizer.get()
+    with trace_span("hanlp"), timed("hanlp_segment"):
+        return str(nlp_tokenizer.analyze(sentence)).split(" ")
 
 
 # 分词（无词性标注）
 def hanlp_nlp_segmentor_without_nature(sentence):
-    nlp_tokenizer = JClass("com.hankcs.hanlp.tokenizer.NLPTokenizer")
-    word_list = str(nlp_tokenizer.analyze(sentence)).split(" ")
+    nlp_tokenizer = hanlp_nlp_tokenizer.get()
+    with trace_span("hanlp"), timed("hanlp_segment"):
+        word_list = str(nlp_tokenizer.analyze(sentence)).split(" ")
     return [word.split("/")[0] for word in word_list]
 
 
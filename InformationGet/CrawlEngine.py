@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : CrawlEngine.py
+@Author: SangYu
+@Date  : 2019/5/18 15:10
+@Desc  : 异步爬虫引擎（aiohttp）：全局与每个站点的并发上限、失败重试（指数退避）、同一站点请求间隔，
+各学校的页面解析函数作为页面处理函数接入，处理函数中可继续添加页面；
+处理函数（BeautifulSoup解析、写文件）在线程池中运行，不阻塞事件循环中的下载；
+GET页面与request_url共用HttpCache的磁盘缓存（条件请求、页面未变化时使用缓存、离线回放）
+"""
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from InformationGet import HttpCache
+from InformationGet.InternetConnect import get_headers
+from Log.Logger import get_logger
+from Monitor.Metrics import counter_inc, cache_access
+
+# 需要重试的HTTP状态码
+retry_status = {429, 500, 502, 503, 504}
+
+
+class CrawlRequest:
+    """
+    待获取的页面
+    """
+    __slots__ = ("url", "handler", "meta", "data")
+
+    def __init__(self, url: str, handler, meta: dict, data: dict = None):
+        self.url = url
+        self.handler = handler
+        self.meta = meta
+        # 表单数据，不为None时使用POST提交
+        self.data = data
+
+
+class RetryableError(Exception):
+    """
+    可重试的HTTP错误（服务器错误、请求过多）
+    """
+    pass
+
+
+# 解码页面
+def decode_page(request: CrawlRequest, headers, body: bytes) -> str:
+    """
+    解码页面：meta中"encoding"项指定的编码优先，否则按响应头与页面内容识别（与requests的apparent_encoding相同）
+    :param request: 页面
+    :param headers: 响应头
+    :param body: 页面内容
+    :return: 页面源码
+    """
+    encoding = request.meta.get("encoding") or HttpCache.detect_encoding(headers, body)
+    return body.decode(encoding, errors="replace")
+
+
+class CrawlEngine:
+    """
+    异步爬虫引擎，用法：
+    engine = CrawlEngine()
+    engine.add(url, handler, meta)
+    engine.run()
+    处理函数格式为handler(engine, url, page_source, meta)，在线程池中调用，可调用engine.add添加后续页面
+    """
+
+    def __init__(self, concurrency: int = 16, per_host: int = 4, retries: int = 3, backoff: float = 1.0,
+                 delay: float = 0.2, timeout: float = 30, handler_workers: int = 4, use_cache: bool = True,
+                 offline: bool = None):
+        """
+        :param concurrency: 全局并发请求数上限
+        :param per_host: 每个站点的并发请求数上限
+        :param retries: 失败重试次数
+        :param backoff: 首次重试等待时间(s)，之后每次翻倍（加随机抖动）
+        :param delay: 同一站点相邻两次请求的最小间隔(s)
+        :param timeout: 单次请求超时时间(s)
+        :param handler_workers: 运行页面处理函数的线程数
+        :param use_cache: GET页面是否使用HttpCache的磁盘缓存（POST提交的表单不缓存）
+        :param offline: 是否离线（只从缓存读取），为None时使用HttpCache的缓存配置
+        """
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.delay = delay
+        self.timeout = timeout
+        self.handler_workers = handler_workers
+        self.use_cache = use_cache
+        self.offline = offline
+        self.logger = get_logger("CrawlEngine")
+        # 开始运行前添加的页面
+        self.start_requests = []
+        self.queue = None
+        self.loop = None
+        self.loop_thread = None
+        self.executor = None
+        self.host_semaphores = {}
+        self.host_locks = {}
+        self.host_next_time = {}
+        # 获取或处理失败的页面：(url, 错误信息)
+        self.failed = []
+        self.stats = {"pages": 0, "failed": 0, "retries": 0, "bytes": 0, "cached": 0, "time": 0.0}
+
+    def add(self, url: str, handler, meta: dict = None, data: dict = None):
+        """
+        添加页面
+        :param url: 页面链接
+        :param handler: 页面处理函数
+        :param meta: 传给处理函数的附加信息，"encoding"项指定页面编码（默认自动识别）
+        :param data: 表单数据，不为None时使用POST提交（用于通过表单查询的页面）
+        :return:
+        """
+        request = CrawlRequest(url, handler, meta or {}, data)
+        if self.queue is None:
+            self.start_requests.append(request)
+        elif threading.get_ident() == self.loop_thread:
+            self.queue.put_nowait(request)
+        else:
+            # 处理函数在线程池中运行，asyncio.Queue不是线程安全的，交由事件循环放入队列
+            # （先于处理函数完成的回调执行，队列不会在后续页面入队前被判定为完成）
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, request)
+
+    def run(self) -> dict:
+        """
+        运行直到所有页面（包括处理函数添加的页面）处理完成
+        :return: 统计信息{"pages": 成功页面数, "failed": 失败页面数, "retries": 重试次数, "bytes": 下载字节数,
+        "cached": 使用缓存的页面数, "time": 耗时(s)}
+        """
+        start_time = time.time()
+        asyncio.run(self.crawl())
+        self.stats["time"] = time.time() - start_time
+        self.logger.info("爬取完成：页面%d个，失败%d个，重试%d次，耗时%.1fs", self.stats["pages"], self.stats["failed"],
+                         self.stats["retries"], self.stats["time"])
+        return self.stats
+
+    async def crawl(self):
+        self.queue = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.executor = ThreadPoolExecutor(max_workers=self.handler_workers)
+        # 信号量与锁绑定事件循环，每次运行重新创建
+        self.host_semaphores = {}
+        self.host_locks = {}
+        for request in self.start_requests:
+            self.queue.put_nowait(request)
+        self.start_requests = []
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                workers = [asyncio.ensure_future(self.worker(session)) for _ in range(self.concurrency)]
+                await self.queue.join()
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            self.queue = None
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            self.loop = None
+
+    async def worker(self, session):
+        while True:
+            request = await self.queue.get()
+            try:
+                await self.process(session, request)
+            finally:
+                self.queue.task_done()
+
+    async def process(self, session, request: CrawlRequest):
+        host = urlsplit(request.url).netloc
+        try:
+            page_source = await self.fetch(session, request, host)
+        except Exception as e:
+            self.record_failure(request.url, host, "获取失败", e)
+            return
+        try:
+            await self.loop.run_in_executor(self.executor, request.handler, self, request.url, page_source,
+                                            request.meta)
+        except Exception as e:
+            self.record_failure(request.url, host, "处理失败", e)
+            return
+        self.stats["pages"] += 1
+        counter_inc("crawl_pages_total", labels={"host": host})
+
+    def record_failure(self, url: str, host: str, stage: str, error: Exception):
+        self.logger.warning("页面%s%s：%s: %s", url, stage, type(error).__name__, error)
+        self.failed.append((url, "%s: %s: %s" % (stage, type(error).__name__, error)))
+        self.stats["failed"] += 1
+        counter_inc("crawl_failures_total", labels={"host": host})
+
+    async def fetch(self, session, request: CrawlRequest, host: str) -> str:
+        """
+        获取页面，网络错误、超时与可重试的状态码按指数退避重试
+        GET页面使用HttpCache的磁盘缓存：有缓存时发送条件请求，服务器返回304则使用缓存，状态码为200的响应存入缓存；
+        离线模式只从缓存读取，缓存中没有时抛出CacheMissError（不重试）
+        :param session: aiohttp会话
+        :param request: 待获取的页面
+        :param host: 站点
+        :return: 页面源码
+        """
+        use_cache = self.use_cache and request.data is None
+        entry, cached_body = None, None
+        if use_cache:
+            entry, cached_body = await self.loop.run_in_executor(self.executor, HttpCache.load_cache_entry,
+                                                                 request.url)
+            offline = HttpCache.cache_config["offline"] if self.offline is None else self.offline
+            if offline:
+                cache_access("http", entry is not None)
+                if entry is None:
+                    raise HttpCache.CacheMissError("离线模式下缓存中没有%s" % request.url)
+                self.stats["cached"] += 1
+                return decode_page(request, entry["headers"], cached_body)
+        semaphore = self.host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    await self.wait_politeness(host)
+                    headers = get_headers()
+                    headers.update(HttpCache.conditional_headers(entry))
+                    if request.data is None:
+                        response_context = session.get(request.url, headers=headers)
+                    else:
+                        response_context = session.post(request.url, data=request.data, headers=headers)
+                    async with response_context as response:
+                        if response.status == 304 and entry is not None:
+                            cache_access("http", True)
+                            self.stats["cached"] += 1
+                            await self.loop.run_in_executor(self.executor, HttpCache.refresh_cache_entry,
+                                                            request.url, entry)
+                            return decode_page(request, entry["headers"], cached_body)
+                        if response.status in retry_status:
+                            raise RetryableError("HTTP %d" % response.status)
+                        response.raise_for_status()
+                        body = await response.read()
+                        self.stats["bytes"] += len(body)
+                        if use_cache:
+                            cache_access("http", False)
+                            if response.status == 200:
+                                await self.loop.run_in_executor(self.executor, HttpCache.store_cache_entry,
+                                                                request.url, str(response.url), response.status,
+                                                                response.headers, body)
+                        return decode_page(request, response.headers, body)
+            except (RetryableError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    raise
+                wait_time = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                self.stats["retries"] += 1
+                counter_inc("crawl_retries_total", labels={"host": host})
+                self.logger.info("页面%s获取失败（%s: %s），%.1fs后第%d次重试", request.url, type(e).__name__, e,
+                                 wait_time, attempt)
+                await asyncio.sleep(wait_time)
+
+    async def wait_politeness(self, host: str):
+        """
+        等待到同一站点允许发出下一次请求的时间
+        :param host: 站点
+        :return:
+        """
+        lock = self.host_locks.get(host)
+        if lock is None:
+            lock = self.host_locks[host] = asyncio.Lock()
+        async with lock:
+            loop = asyncio.get_running_loop()
+            wait_time = self.host_next_time.get(host, 0) - loop.time()
+            if wait_time > 0:
+                await asyncio.sleep(wait_time)
+            self.host_next_time[host] = loop.time() + self.delay
@@ -6,14 +6,16 @@
 @Desc  : 获取常见问题集
 """
 from bs4 import BeautifulSoup
-from InformationGet.InternetConnect import request_url, selenium_chrome
-from Log.Logger import MyLog
+from InformationGet.InternetConnect import request_url, get_table_html, BrowserPool, create_headless_chrome
+from FileRead.ColumnarRead import ColumnarWriter, ColumnarReader
+from FileRead.FrequentQuestionRead import frequent_question_columns, frequent_question_csv_to_columnar
+from Log.Logger import MyLog, get_logger
 import sys
 import time
 import csv
 import pickle
 from threading import Thread
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from queue import Queue
 import os
 import random
@@ -21,7 +23,14 @@ import random
 
 # 从阳光高考网获取常见问题集
 # noinspection PyProtectedMember,PyUnusedLocal
-def get_question_yggk():
+def get_question_yggk(workers=10, max_pending=50, retries=3):
+    """
+    从阳光高考网获取常见问题集，各页面由常驻的下载线程池并发下载，唯一的写入线程写入问题集收集表
+    :param workers: 下载线程数
+    :param max_pending: 页面队列与记录队列的长度上限（队列满时提交页面、下载线程等待，避免积压）
+    :param retries: 每个页面下载失败的重试次数
+    :return:
+    """
     function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
     # 院校咨询页url
     main_url = "https://gaokao.chsi.com.cn"
@@ -40,141 +49,128 @@ def get_question_yggk():
             if info["forum_id"] != "":
                 university_formid.append([info["院校名称"], info["forum_id"]])
     function_logger.info("共有%d所985、211大学" % len(university_formid))
-    for university in university_formid:
-        begin = time.time()
-        function_logger.info("开始抓取" + university[0] + "的招生问题数据...")
-        main_page_url = "https://gaokao.chsi.com.cn/zxdy/forum--method-listDefault,year-2005,forumid-" + university[
-            1] + ",start-0.dhtml"
-        try:
-            main_page_source = request_url(main_page_url)
-            main_page_source.encoding = main_page_source.apparent_encoding
-            main_page_soup = BeautifulSoup(main_page_source.content, "lxml")
-            # 获取页面总数，页面栏含有省略号、不含省略号两种查找方式
-            if main_page_soup.find("li", class_="lip dot"):
-                page_count = main_page_soup.find("li", class_="lip dot").next_sibling.a.string
-            else:
-                page_count = main_page_soup.find("ul", class_="ch-page clearfix").find_all("li")[-2].a.string
-            # 置顶问题个数
-            top_question_count = len(main_page_soup.find("table", class_="ch-table zx-table")
-                                     .find_all("span", class_="question_top_txt"))
-            function_logger.debug("页面总数：%d 置顶问题个数：%d" % (int(page_count), int(top_question_count)))
-        except Exception as e:
-            # 招生咨询页面没有数据（三个大学）
-            function_logger.error("%s咨询界面没有数据，页面链接为：%s" % (university[0], main_page_url))
-            function_logger.error("错误信息：%s" % e)
-            continue
-        # 创建该学校的问题集收集表,并写好表头
-        table_head = ["标题", "来源", "时间", "问题", "回答"]
-        csvfile = open(file_path + "/" + university[0] + "常用问题集.csv", "w", newline="", encoding='utf-8')
-        csvfile.truncate()
+    page_pool = QuestionPagePool(workers, max_pending, retries)
+    try:
+        for university in university_formid:
+            get_university_question_yggk(university, file_path, page_pool)
+    finally:
+        page_pool.close()
+    if page_pool.failed_pages:
+        function_logger.error("共%d个页面抓取失败：%s" % (len(page_pool.failed_pages), page_pool.failed_pages))
+
+
+# 从阳光高考网获取一个学校的常见问题集
+def get_university_question_yggk(university, file_path, page_pool):
+    """
+    获取一个学校的常见问题集：解析页面总数后将各页面提交给下载线程池，等待全部页面写入后关闭收集表
+    :param university: [学校名, 咨询论坛id]
+    :param file_path: 问题集收集表目录
+    :param page_pool: 页面下载线程池
+    :return:
+    """
+    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    begin = time.time()
+    function_logger.info("开始抓取" + university[0] + "的招生问题数据...")
+    main_page_url = "https://gaokao.chsi.com.cn/zxdy/forum--method-listDefault,year-2005,forumid-" + university[
+        1] + ",start-0.dhtml"
+    try:
+        main_page_source = request_url(main_page_url)
+        main_page_source.encoding = main_page_source.apparent_encoding
+        main_page_soup = BeautifulSoup(main_page_source.content, "lxml")
+        # 获取页面总数，页面栏含有省略号、不含省略号两种查找方式
+        if main_page_soup.find("li", class_="lip dot"):
+            page_count = main_page_soup.find("li", class_="lip dot").next_sibling.a.string
+        else:
+            page_count = main_page_soup.find("ul", class_="ch-page clearfix").find_all("li")[-2].a.string
+        # 置顶问题个数
+        top_question_count = len(main_page_soup.find("table", class_="ch-table zx-table")
+                                 .find_all("span", class_="question_top_txt"))
+        function_logger.debug("页面总数：%d 置顶问题个数：%d" % (int(page_count), int(top_question_count)))
+    except Exception as e:
+        # 招生咨询页面没有数据（三个大学）
+        function_logger.error("%s咨询界面没有数据，页面链接为：%s" % (university[0], main_page_url))
+        function_logger.error("错误信息：%s" % e)
+        return
+    # 创建该学校的问题集收集表,并写好表头
+    table_head = ["标题", "来源", "时间", "问题", "回答"]
+    with open(file_path + "/" + university[0] + "常用问题集.csv", "w", newline="", encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(table_head)
-        record_queue = Queue()
-        # 每次开启10个线程,进行数据下载和存储
-        start_index = 0
-        end_index = 10
-        while True:
-            if start_index > int(page_count):
-                break
-            else:
-                dThread = [DownloadPageInfo(university[1], page_id, int(page_count), top_question_count, record_queue)
-                           for page_id in
-                           range(start_index, end_index)]
-                sThread = SavePageInfo(record_queue, writer)
-                for d in dThread:
-                    d.start()
-                sThread.start()
-                for d in dThread:
-                    d.join()
-                record_queue.put(-1)
-                sThread.join()
-                start_index += 10
-                end_index += 10
-                if end_index > int(page_count):
-                    end_index = int(page_count)
-
-        csvfile.close()
-        function_logger.info("抓取%s的信息用时：%ds" % (university[0], time.time() - begin))
-
-
-# 下载一页的信息
-class DownloadPageInfo(Thread):
-    def __init__(self, university_id, page_id, page_count, top_question_count, record_queue):
-        Thread.__init__(self)
+        for page_id in range(int(page_count)):
+            page_pool.submit(writer, DownloadPageInfo(university[1], page_id, int(page_count), top_question_count))
+        # 等待该学校的页面全部下载并写入
+        page_pool.wait()
+    function_logger.info("抓取%s的信息用时：%ds" % (university[0], time.time() - begin))
+
+
+# 下载一页的信息（由页面下载线程池调用，下载或解析失败时抛出异常以便重试）
+class DownloadPageInfo:
+    def __init__(self, university_id, page_id, page_count, top_question_count):
         self.university_id = university_id
         self.page_id = page_id
         self.page_count = page_count
         self.top_question_count = top_question_count
-        self.record_queue = record_queue
-        self.thread_logger = MyLog(logger="thread" + str(threading.current_thread().ident)).getlog()
+        self.thread_logger = get_logger("DownloadPageInfo")
+        page_question_count = 15
+        self.page_url = "https://gaokao.chsi.com.cn/zxdy/forum--method-listDefault,year-2005,forumid-" + \
+                        self.university_id + ",start-" + str(self.page_id * page_question_count) + ".dhtml"
 
     def get_page_info(self):
         main_url = "https://gaokao.chsi.com.cn"
-        page_question_count = 15
-        page_url = main_url + "/zxdy/forum--method-listDefault,year-2005,forumid-" + self.university_id + ",start-" + str(
-            self.page_id * page_question_count) + ".dhtml"
+        page_url = self.page_url
         self.thread_logger.info("页面抓取进度(%d,%d)" % (self.page_id + 1, self.page_count))
         self.thread_logger.info("页面url %s" % page_url)
-        try:
-            page_source = request_url(page_url)
-            page_source.encoding = page_source.apparent_encoding
-            page_soup = BeautifulSoup(page_source.text, "lxml")
-            # 获取咨询序列（所有的子节点）
-            tr_list = page_soup.find("table", class_="ch-table zx-table").contents
-            # 除去其中的空行
-            for item in tr_list:
-                if item == "\n":
-                    tr_list.remove(item)
-            # 置顶问答只记录一次
-            if self.page_id == 0:
-                start_index = 0
+        page_source = request_url(page_url)
+        page_source.encoding = page_source.apparent_encoding
+        page_soup = BeautifulSoup(page_source.text, "lxml")
+        # 获取咨询序列（所有的子节点），除去其中的空行
+        tr_list = [item for item in page_soup.find("table", class_="ch-table zx-table").contents if item != "\n"]
+        # 置顶问答只记录一次
+        if self.page_id == 0:
+            start_index = 0
+        else:
+            start_index = self.top_question_count * 2
+        page_infos = []
+        for i_qa_pair in range(start_index, len(tr_list), 2):
+            question_title = "q_title"
+            question_from = ""
+            question_time = ""
+            question_text = "q_text"
+            answer_text = "a_text"
+            question_title = str(tr_list[i_qa_pair].find("a", class_="question_t_txt").string).strip().replace(",",
+                                                                                                               "，")
+            # self.thread_logger.debug("标题:%s" % question_title)
+            question_from = str(tr_list[i_qa_pair].find("i", title="提问人").next_sibling.string).strip().replace(",",
+                                                                                                               "，")
+            # self.thread_logger.debug("来源:%s" % question_from)
+            question_time = str(
+                tr_list[i_qa_pair].find("td", class_="question_t ch-table-center").text).strip().replace(",", "，")
+            # self.thread_logger.debug("时间:%s" % question_time)
+            # 问题与答案可能出现本页无法写下的情况，需要进行页面跳转获取信息
+            question_text_class = tr_list[i_qa_pair + 1].find("div", class_="question")
+            if question_text_class.find(text='[详细]') is None:
+                question_text = str(question_text_class.text).strip()
             else:
-                start_index = self.top_question_count * 2
-            page_infos = []
-            for i_qa_pair in range(start_index, len(tr_list), 2):
-                question_title = "q_title"
-                question_from = ""
-                question_time = ""
-                question_text = "q_text"
-                answer_text = "a_text"
-                question_title = str(tr_list[i_qa_pair].find("a", class_="question_t_txt").string).strip().replace(",",
-                                                                                                                   "，")
-                # self.thread_logger.debug("标题:%s" % question_title)
-                question_from = str(tr_list[i_qa_pair].find("i", title="提问人").next_sibling.string).strip().replace(",",
-                                                                                                                   "，")
-                # self.thread_logger.debug("来源:%s" % question_from)
-                question_time = str(
-                    tr_list[i_qa_pair].find("td", class_="question_t ch-table-center").text).strip().replace(",", "，")
-                # self.thread_logger.debug("时间:%s" % question_time)
-                # 问题与答案可能出现本页无法写下的情况，需要进行页面跳转获取信息
-                question_text_class = tr_list[i_qa_pair + 1].find("div", class_="question")
-                if question_text_class.find(text='[详细]') is None:
-                    question_text = str(question_text_class.text).strip()
-                else:
-                    turn_page_url = main_url + question_text_class.find("a", text='[详细]')["href"]
-                    question_text = self.get_question_text(turn_page_url)
-                replace_str = ["回复", "\n", "\r", "\t", "\xa0", "\ue63c", "\ue5e5", "\u3000" "[", "]", " "]
-                for r_str in replace_str:
-                    question_text = question_text.replace(r_str, "")
-                question_text.replace(",", "，")
-                # self.thread_logger.debug("问题:%s" % question_text)
-                answer_text_class = tr_list[i_qa_pair + 1].find("div", class_="question_a")
-                if answer_text_class.find(text='[详细]') is None:
-                    answer_text = str(answer_text_class.text).replace("[ 回复 ]", "").strip()
-                else:
-                    turn_page_url = main_url + answer_text_class.find("a", text='[详细]')["href"]
-                    answer_text = self.get_answer_text(turn_page_url)
-                replace_str = ["回复", "\n", "\r", "\t", "\xa0", "\ue63c", "\ue5e5", "\u3000" "[", "]", " "]
-                for r_str in replace_str:
-                    answer_text = answer_text.replace(r_str, "")
-                answer_text.replace(",", "，")
-                # self.thread_logger.debug("回答:%s" % answer_text)
-                page_infos.append([question_title, question_from, question_time, question_text, answer_text])
-            return page_infos
-
-        except Exception as e:
-            self.thread_logger.error("错误信息%s" % e)
-            return []
+                turn_page_url = main_url + question_text_class.find("a", text='[详细]')["href"]
+                question_text = self.get_question_text(turn_page_url)
+            replace_str = ["回复", "\n", "\r", "\t", "\xa0", "\ue63c", "\ue5e5", "\u3000" "[", "]", " "]
+            for r_str in replace_str:
+                question_text = question_text.replace(r_str, "")
+            question_text.replace(",", "，")
+            # self.thread_logger.debug("问题:%s" % question_text)
+            answer_text_class = tr_list[i_qa_pair + 1].find("div", class_="question_a")
+            if answer_text_class.find(text='[详细]') is None:
+                answer_text = str(answer_text_class.text).replace("[ 回复 ]", "").strip()
+            else:
+                turn_page_url = main_url + answer_text_class.find("a", text='[详细]')["href"]
+                answer_text = self.get_answer_text(turn_page_url)
+            replace_str = ["回复", "\n", "\r", "\t", "\xa0", "\ue63c", "\ue5e5", "\u3000" "[", "]", " "]
+            for r_str in replace_str:
+                answer_text = answer_text.replace(r_str, "")
+            answer_text.replace(",", "，")
+            # self.thread_logger.debug("回答:%s" % answer_text)
+            page_infos.append([question_title, question_from, question_time, question_text, answer_text])
+        return page_infos
 
     def get_question_text(self, turn_page_url):
         try:
@@ -198,66 +194,146 @@ class DownloadPageInfo(Thread):
             self.thread_logger.error("答句%s抓取失败,失败原因%s" % (turn_page_url, e))
             return ""
 
-    def run(self):
-        page_record = self.get_page_info()
-        if page_record:
-            self.record_queue.put(page_record)
-
-
-# 保存页面信息的线程
-class SavePageInfo(Thread):
-    def __init__(self, record_queue, writer):
-        Thread.__init__(self)
-        self.record_queue = record_queue
-        self.writer = writer
-        self.flag = 1
-
-    def save_page_info(self, page_record):
-        self.flag = 0
-        for record in page_record:
-            self.writer.writerow(record)
-        self.flag = 1
 
-    def run(self):
+# 常用问题页面下载线程池：常驻的下载线程从页面队列取页面下载，结果交给唯一的写入线程写入收集表
+class QuestionPagePool:
+    def __init__(self, workers=10, max_pending=50, retries=3, backoff=1.0):
+        """
+        :param workers: 下载线程数
+        :param max_pending: 页面队列与记录队列的长度上限，队列满时提交页面、下载线程等待
+        :param retries: 每个页面下载失败的重试次数
+        :param backoff: 首次重试等待时间(s)，之后每次翻倍
+        """
+        self.page_queue = Queue(maxsize=max_pending)
+        self.record_queue = Queue(maxsize=max_pending)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_logger = MyLog(logger="QuestionPagePool").getlog()
+        # 重试后仍失败的页面链接
+        self.failed_pages = []
+        self.workers = [Thread(target=self.download_loop, name="QuestionPageWorker-%d" % i, daemon=True)
+                        for i in range(workers)]
+        self.writer_thread = Thread(target=self.write_loop, name="QuestionPageWriter", daemon=True)
+        for worker in self.workers:
+            worker.start()
+        self.writer_thread.start()
+
+    def submit(self, writer, page):
+        """
+        提交页面（页面队列满时等待）
+        :param writer: 页面记录写入的csv writer
+        :param page: DownloadPageInfo
+        :return:
+        """
+        self.page_queue.put((writer, page))
+
+    def download(self, page):
+        for attempt in range(self.retries + 1):
+            try:
+                return page.get_page_info()
+            except Exception as e:
+                if attempt == self.retries:
+                    self.pool_logger.error("页面%s抓取失败，错误信息%s" % (page.page_url, e))
+                    self.failed_pages.append(page.page_url)
+                    return []
+                wait_time = self.backoff * (2 ** attempt)
+                self.pool_logger.warning("页面%s抓取失败（%s），%.1fs后重试" % (page.page_url, e, wait_time))
+                time.sleep(wait_time)
+
+    def download_loop(self):
         while True:
-            page_record = self.record_queue.get()
-            if page_record == -1:
-                break
-            if page_record and self.flag:
-                self.save_page_info(page_record)
+            task = self.page_queue.get()
+            try:
+                if task is None:
+                    return
+                writer, page = task
+                page_record = self.download(page)
+                if page_record:
+                    # 记录队列满时等待写入线程
+                    self.record_queue.put((writer, page_record))
+            finally:
+                self.page_queue.task_done()
+
+    def write_loop(self):
+        while True:
+            item = self.record_queue.get()
+            try:
+                if item is None:
+                    return
+                writer, page_record = item
+                for record in page_record:
+                    writer.writerow(record)
+            finally:
+                self.record_queue.task_done()
+
+    def wait(self):
+        """
+        等待已提交的页面全部下载并写入
+        :return:
+        """
+        self.page_queue.join()
+        self.record_queue.join()
+
+    def close(self):
+        """
+        等待已提交的页面处理完成后结束所有线程
+        :return:
+        """
+        for _ in self.workers:
+            self.page_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.record_queue.put(None)
+        self.writer_thread.join()
 
 
 # 从阳光高考网上获取本科大学（能够筛选出985、211）的院校代码信息
-def get_undergraduate_university_info():
+def get_undergraduate_university_info(base_url="https://gaokao.chsi.com.cn", browser_count=2,
+                                      browser_factory=create_headless_chrome):
+    """
+    获取本科大学的院校信息：院校列表页先直接请求解析，表格由脚本生成时使用浏览器池中的浏览器，多个页面并发获取
+    :param base_url: 网站地址（可替换为本地测试服务器）
+    :param browser_count: 浏览器数量（同时也是并发获取的页面数）
+    :param browser_factory: 创建浏览器的函数（可替换为测试用的浏览器）
+    :return:
+    """
     # 院校库主页
     function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    main_url = "https://gaokao.chsi.com.cn/sch/search.do?searchType=1&xlcc=bk&start="
+    main_url = base_url + "/sch/search.do?searchType=1&xlcc=bk&start="
     main_page_source = request_url(main_url + "0")
     main_page_source.encoding = main_page_source.apparent_encoding
     main_page_soup = BeautifulSoup(main_page_source.text, "lxml")
     page_count = int(main_page_soup.find("li", class_="lip dot").next_sibling.text)
     page_university_count = 20
-    university_infos = []
-    for i_page in range(page_count):
+
+    # 获取一页的院校列表
+    def get_page_university_infos(i_page):
         page_url = main_url + str(i_page * page_university_count)
         function_logger.info("页面抓取进度(%d,%d)" % (i_page + 1, int(page_count)))
         function_logger.info("页面url%s" % page_url)
-        browser = selenium_chrome(page_url)
-        page_souce = browser.find_element_by_class_name("ch-table").get_attribute("innerHTML")
-        browser.quit()
+        page_souce = get_table_html(page_url, "ch-table", browser_pool)
         page_soup = BeautifulSoup(page_souce, "lxml")
-        page_soup.prettify()
         head = [th.text for th in page_soup.find("tr").find_all("th")]
-        print(head)
+        page_infos = []
         for tr in page_soup.find_all("tr")[1:]:
             info = {}
             td_list = tr.find_all("td")
-            info["url"] = "https://gaokao.chsi.com.cn" + td_list[0].find("a")["href"]
+            info["url"] = base_url + td_list[0].find("a")["href"]
             for i in [0, 1, 2, 3, 4, 7]:
                 info[head[i]] = td_list[i].text.strip()
             info[head[5]] = td_list[5].text.strip().replace("\n", "").replace(" ", "").replace("\u2002", " ")
             info[head[6]] = td_list[6].text.strip().replace("\ue664", "有") if td_list[6].text.strip() != "" else "无"
-            university_infos.append(info)
+            page_infos.append(info)
+        return page_infos
+
+    university_infos = []
+    browser_pool = BrowserPool(browser_count, browser_factory)
+    try:
+        with ThreadPoolExecutor(max_workers=browser_count) as executor:
+            for page_infos in executor.map(get_page_university_infos, range(page_count)):
+                university_infos.extend(page_infos)
+    finally:
+        browser_pool.close()
     for info in university_infos:
         print(info)
     with open("Information/大学/university_info", "wb")as p_file:
@@ -292,33 +368,24 @@ def get_consultation_forum_id():
 
 # 对抓取的985，211常用问题集进行预处理,去除不满足条件的记录（不足五个字段）
 def pretreat_crawl_questions():
+    """
+    对抓取的常用问题集(csv)进行预处理并写入列存文件（Columnar/学校名.col）：逐行读取、写入，不在内存中保存整个问题集，
+    读取时使用FileRead.ColumnarRead.ColumnarReader按行迭代或随机访问
+    :return:
+    """
     function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
     data_dir = "Information/大学/常问问题集/Data"
-    pickle_dir = "Information/大学/常问问题集/Pickle"
+    columnar_dir = "Information/大学/常问问题集/Columnar"
+    os.makedirs(columnar_dir, exist_ok=True)
     file_list = os.listdir(data_dir)
     function_logger.debug("大学数量：%d" % len(file_list))
     for file in file_list:
         university_name = file[:-9]
         function_logger.debug(university_name)
-        function_logger.info("开始读取%s的常问问题集..." % university_name)
-        with open(data_dir + "/" + file, "r", encoding="utf-8") as csvfile:
-            csv_reader = csv.reader(csvfile)
-            fqa_lines = []
-            for row in csv_reader:
-                if len(row) == 5:
-                    line = {}
-                    line["title"] = row[0]
-                    line["from"] = row[1]
-                    line["time"] = row[2]
-                    line["question"] = row[3]
-                    line["answer"] = row[4]
-                    fqa_lines.append(line)
-            fqa_lines.pop(0)
-        function_logger.info("读取%s的常用问题集完成！" % university_name)
-        function_logger.info("开始写入%s的常用问题集..." % university_name)
-        with open(pickle_dir + "/" + university_name, "wb")as p_file:
-            pickle.dump(fqa_lines, p_file)
-        function_logger.info("写入%s的常用问题集完成！" % university_name)
+        function_logger.info("开始处理%s的常问问题集..." % university_name)
+        row_count = frequent_question_csv_to_columnar(data_dir + "/" + file,
+                                                      columnar_dir + "/" + university_name + ".col")
+        function_logger.info("写入%s的常用问题集完成，共%d条！" % (university_name, row_count))
     function_logger.info("数据处理完成！")
 
 
@@ -326,9 +393,9 @@ def pretreat_crawl_questions():
 def label_data():
     function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
     data_dir = "Information/大学/常问问题集/Data"
-    pickle_dir = "Information/大学/常问问题集/Pickle"
+    columnar_dir = "Information/大学/常问问题集/Columnar"
     label_dir = "Information/大学/常问问题集/label"
-    file_list = os.listdir(pickle_dir)
+    file_list = os.listdir(columnar_dir)
     function_logger.debug("大学数量：%d" % len(file_list))
     line_1 = []
     line_2 = []
@@ -340,10 +407,8 @@ def label_data():
     all_count = 0
     for file in file_list:
         print(file)
-        university_name = file
-        with open(pickle_dir + "/" + university_name, "rb") as p_file:
-            lines = pickle.load(p_file)
-        lines_count = len(lines)
+        with ColumnarReader(columnar_dir + "/" + file) as lines:
+            lines_count = len(lines)
         all_count += lines_count
     print(all_count)
     #     group_size = 100
@@ -383,40 +448,43 @@ def label_data():
 
 # 对数据进行处理，选出参与标注数据的文本
 def brat_label_data():
-    pickle_dir = "Information/大学/常问问题集/Pickle"
+    """
+    从预处理后的列存文件（Columnar/学校名.col）中每100条随机选出一条作为标注数据写入Brat目录，
+    并将剩余的问题重新写入列存文件（下次从剩余的问题中选取）
+    :return:
+    """
+    columnar_dir = "Information/大学/常问问题集/Columnar"
     brat_dir = "Information/大学/常问问题集/Brat"
     all_count = 0
     all_count_brat = 0
     all_count_else = 0
-    file_list = os.listdir(pickle_dir)
+    file_list = sorted(file for file in os.listdir(columnar_dir) if file.endswith(".col"))
     for i_file in range(len(file_list)):
         print(file_list[i_file])
-        university_name = file_list[i_file]
-        with open(pickle_dir + "/" + university_name, "rb") as p_file:
-            lines = pickle.load(p_file)
-        lines_count = len(lines)
-        group_size = 100
-        brat_index = []
-        brat_datas = []
-        all_count += lines_count
-        for i_line in range(0, lines_count, 100):
-            random_end = min(group_size, lines_count - i_line)
-            random_index = random.randrange(0, random_end)
-            brat_index.append(i_line+random_index)
-        for i in brat_index:
-            brat_datas.append(lines[i])
-        all_count_brat += len(brat_datas)
-        # 去除选出的数据
-        for line in brat_datas:
-            lines.remove(line)
-        all_count_else += len(lines)
-        with open(brat_dir+"/"+str(i_file)+".txt","w",encoding="utf-8") as f_bdata:
-            for data in brat_datas:
-                f_bdata.write(data["question"]+"\t"+data["answer"]+"\n")
+        columnar_path = columnar_dir + "/" + file_list[i_file]
+        remain_path = columnar_path + ".remain"
+        with ColumnarReader(columnar_path) as lines:
+            lines_count = len(lines)
+            group_size = 100
+            brat_index = set()
+            all_count += lines_count
+            for i_line in range(0, lines_count, group_size):
+                random_end = min(group_size, lines_count - i_line)
+                random_index = random.randrange(0, random_end)
+                brat_index.add(i_line + random_index)
+            all_count_brat += len(brat_index)
+            # 选出的数据写入标注文件，其余的数据写入新的列存文件
+            with open(brat_dir + "/" + str(i_file) + ".txt", "w", encoding="utf-8") as f_bdata, \
+                    ColumnarWriter(remain_path, frequent_question_columns) as writer:
+                for i_line, data in enumerate(lines):
+                    if i_line in brat_index:
+                        f_bdata.write(data["question"] + "\t" + data["answer"] + "\n")
+                    else:
+                        writer.append([data[column] for column in frequent_question_columns])
+                all_count_else += writer.row_count
         fp = open(brat_dir + "/" + str(i_file) + ".ann", "w")
         fp.close()
-        with open(pickle_dir+"/"+university_name,"wb")as p_file:
-            pickle.dump(lines, p_file)
+        os.replace(remain_path, columnar_path)
     print(all_count)
     print(all_count_brat)
     print(all_count_else)
@@ -11,8 +11,9 @@ import re
 from FileRead.FileNameRead import read_all_file_list
 from FileRead.PDFRead import read_pdf_to_tables
 from FileRead.XLSRead import read_xls
-from InformationGet.InternetConnect import request_url, selenium_chrome
-from Log.Logger import MyLog
+from InformationGet.InternetConnect import selenium_chrome
+from LazyLoad.LazyImport import lazy_import
+from Log.Logger import MyLog, get_logger
 from FileRead.ImageRead import image_to_pdf
 import os
 import sys
@@ -20,6 +21,9 @@ import time
 
 import pdfplumber
 
+# 异步爬虫引擎依赖aiohttp，只在使用时导入（其它学校的爬虫不需要）
+crawl_engine = lazy_import("InformationGet.CrawlEngine")
+
 
 # 将表内容写入文本文件
 def write_table(file_path, table_name, table_head, table_content):
@@ -34,230 +38,203 @@ def write_table(file_path, table_name, table_head, table_content):
 
 
 # 哈尔滨工业大学招生计划
-def get_plan_info_hit():
+def get_plan_info_hit(base_url="http://zsb.hit.edu.cn", file_path="Information/九校联盟/哈尔滨工业大学/招生计划",
+                      engine=None):
+    """
+    哈尔滨工业大学招生计划（使用异步爬虫引擎并发获取各年份、各省份的页面）
+    :param base_url: 网站地址（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
     mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
     mylogger.info("开始获取网页源码...")
-    main_url = "http://zsb.hit.edu.cn/information/plan"
-    # 获取分类信息
-    main_page_source = requests.get(main_url).text
-    main_page_soup = BeautifulSoup(main_page_source, "lxml")
-    main_page_soup.prettify()
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(base_url + "/information/plan", handle_plan_main_page_hit, {"file_path": file_path})
+    return engine.run()
+
+
+# 哈尔滨工业大学招生计划主页：解析招生地区与年份，添加各年份、各地区的页面
+def handle_plan_main_page_hit(engine, url, page_source, meta):
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     # 招生计划省份
-    mylogger.info("解析招生地区...")
     province = []
     for item in main_page_soup.find(class_="province").find_all(name='a'):
         province.append(item.string.strip())
-    mylogger.debug("哈工大招生地区：" + str(province))
     # 招生计划年份
-    mylogger.info("解析招生年份...")
     years = []
     for item in main_page_soup.find_all(class_="year-select"):
         years.append(item.string.strip())
-    mylogger.debug("哈工大招生年份：" + str(years))
-
-    # 对每年份各省数据进行抽取
-    mylogger.info("开始获取各年各地区数据...")
     for pro in province:
         for year in years:
-            mylogger.info("开始获取" + year + pro + "的招生计划")
-            # 构造链接
-            specific_url = main_url + "?" + "year=" + year + "&" + "province=" + pro
-            page_source = requests.get(specific_url).text
-            page_soup = BeautifulSoup(page_source, "lxml")
-            page_soup.prettify()
-            # 表名
-            table_name = year + "-" + pro
-            mylogger.debug("表名:" + table_name)
-            # 表头
-            table_head = []
-            for item in page_soup.find(class_="info_table").thead.find_all(name="td"):
-                table_head.append(item.string.strip())
-            mylogger.debug("表头:" + str(table_head))
-            # 表内容
-            table_content = []
-            for item in page_soup.find(class_="info_table").tbody.find_all(name="tr"):
-                temp = []
-                for sub_item in item.find_all(name="td"):
-                    temp.append(sub_item.string.strip())
-                table_content.append(temp)
-            # 去除统计部分的数据项、无数据的项
-            for item in table_content:
-                if item[0] == "无数据":
-                    table_content.remove(item)
-                # elif item[1] == "统计":
-                #     table_content.remove(item)
-            mylogger.debug("表内容如下：")
-            for item in table_content:
-                mylogger.debug(item)
-            # 将表内容写入文本文件
-            file_path = "Information/九校联盟/哈尔滨工业大学/招生计划"
-            write_table(file_path, table_name, table_head, table_content)
-            mylogger.info(year + pro + "的招生计划已存入文件")
+            specific_url = url + "?" + "year=" + year + "&" + "province=" + pro
+            engine.add(specific_url, handle_plan_page_hit, {"file_path": meta["file_path"], "year": year, "pro": pro})
+
+
+# 哈尔滨工业大学某年份、某地区的招生计划页面
+def handle_plan_page_hit(engine, url, page_source, meta):
+    page_soup = BeautifulSoup(page_source, "lxml")
+    # 表名
+    table_name = meta["year"] + "-" + meta["pro"]
+    # 表头
+    table_head = []
+    for item in page_soup.find(class_="info_table").thead.find_all(name="td"):
+        table_head.append(item.string.strip())
+    # 表内容
+    table_content = []
+    for item in page_soup.find(class_="info_table").tbody.find_all(name="tr"):
+        temp = []
+        for sub_item in item.find_all(name="td"):
+            temp.append(sub_item.string.strip())
+        # 去除无数据的项
+        if temp and temp[0] == "无数据":
+            continue
+        table_content.append(temp)
+    # 将表内容写入文本文件
+    write_table(meta["file_path"], table_name, table_head, table_content)
 
 
 # 北京大学招生计划
-def get_plan_info_pku():
-    main_url = "http://www.gotopku.cn/programa/enrolstu/6.html"
-    # 获取分类信息
-    main_page_source = requests.get(main_url).text
-    main_page_soup = BeautifulSoup(main_page_source, "lxml")
-    main_page_soup.prettify()
+def get_plan_info_pku(main_url="http://www.gotopku.cn/programa/enrolstu/6.html",
+                      file_path="Information/九校联盟/北京大学/招生计划", engine=None):
+    """
+    北京大学招生计划（使用异步爬虫引擎并发获取各年份、各地区、各科别的页面）
+    同一年份、地区的文史、理工两个页面合并为一个表，全部页面获取完成后写入文本文件
+    :param main_url: 招生计划主页（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    engine = engine or crawl_engine.CrawlEngine()
+    # 表名 -> 各科别页面的(表头, 表内容)
+    tables = {}
+    engine.add(main_url, handle_plan_main_page_pku, {"tables": tables})
+    stats = engine.run()
+    for table_name, family_tables in tables.items():
+        if None in family_tables:
+            mylogger.warning("%s有页面获取失败，未写入文件", table_name)
+            continue
+        table_head = family_tables[0][0]
+        table_content = []
+        for family_table in family_tables:
+            table_content.extend(family_table[1])
+        # 将表内容写入文本文件
+        write_table(file_path, table_name, table_head, table_content)
+    return stats
+
+
+# 北京大学招生计划主页：解析科别、年份与地区，添加各年份、各地区、各科别的页面
+def handle_plan_main_page_pku(engine, url, page_source, meta):
+    mylogger = get_logger("handle_plan_main_page_pku")
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     # 招生计划科别（文理）
     familes = []
     contents = main_page_soup.find(class_="lqlist").contents
     for item in contents[1].find_all(name='a'):
         familes.append(item.string.strip())
-    print(familes)
+    mylogger.debug("科别%s", familes)
     # 招生计划年份
     years = []
     for item in contents[3].find_all(name='a'):
         years.append(item.string.strip())
-    print(years)
+    mylogger.debug("年份%s", years)
     # 招生计划地区
     district = []
     for item in main_page_soup.find(class_="kr").find_all(name='a'):
         district.append(item.string.strip())
-    print(district)
-
+    mylogger.debug("地区%s", district)
     # 构造链接
+    new_main_url = url[:-len(".html")] if url.endswith(".html") else url
     for year in years:
         for i_district in range(len(district)):
-            table_content = []
+            table_name = year + "-" + district[i_district]
+            meta["tables"][table_name] = [None] * len(familes)
             for i_families in range(len(familes)):
-                new_main_url = "http://www.gotopku.cn/programa/enrolstu/6"
                 specific_url = new_main_url + "/" + year + "/" + str(i_district + 1) + "/" + str(i_families) + ".html"
-                page_source = requests.get(specific_url).text
-                page_soup = BeautifulSoup(page_source, "lxml")
-                page_soup.prettify()
-                # 表名
-                table_name = year + "-" + district[i_district]
-                print("表名:", table_name)
-                # 表内容(原表)
-                source_table_content = []
-                for item in page_soup.find(class_="lqtable").find_all(name="td"):
-                    source_table_content.append(item.string.strip())
-                # 表头
-                table_head = source_table_content[:2]
-                table_head.insert(1, "类别")
-                print("表头:", table_head)
-                source_table_content = source_table_content[4:]
-                for i in range(0, len(source_table_content), 2):
-                    temp = []
-                    temp.append(source_table_content[i])
-                    if i_families == 0:
-                        temp.append("文史")
-                    else:
-                        temp.append("理工")
-                    temp.append(source_table_content[i + 1])
-                    table_content.append(temp)
-                for item in table_content:
-                    print(item)
-            # 将表内容写入文本文件
-            file_path = "Information/九校联盟/北京大学/招生计划"
-            write_table(file_path, table_name, table_head, table_content)
+                engine.add(specific_url, handle_plan_page_pku,
+                           {"tables": meta["tables"], "table_name": table_name, "i_families": i_families})
+
+
+# 北京大学某年份、某地区、某科别的招生计划页面
+def handle_plan_page_pku(engine, url, page_source, meta):
+    page_soup = BeautifulSoup(page_source, "lxml")
+    # 表内容(原表)
+    source_table_content = []
+    for item in page_soup.find(class_="lqtable").find_all(name="td"):
+        source_table_content.append(item.string.strip())
+    # 表头
+    table_head = source_table_content[:2]
+    table_head.insert(1, "类别")
+    source_table_content = source_table_content[4:]
+    table_content = []
+    for i in range(0, len(source_table_content), 2):
+        temp = []
+        temp.append(source_table_content[i])
+        if meta["i_families"] == 0:
+            temp.append("文史")
+        else:
+            temp.append("理工")
+        temp.append(source_table_content[i + 1])
+        table_content.append(temp)
+    meta["tables"][meta["table_name"]][meta["i_families"]] = (table_head, table_content)
 
 
 # 北大医学部招生计划数据(2017\2016计划,2015无数据)
-def get_plan_info_pkuhsc():
-    get_plan_info_pkuhsc_2017()
-    get_plan_info_pkuhsc_2016()
-
-
-# 北大医学部招生计划数据2017
-def get_plan_info_pkuhsc_2017():
-    main_url = "http://jiaoyuchu.bjmu.edu.cn/zsjy/zsgz/zsjh"
-    year = "2017"
-    # 构造链接
-    specific_url = main_url + "/" + year + "/"
-    print(specific_url)
-    page_source = requests.get(specific_url)
-    page_source.encoding = "utf-8"
-    page_soup = BeautifulSoup(page_source.text, "lxml")
-    page_soup.prettify()
+def get_plan_info_pkuhsc(main_url="http://jiaoyuchu.bjmu.edu.cn/zsjy/zsgz/zsjh",
+                         file_path="Information/九校联盟/北京大学医学部/招生计划", engine=None):
+    """
+    北大医学部招生计划（使用异步爬虫引擎并发获取各年份、各地区的页面）
+    :param main_url: 招生计划主页（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
+    # 2017年的表第一列为序号
+    for year, drop_first_column in (("2017", True), ("2016", False)):
+        engine.add(main_url + "/" + year + "/", handle_plan_main_page_pkuhsc,
+                   {"file_path": file_path, "year": year, "drop_first_column": drop_first_column,
+                    "encoding": "utf-8"})
+    return engine.run()
+
+
+# 北大医学部某年份的招生计划主页：解析地区，添加各地区的页面
+def handle_plan_main_page_pkuhsc(engine, url, page_source, meta):
+    mylogger = get_logger("handle_plan_main_page_pkuhsc")
+    page_soup = BeautifulSoup(page_source, "lxml")
     year_and_district = page_soup.find_all(class_="link_new01")
     district = []
     district_url = []
     for item in year_and_district[1].find_all(name='a'):
         district.append(item.string.strip())
         district_url.append(item['href'])
-    print(district)
-    print(district_url)
+    mylogger.debug("%s年地区%s", meta["year"], district)
     for i_url in range(len(district_url)):
         if district[i_url] == "新疆预科" or district[i_url] == "内蒙古预科" or district[i_url] == "新疆西藏内地班":
             break
-        table_source = requests.get(specific_url + district_url[i_url])
-        table_source.encoding = "utf-8"
-        table_soup = BeautifulSoup(table_source.text, "lxml")
-        table_soup.prettify()
-        table_content = []
-        for item in table_soup.find(class_="box_new02").table.tbody.find_all(name="tr"):
-            temp = []
-            for sub_item in item.find_all(name="td"):
-                temp.append(sub_item.text.strip())
-                # print(sub_item.text.strip())
+        engine.add(url + district_url[i_url], handle_plan_page_pkuhsc, dict(meta, district=district[i_url]))
+
+
+# 北大医学部某年份、某地区的招生计划页面
+def handle_plan_page_pkuhsc(engine, url, page_source, meta):
+    table_soup = BeautifulSoup(page_source, "lxml")
+    table_content = []
+    for item in table_soup.find(class_="box_new02").table.tbody.find_all(name="tr"):
+        temp = []
+        for sub_item in item.find_all(name="td"):
+            temp.append(sub_item.text.strip())
+        if meta["drop_first_column"]:
             temp.pop(0)
-            table_content.append(temp)
-        table_name = year + "-" + district[i_url]
-        table_head = table_content[0]
-        table_head[1] = "类别"
-        table_content = table_content[1:]
-        for i in range(len(table_content)):
-            table_content[i][0] += table_content[i][1] + "年"
-            table_content[i][1] = "医科"
-        print(table_name)
-        print(table_head)
-        for item in table_content:
-            print(item)
-        file_path = "Information/九校联盟/北京大学医学部/招生计划"
-        write_table(file_path, table_name, table_head, table_content)
-
-
-# 北大医学部招生计划数据2016
-def get_plan_info_pkuhsc_2016():
-    main_url = "http://jiaoyuchu.bjmu.edu.cn/zsjy/zsgz/zsjh"
-    year = "2016"
-    # 构造链接
-    specific_url = main_url + "/" + year + "/"
-    # print(specific_url)
-    page_source = requests.get(specific_url)
-    page_source.encoding = "utf-8"
-    page_soup = BeautifulSoup(page_source.text, "lxml")
-    page_soup.prettify()
-    year_and_district = page_soup.find_all(class_="link_new01")
-    district = []
-    district_url = []
-    for item in year_and_district[1].find_all(name='a'):
-        district.append(item.string.strip())
-        district_url.append(item['href'])
-    print(district)
-    print(district_url)
-    for i_url in range(len(district_url)):
-        if district[i_url] == "新疆预科" or district[i_url] == "内蒙古预科" or district[i_url] == "新疆西藏内地班":
-            break
-        table_source = requests.get(specific_url + district_url[i_url])
-        table_source.encoding = "utf-8"
-        table_soup = BeautifulSoup(table_source.text, "lxml")
-        table_soup.prettify()
-        table_content = []
-        for item in table_soup.find(class_="box_new02").table.tbody.find_all(name="tr"):
-            temp = []
-            for sub_item in item.find_all(name="td"):
-                temp.append(sub_item.text.strip())
-                # print(sub_item.text.strip())
-            table_content.append(temp)
-        table_name = year + "-" + district[i_url]
-        table_head = table_content[0]
-        table_head[1] = "类别"
-        table_content = table_content[1:]
-        for i in range(len(table_content)):
-            table_content[i][0] += table_content[i][1] + "年"
-            table_content[i][1] = "医科"
-        print(table_name)
-        print(table_head)
-        for item in table_content:
-            print(item)
-        file_path = "Information/九校联盟/北京大学医学部/招生计划"
-        write_table(file_path, table_name, table_head, table_content)
+        table_content.append(temp)
+    table_name = meta["year"] + "-" + meta["district"]
+    table_head = table_content[0]
+    table_head[1] = "类别"
+    table_content = table_content[1:]
+    for i in range(len(table_content)):
+        table_content[i][0] += table_content[i][1] + "年"
+        table_content[i][1] = "医科"
+    write_table(meta["file_path"], table_name, table_head, table_content)
 
 
 # 清华大学招生计划
@@ -909,9 +886,17 @@ def get_plan_info_nju():
 
 
 # 西安交通大学招生计划
-def get_plan_info_xjtu():
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_path = "Information/九校联盟/西安交通大学/招生计划"
+def get_plan_info_xjtu(main_url="http://zs.xjtu.edu.cn/bkscx/zsjhcx.htm",
+                       search_url="http://zs.xjtu.edu.cn/zsjg.jsp?wbtreeid=1168",
+                       file_path="Information/九校联盟/西安交通大学/招生计划", engine=None):
+    """
+    西安交通大学招生计划：直接从官网进行数据查询，使用form提交（使用异步爬虫引擎并发查询各年份、各地区）
+    :param main_url: 查询主页（可替换为本地测试服务器）
+    :param search_url: 查询表单提交地址
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
     # 通过获取单个网页获取信息，需要后续处理，很麻烦
     # mylogger.info("开始获取网页源码...共五个网页")
     # with open(file_path+"/source/page_url_list","w",encoding="utf-8")as url_file:
@@ -932,13 +917,15 @@ def get_plan_info_xjtu():
     # url_soup.prettify()
     # for page_url in url_soup.find_all("a"):
     #     print(page_url)
-    # 直接从官网进行数据查询，使用form提交
-    # 获取可查询的年份和地区
-    main_url = "http://zs.xjtu.edu.cn/bkscx/zsjhcx.htm"
-    main_page_source = request_url(main_url)
-    main_page_source.encoding = main_page_source.apparent_encoding
-    main_page_soup = BeautifulSoup(main_page_source.text, "lxml")
-    main_page_soup.prettify()
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(main_url, handle_plan_main_page_xjtu, {"file_path": file_path, "search_url": search_url})
+    return engine.run()
+
+
+# 西安交通大学招生计划查询主页：获取可查询的年份和地区，提交各年份、各地区的查询
+def handle_plan_main_page_xjtu(engine, url, page_source, meta):
+    mylogger = get_logger("handle_plan_main_page_xjtu")
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     years = []
     districts = []
     for year in main_page_soup.find("select", id="nf").find_all("option"):
@@ -947,7 +934,6 @@ def get_plan_info_xjtu():
         districts.append(district.string)
     mylogger.debug("可查询的年份" + str(years))
     mylogger.debug("可查询的省份" + str(districts))
-    search_url = "http://zs.xjtu.edu.cn/zsjg.jsp?wbtreeid=1168"
     for year in years:
         for district in districts:
             # x,y 是查询按钮点击时的坐标，查询按钮大小x,y(54x22)
@@ -957,32 +943,39 @@ def get_plan_info_xjtu():
                 "x": "27",
                 "y": "11"
             }
-            return_html = requests.post(search_url, data=params)
-            return_soup = BeautifulSoup(return_html.text, "lxml")
-            return_soup.prettify()
-            all_lines = []
-            for tr in return_soup.find("div", id="fybt").find_all("tr"):
-                line = []
-                for td in tr:
-                    if td.string != "\n":
-                        line.append(str(td.string).strip())
-                all_lines.append(line)
-            table_name = year + "-" + district[:-1]
-            table_head = ["专业", "类别", "人数"]
-            table_content = []
-            for line in all_lines[1:-1]:
-                classy = line[2]
-                if classy == "理":
-                    classy = "理工"
-                if classy == "文":
-                    classy = "文史"
-                table_content.append([line[0], classy, line[4]])
-            mylogger.debug(table_name)
-            mylogger.debug(str(table_head))
-            for line in table_content:
-                mylogger.debug(str(line))
-            write_table(file_path, table_name, table_head, table_content)
-            mylogger.info(year + district + "的招生计划已存入文件")
+            engine.add(meta["search_url"], handle_plan_page_xjtu,
+                       {"file_path": meta["file_path"], "year": year, "district": district}, data=params)
+
+
+# 西安交通大学某年份、某地区的招生计划查询结果
+def handle_plan_page_xjtu(engine, url, page_source, meta):
+    mylogger = get_logger("handle_plan_page_xjtu")
+    year = meta["year"]
+    district = meta["district"]
+    return_soup = BeautifulSoup(page_source, "lxml")
+    all_lines = []
+    for tr in return_soup.find("div", id="fybt").find_all("tr"):
+        line = []
+        for td in tr:
+            if td.string != "\n":
+                line.append(str(td.string).strip())
+        all_lines.append(line)
+    table_name = year + "-" + district[:-1]
+    table_head = ["专业", "类别", "人数"]
+    table_content = []
+    for line in all_lines[1:-1]:
+        classy = line[2]
+        if classy == "理":
+            classy = "理工"
+        if classy == "文":
+            classy = "文史"
+        table_content.append([line[0], classy, line[4]])
+    mylogger.debug(table_name)
+    mylogger.debug(str(table_head))
+    for line in table_content:
+        mylogger.debug(str(line))
+    write_table(meta["file_path"], table_name, table_head, table_content)
+    mylogger.info(year + district + "的招生计划已存入文件")
 
 
 # 浙江大学招生计划
@@ -992,59 +985,81 @@ def get_plan_info_zju():
 
 
 # 中国科学技术大学招生计划
-def get_plan_info_ustc():
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_path = "Information/九校联盟/中国科学技术大学/招生计划"
-    main_url = "https://zsb.ustc.edu.cn"
-    # 获取分类信息
-    main_page_source = request_url(main_url + "/12993/list.htm")
-    main_page_source.encoding = main_page_source.apparent_encoding
-    main_page_soup = BeautifulSoup(main_page_source.text, "lxml")
-    main_page_soup.prettify()
+def get_plan_info_ustc(main_url="https://zsb.ustc.edu.cn", file_path="Information/九校联盟/中国科学技术大学/招生计划",
+                       engine=None):
+    """
+    中国科学技术大学招生计划（使用异步爬虫引擎并发获取各地区的页面）
+    :param main_url: 网站地址（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(main_url + "/12993/list.htm", handle_plan_main_page_ustc, {"file_path": file_path})
+    return engine.run()
+
+
+# 中国科学技术大学招生计划主页：添加地图中各地区的页面
+def handle_plan_main_page_ustc(engine, url, page_source, meta):
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     for area in main_page_soup.find_all("area"):
-        page_url = area["href"]
-        page_source = request_url(page_url)
-        page_source.encoding = page_source.apparent_encoding
-        page_soup = BeautifulSoup(page_source.text, "lxml")
-        page_soup.prettify()
-        title = page_soup.find("h1", class_="arti_title").string
-        year = title[:4]
-        district = title[5:-4]
-        table_name = year + "-" + district
-        table_head = ["专业", "类别", "人数"]
-        mylogger.debug(table_name)
-        mylogger.debug(str(table_head))
-        all_lines = []
-        for tr in page_soup.find("div", class_="wp_articlecontent").find_all("tr"):
-            line = []
-            for td in tr:
-                line.append(td.text)
-            all_lines.append(line)
-        table_content = []
-        for line in all_lines[1:]:
-            if line[0] != "合计" and line[0] != "小计":
-                if district == "浙江" or district == "上海":
-                    table_content.append([line[0] + "(" + line[1] + ")", "理工", line[2]])
-                else:
-                    table_content.append([line[0], "理工", line[1]])
-        for line in table_content:
-            mylogger.debug(str(line))
-        write_table(file_path, table_name, table_head, table_content)
-        mylogger.info(year + district + "的招生计划已存入文件")
+        engine.add(area["href"], handle_plan_page_ustc, meta)
+
+
+# 中国科学技术大学某地区的招生计划页面
+def handle_plan_page_ustc(engine, url, page_source, meta):
+    mylogger = get_logger("handle_plan_page_ustc")
+    page_soup = BeautifulSoup(page_source, "lxml")
+    title = page_soup.find("h1", class_="arti_title").string
+    year = title[:4]
+    district = title[5:-4]
+    table_name = year + "-" + district
+    table_head = ["专业", "类别", "人数"]
+    mylogger.debug(table_name)
+    mylogger.debug(str(table_head))
+    all_lines = []
+    for tr in page_soup.find("div", class_="wp_articlecontent").find_all("tr"):
+        line = []
+        for td in tr:
+            line.append(td.text)
+        all_lines.append(line)
+    table_content = []
+    for line in all_lines[1:]:
+        if line[0] != "合计" and line[0] != "小计":
+            if district == "浙江" or district == "上海":
+                table_content.append([line[0] + "(" + line[1] + ")", "理工", line[2]])
+            else:
+                table_content.append([line[0], "理工", line[1]])
+    for line in table_content:
+        mylogger.debug(str(line))
+    write_table(meta["file_path"], table_name, table_head, table_content)
+    mylogger.info(year + district + "的招生计划已存入文件")
 
 
 # 复旦大学招生计划
-def get_plan_info_fudan():
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_path_benbu = "Information/九校联盟/复旦大学/招生计划"
-    file_path_yixue = "Information/九校联盟/复旦大学上海医学部/招生计划"
-    # 直接从官网进行数据查询，使用form提交
-    # 获取可查询的年份和地区
-    main_url = "http://www.ao.fudan.edu.cn/index!enrollmentPlan.html"
-    main_page_source = request_url(main_url)
-    main_page_source.encoding = main_page_source.apparent_encoding
-    main_page_soup = BeautifulSoup(main_page_source.text, "lxml")
-    main_page_soup.prettify()
+def get_plan_info_fudan(main_url="http://www.ao.fudan.edu.cn/index!enrollmentPlan.html",
+                        search_url="http://www.ao.fudan.edu.cn/index!enrollmentPlan.action",
+                        file_path_benbu="Information/九校联盟/复旦大学/招生计划",
+                        file_path_yixue="Information/九校联盟/复旦大学上海医学部/招生计划", engine=None):
+    """
+    复旦大学招生计划：直接从官网进行数据查询，使用form提交（使用异步爬虫引擎并发查询各年份、各地区）
+    :param main_url: 查询主页（可替换为本地测试服务器）
+    :param search_url: 查询表单提交地址
+    :param file_path_benbu: 本部文本文件存放目录
+    :param file_path_yixue: 上海医学部文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(main_url, handle_plan_main_page_fudan,
+               {"search_url": search_url, "file_path_benbu": file_path_benbu, "file_path_yixue": file_path_yixue})
+    return engine.run()
+
+
+# 复旦大学招生计划查询主页：获取可查询的年份和地区，提交各年份、各地区的查询
+def handle_plan_main_page_fudan(engine, url, page_source, meta):
+    mylogger = get_logger("handle_plan_main_page_fudan")
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     years = []
     districts = []
     for year in main_page_soup.find("select", id="nf").find_all("option"):
@@ -1053,7 +1068,6 @@ def get_plan_info_fudan():
         districts.append(district.string)
     mylogger.debug("可查询的年份" + str(years))
     mylogger.debug("可查询的省份" + str(districts))
-    search_url = "http://www.ao.fudan.edu.cn/index!enrollmentPlan.action"
     # 2006-2015年有数据
     for year in years:
         for district in districts:
@@ -1062,81 +1076,88 @@ def get_plan_info_fudan():
                 "nf": year,
                 "ss": district
             }
-            return_html = requests.post(search_url, data=params)
-            return_soup = BeautifulSoup(return_html.text, "lxml")
-            return_soup.prettify()
-            all_lines = []
-            for div in return_soup.find_all("div", class_="inquirytable_result"):
-                for tr in div.find_all("tr"):
-                    line = []
-                    for td in tr:
-                        if td.string != "\n":
-                            line.append(str(td.string).strip())
-                    all_lines.append(line)
-            table_name = year + "-" + district
-            table_head = ["专业", "类别", "人数"]
-            mylogger.debug(table_name)
-            mylogger.debug(str(table_head))
-            # 数据查询为空
-            if len(all_lines) < 3:
+            engine.add(meta["search_url"], handle_plan_page_fudan, dict(meta, year=year, district=district),
+                       data=params)
+
+
+# 复旦大学某年份、某地区的招生计划查询结果
+def handle_plan_page_fudan(engine, url, page_source, meta):
+    mylogger = get_logger("handle_plan_page_fudan")
+    year = meta["year"]
+    district = meta["district"]
+    return_soup = BeautifulSoup(page_source, "lxml")
+    all_lines = []
+    for div in return_soup.find_all("div", class_="inquirytable_result"):
+        for tr in div.find_all("tr"):
+            line = []
+            for td in tr:
+                if td.string != "\n":
+                    line.append(str(td.string).strip())
+            all_lines.append(line)
+    table_name = year + "-" + district
+    table_head = ["专业", "类别", "人数"]
+    mylogger.debug(table_name)
+    mylogger.debug(str(table_head))
+    # 数据查询为空
+    if len(all_lines) < 3:
+        return
+    # 开始提取数据
+    table_content_benbu = []
+    table_content_yixue = []
+    # 2013年开始复旦大学与复旦大学上海医学部分开招生
+    if int(year) < 2013:
+        for line in all_lines[1:-1]:
+            # 去除文史汇总和理工汇总
+            if line[0] == "文史汇总" or line[0] == "理工汇总":
+                continue
+            # 上海地区表头有不同
+            if district == "上海":
+                table_content_benbu.append([line[0], line[1], line[5]])
+            else:
+                table_content_benbu.append([line[0], line[1], line[3]])
+    else:
+        # 先将本部和医学院的数据分开
+        index = 0
+        for i_line in range(1, len(all_lines)):
+            if all_lines[i_line][0] == "专业名称":
+                index = i_line
+                break
+        if index == 0:
+            all_lines_benbu = all_lines
+            all_lines_yixue = []
+        else:
+            all_lines_benbu = all_lines[:index]
+            all_lines_yixue = all_lines[index:]
+        for line in all_lines_benbu[1:-1]:
+            # 去除文史汇总和理工汇总
+            if line[0] == "文史汇总" or line[0] == "理工汇总":
                 continue
-            # 开始提取数据
-            table_content_benbu = []
-            table_content_yixue = []
-            # 2013年开始复旦大学与复旦大学上海医学部分开招生
-            if int(year) < 2013:
-                for line in all_lines[1:-1]:
-                    # 去除文史汇总和理工汇总
-                    if line[0] == "文史汇总" or line[0] == "理工汇总":
-                        continue
-                    # 上海地区表头有不同
-                    if district == "上海":
-                        table_content_benbu.append([line[0], line[1], line[5]])
-                    else:
-                        table_content_benbu.append([line[0], line[1], line[3]])
+            # 上海地区表头有不同
+            if district == "上海":
+                table_content_benbu.append([line[0], line[1], line[5]])
             else:
-                # 先将本部和医学院的数据分开
-                index = 0
-                for i_line in range(1, len(all_lines)):
-                    if all_lines[i_line][0] == "专业名称":
-                        index = i_line
-                        break
-                if index == 0:
-                    all_lines_benbu = all_lines
-                    all_lines_yixue = []
+                table_content_benbu.append([line[0], line[1], line[3]])
+        if len(all_lines_yixue) != 0:
+            for line in all_lines_yixue[1:-1]:
+                # 去除文史汇总和理工汇总
+                if line[0] == "文史汇总" or line[0] == "理工汇总":
+                    continue
+                # 上海地区表头有不同
+                if district == "上海":
+                    table_content_yixue.append([line[0], line[1], line[5]])
                 else:
-                    all_lines_benbu = all_lines[:index]
-                    all_lines_yixue = all_lines[index:]
-                for line in all_lines_benbu[1:-1]:
-                    # 去除文史汇总和理工汇总
-                    if line[0] == "文史汇总" or line[0] == "理工汇总":
-                        continue
-                    # 上海地区表头有不同
-                    if district == "上海":
-                        table_content_benbu.append([line[0], line[1], line[5]])
-                    else:
-                        table_content_benbu.append([line[0], line[1], line[3]])
-                if len(all_lines_yixue) != 0:
-                    for line in all_lines_yixue[1:-1]:
-                        # 去除文史汇总和理工汇总
-                        if line[0] == "文史汇总" or line[0] == "理工汇总":
-                            continue
-                        # 上海地区表头有不同
-                        if district == "上海":
-                            table_content_yixue.append([line[0], line[1], line[5]])
-                        else:
-                            table_content_yixue.append([line[0], line[1], line[3]])
-            mylogger.debug("本部招生计划：")
-            for line in table_content_benbu:
-                mylogger.debug(str(line))
-            mylogger.debug("医学院招生计划：")
-            for line in table_content_yixue:
-                mylogger.debug(str(line))
-            write_table(file_path_benbu, table_name, table_head, table_content_benbu)
-            mylogger.info("本部" + year + district + "的招生计划已存入文件")
-            if len(table_content_yixue) != 0:
-                write_table(file_path_yixue, table_name, table_head, table_content_yixue)
-                mylogger.info("医学院" + year + district + "的招生计划已存入文件")
+                    table_content_yixue.append([line[0], line[1], line[3]])
+    mylogger.debug("本部招生计划：")
+    for line in table_content_benbu:
+        mylogger.debug(str(line))
+    mylogger.debug("医学院招生计划：")
+    for line in table_content_yixue:
+        mylogger.debug(str(line))
+    write_table(meta["file_path_benbu"], table_name, table_head, table_content_benbu)
+    mylogger.info("本部" + year + district + "的招生计划已存入文件")
+    if len(table_content_yixue) != 0:
+        write_table(meta["file_path_yixue"], table_name, table_head, table_content_yixue)
+        mylogger.info("医学院" + year + district + "的招生计划已存入文件")
 
 
 if __name__ == "__main__":
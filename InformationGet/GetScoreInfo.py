@@ -6,16 +6,18 @@
 @Desc  : 获取各学校录取分数信息
 """
 
-import requests
 from bs4 import BeautifulSoup
 import re
 from FileRead.FileNameRead import read_all_file_list
 from FileRead.XLSRead import read_xls
 from FileRead.PDFRead import read_pdf_to_tables
-from InformationGet.InternetConnect import request_url
-from Log.Logger import MyLog
+from LazyLoad.LazyImport import lazy_import
+from Log.Logger import MyLog, get_logger
 import sys
 
+# 异步爬虫引擎依赖aiohttp，只在使用时导入（其它学校的爬虫不需要）
+crawl_engine = lazy_import("InformationGet.CrawlEngine")
+
 
 # 将表内容写入文本文件
 def write_table(file_path, table_name, table_head, table_content):
@@ -29,154 +31,166 @@ def write_table(file_path, table_name, table_head, table_content):
             file.write("\n")
 
 
-# 哈尔滨工业大学录取分数
-def get_score_info_hit():
-    main_url = "http://zsb.hit.edu.cn/information/score"
-    # 获取分类信息
-    main_page_source = requests.get(main_url).text
-    main_page_soup = BeautifulSoup(main_page_source, "lxml")
-    main_page_soup.prettify()
+# 哈尔滨工业大学录取分数（使用异步爬虫引擎并发获取各年份、各省份的页面）
+def get_score_info_hit(base_url="http://zsb.hit.edu.cn", file_path="Information/九校联盟/哈尔滨工业大学/录取分数",
+                       engine=None):
+    """
+    哈尔滨工业大学录取分数
+    :param base_url: 网站地址（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(base_url + "/information/score", handle_score_main_page_hit, {"file_path": file_path})
+    return engine.run()
+
+
+# 哈尔滨工业大学录取分数主页：解析省份与年份，添加各年份、各省份的页面
+def handle_score_main_page_hit(engine, url, page_source, meta):
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     # 招生计划省份
     province = []
     for item in main_page_soup.find(class_="province").find_all(name='a'):
         province.append(item.string.strip())
-    # print(province)
     # 招生计划年份
     years = []
     for item in main_page_soup.find_all(class_="year-select"):
         years.append(item.string.strip())
-    # print(years)
-
     # 对每年份各省数据进行抽取
     for pro in province:
         for year in years:
-            print("获取", year, pro, "的录取分数")
-            # 构造链接
-            specific_url = main_url + "?" + "year=" + year + "&" + "province=" + pro
-            page_source = requests.get(specific_url).text
-            page_soup = BeautifulSoup(page_source, "lxml")
-            page_soup.prettify()
-            # 表名
-            table_name = year + "-" + pro + "-" + "major"
-            print("表名:", table_name)
-            # 表头
-            table_head = []
-            for item in page_soup.find(class_="info_table").thead.find_all(name="td"):
-                table_head.append(item.string.strip())
-            print("表头:", table_head)
-            # 表内容
-            table_content = []
-            for item in page_soup.find(class_="info_table").tbody.find_all(name="tr"):
-                temp = []
-                for sub_item in item.find_all(name="td"):
-                    temp.append(sub_item.string.strip())
-                table_content.append(temp)
-            # 去除统计部分的数据项、无数据的项
-            for item in table_content:
-                if item[1] == "统计":
-                    table_content.remove(item)
-            for item in table_content:
-                print(item)
-            # 将表内容写入文本文件
-            file_path = "Information/九校联盟/哈尔滨工业大学/录取分数"
-            write_table(file_path, table_name, table_head, table_content)
-            print(year, pro, "的录取分数已存入文件")
+            specific_url = url + "?" + "year=" + year + "&" + "province=" + pro
+            engine.add(specific_url, handle_score_page_hit, {"file_path": meta["file_path"], "year": year, "pro": pro})
+
+
+# 哈尔滨工业大学某年份、某省份的录取分数页面
+def handle_score_page_hit(engine, url, page_source, meta):
+    page_soup = BeautifulSoup(page_source, "lxml")
+    # 表名
+    table_name = meta["year"] + "-" + meta["pro"] + "-" + "major"
+    # 表头
+    table_head = []
+    for item in page_soup.find(class_="info_table").thead.find_all(name="td"):
+        table_head.append(item.string.strip())
+    # 表内容
+    table_content = []
+    for item in page_soup.find(class_="info_table").tbody.find_all(name="tr"):
+        temp = []
+        for sub_item in item.find_all(name="td"):
+            temp.append(sub_item.string.strip())
+        # 去除统计部分的数据项
+        if len(temp) > 1 and temp[1] == "统计":
+            continue
+        table_content.append(temp)
+    # 将表内容写入文本文件
+    write_table(meta["file_path"], table_name, table_head, table_content)
 
 
 # 北京大学录取分数(省份录取信息，没有专业分数)
-def get_score_info_pku():
-    main_url = "http://www.gotopku.cn/programa/admitline/7"
-    # 获取分类信息
-    main_page_source = requests.get(main_url).text
-    main_page_soup = BeautifulSoup(main_page_source, "lxml")
-    main_page_soup.prettify()
+def get_score_info_pku(main_url="http://www.gotopku.cn/programa/admitline/7",
+                       file_path="Information/九校联盟/北京大学/录取分数", engine=None):
+    """
+    北京大学录取分数（使用异步爬虫引擎并发获取各年份的页面）
+    :param main_url: 录取分数主页（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(main_url, handle_score_main_page_pku, {"file_path": file_path})
+    return engine.run()
+
+
+# 北京大学录取分数主页：解析年份，添加各年份的页面
+def handle_score_main_page_pku(engine, url, page_source, meta):
+    mylogger = get_logger("handle_score_main_page_pku")
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     # 招生计划年份
     years = []
     for item in main_page_soup.find(class_="lqlist").find_all(name='a'):
         years.append(item.string.strip())
-    print(years)
-
+    mylogger.debug("年份%s", years)
     for year in years:
         # 构造链接
-        specific_url = main_url + "/" + year
-        page_source = requests.get(specific_url).text
-        page_soup = BeautifulSoup(page_source, "lxml")
-        page_soup.prettify()
+        engine.add(url + "/" + year, handle_score_page_pku, dict(meta, year=year))
 
-        # 表名
-        table_name = year + "-" + "pro"
-        table_content = []
-        print("表名:", table_name)
-        # 表内容(原表)
-        source_table_content = []
-        for item in page_soup.find(class_="lqtable").find_all(name="td"):
-            source_table_content.append(item.string)
-        # 表头
-        table_head = ["地区", "批次", "类别", "分数线"]
-        print("表头:", table_head)
-        source_table_content = source_table_content[5:]
-        for i in range(0, len(source_table_content), 5):
-            temp = []
-            for j in range(5):
-                if source_table_content[i + j] is None:
-                    temp.append("-")
-                    continue
-                temp.append(source_table_content[i + j])
-            table_content.append(temp)
-        # 表项分项处理
-        temp_table_content = []
-        for item in table_content:
-            # 跳过空项
-            if item[2] == "-" and item[3] == "-" and item[4] == "-":
-                continue
-            # 特殊批次（其它分数线）
-            if item[2] == "-" and item[3] == "-" and item[4] != "-":
-                # 地区、批次、类别、分数线
-                temp_item = [item[0], item[1], "其它", item[4]]
-                temp_table_content.append(temp_item)
+
+# 北京大学某年份的录取分数页面
+def handle_score_page_pku(engine, url, page_source, meta):
+    page_soup = BeautifulSoup(page_source, "lxml")
+    # 表名
+    table_name = meta["year"] + "-" + "pro"
+    table_content = []
+    # 表内容(原表)
+    source_table_content = []
+    for item in page_soup.find(class_="lqtable").find_all(name="td"):
+        source_table_content.append(item.string)
+    # 表头
+    table_head = ["地区", "批次", "类别", "分数线"]
+    source_table_content = source_table_content[5:]
+    for i in range(0, len(source_table_content), 5):
+        temp = []
+        for j in range(5):
+            if source_table_content[i + j] is None:
+                temp.append("-")
                 continue
-            # 文理分开
-            if item[2] != "-":
-                # 文科
-                temp_item = [item[0], item[1], "文史", item[2]]
-                temp_table_content.append(temp_item)
-            if item[3] != "-":
-                # 理科
-                temp_item = [item[0], item[1], "理工", item[3]]
-                temp_table_content.append(temp_item)
-        # 设置批次
-        for i in range(len(temp_table_content)):
-            if temp_table_content[i][1] == "-":
-                temp_table_content[i][1] = "一批"
-        table_content = temp_table_content
-        for item in table_content:
-            print(item)
-        # 将表内容写入文本文件
-        file_path = "Information/九校联盟/北京大学/录取分数"
-        write_table(file_path, table_name, table_head, table_content)
+            temp.append(source_table_content[i + j])
+        table_content.append(temp)
+    # 表项分项处理
+    temp_table_content = []
+    for item in table_content:
+        # 跳过空项
+        if item[2] == "-" and item[3] == "-" and item[4] == "-":
+            continue
+        # 特殊批次（其它分数线）
+        if item[2] == "-" and item[3] == "-" and item[4] != "-":
+            # 地区、批次、类别、分数线
+            temp_item = [item[0], item[1], "其它", item[4]]
+            temp_table_content.append(temp_item)
+            continue
+        # 文理分开
+        if item[2] != "-":
+            # 文科
+            temp_item = [item[0], item[1], "文史", item[2]]
+            temp_table_content.append(temp_item)
+        if item[3] != "-":
+            # 理科
+            temp_item = [item[0], item[1], "理工", item[3]]
+            temp_table_content.append(temp_item)
+    # 设置批次
+    for i in range(len(temp_table_content)):
+        if temp_table_content[i][1] == "-":
+            temp_table_content[i][1] = "一批"
+    table_content = temp_table_content
+    # 将表内容写入文本文件
+    write_table(meta["file_path"], table_name, table_head, table_content)
 
 
 # 北京大学医学部录取分数
-def get_score_info_pkuhsc():
-    main_url = "http://jiaoyuchu.bjmu.edu.cn/zsjy/zsgz/lnfs"
-    page_urls = ["194116", "187052", "183832", "176388"]
-    file_path = "Information/九校联盟/北京大学医学部/录取分数"
-
+def get_score_info_pkuhsc(main_url="http://jiaoyuchu.bjmu.edu.cn/zsjy/zsgz/lnfs",
+                          file_path="Information/九校联盟/北京大学医学部/录取分数", engine=None):
+    """
+    北京大学医学部录取分数（各年份的表格式不同，使用异步爬虫引擎并发获取各年份的页面，分别处理）
+    :param main_url: 录取分数主页（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
     # 各年录取分数表
-    # get_score_info_pkuhsc_table_2017(main_url, page_urls[0], file_path)
-    # get_score_info_pkuhsc_table_2016(main_url, page_urls[1], file_path)
-    # get_score_info_pkuhsc_table_2015(main_url, page_urls[2], file_path)
-    # get_score_info_pkuhsc_table_2014(main_url, page_urls[3], file_path)
+    page_handlers = [("194116", handle_score_pkuhsc_table_2017), ("187052", handle_score_pkuhsc_table_2016),
+                     ("183832", handle_score_pkuhsc_table_2015), ("176388", handle_score_pkuhsc_table_2014)]
+    for page_url, handler in page_handlers:
+        engine.add(main_url + "/" + page_url, handler, {"file_path": file_path, "encoding": "utf-8"})
+    return engine.run()
 
 
 # 北大医学部2017年表
-def get_score_info_pkuhsc_table_2017(main_url, url, file_path):
+def handle_score_pkuhsc_table_2017(engine, url, page_source, meta):
+    file_path = meta["file_path"]
     # 表1
-    specific_url = main_url + "/" + url
-    page_source = requests.get(specific_url)
-    page_source.encoding = "utf-8"
-    page_soup = BeautifulSoup(page_source.text, "lxml")
-    page_soup.prettify()
+    page_soup = BeautifulSoup(page_source, "lxml")
     # # 表名
     # table_name = page_soup.find(class_="bt1").text
     # print("表名", table_name)
@@ -232,13 +246,10 @@ def get_score_info_pkuhsc_table_2017(main_url, url, file_path):
 
 
 # 北大医学部2016年表
-def get_score_info_pkuhsc_table_2016(main_url, url, file_path):
+def handle_score_pkuhsc_table_2016(engine, url, page_source, meta):
+    file_path = meta["file_path"]
     # 表1
-    specific_url = main_url + "/" + url
-    page_source = requests.get(specific_url)
-    page_source.encoding = "utf-8"
-    page_soup = BeautifulSoup(page_source.text, "lxml")
-    page_soup.prettify()
+    page_soup = BeautifulSoup(page_source, "lxml")
     # 表名
     # table_name = page_soup.find(class_="bt1").text
     # print("表名", table_name)
@@ -356,13 +367,10 @@ def get_score_info_pkuhsc_table_2016(main_url, url, file_path):
 
 
 # 北大医学部2015年表
-def get_score_info_pkuhsc_table_2015(main_url, url, file_path):
+def handle_score_pkuhsc_table_2015(engine, url, page_source, meta):
+    file_path = meta["file_path"]
     # 表1
-    specific_url = main_url + "/" + url
-    page_source = requests.get(specific_url)
-    page_source.encoding = "utf-8"
-    page_soup = BeautifulSoup(page_source.text, "lxml")
-    page_soup.prettify()
+    page_soup = BeautifulSoup(page_source, "lxml")
     # 表名
     table_name = page_soup.find(class_="bt1").text
     print("表名", table_name)
@@ -491,13 +499,10 @@ def get_score_info_pkuhsc_table_2015(main_url, url, file_path):
 
 
 # 北大医学部2014年表
-def get_score_info_pkuhsc_table_2014(main_url, url, file_path):
+def handle_score_pkuhsc_table_2014(engine, url, page_source, meta):
+    file_path = meta["file_path"]
     # 表1
-    specific_url = main_url + "/" + url
-    page_source = requests.get(specific_url)
-    page_source.encoding = "utf-8"
-    page_soup = BeautifulSoup(page_source.text, "lxml")
-    page_soup.prettify()
+    page_soup = BeautifulSoup(page_source, "lxml")
     # 表名
     # table_name = page_soup.find(class_="bt1").text
     # print("表名", table_name)
@@ -1370,17 +1375,26 @@ def get_score_info_nju():
 
 
 # 西安交通大学录取分数
-def get_score_info_xjtu():
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_path = "Information/九校联盟/西安交通大学/录取分数"
-
-    # 直接从官网进行数据查询，使用form提交
-    # 获取可查询的年份和地区
-    main_url = "http://zs.xjtu.edu.cn/bkscx/lnlqcx.htm"
-    main_page_source = request_url(main_url)
-    main_page_source.encoding = main_page_source.apparent_encoding
-    main_page_soup = BeautifulSoup(main_page_source.text, "lxml")
-    main_page_soup.prettify()
+def get_score_info_xjtu(main_url="http://zs.xjtu.edu.cn/bkscx/lnlqcx.htm",
+                        search_url="http://zs.xjtu.edu.cn/lnlqjg.jsp?wbtreeid=1167",
+                        file_path="Information/九校联盟/西安交通大学/录取分数", engine=None):
+    """
+    西安交通大学录取分数：直接从官网进行数据查询，使用form提交（使用异步爬虫引擎并发查询各年份、各地区）
+    :param main_url: 查询主页（可替换为本地测试服务器）
+    :param search_url: 查询表单提交地址
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(main_url, handle_score_main_page_xjtu, {"file_path": file_path, "search_url": search_url})
+    return engine.run()
+
+
+# 西安交通大学录取分数查询主页：获取可查询的年份和地区，提交各年份、各地区的查询
+def handle_score_main_page_xjtu(engine, url, page_source, meta):
+    mylogger = get_logger("handle_score_main_page_xjtu")
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     years = []
     districts = []
     for year in main_page_soup.find("select", id="nf").find_all("option"):
@@ -1389,8 +1403,6 @@ def get_score_info_xjtu():
         districts.append(district.string)
     mylogger.debug("可查询的年份" + str(years))
     mylogger.debug("可查询的省份" + str(districts))
-
-    search_url = "http://zs.xjtu.edu.cn/lnlqjg.jsp?wbtreeid=1167"
     for year in years:
         # pro_table_name = year + "-" + "pro"
         # pro_table_head = ["地区", "批次", "类别", "分数线"]
@@ -1403,99 +1415,110 @@ def get_score_info_xjtu():
                 "x": "27",
                 "y": "11"
             }
-            return_html = requests.post(search_url, data=params)
-            return_soup = BeautifulSoup(return_html.text, "lxml")
-            return_soup.prettify()
-            all_lines = []
-            for tr in return_soup.find("div", id="fybt").find_all("tr"):
-                line = []
-                for td in tr:
-                    if td.string != "\n":
-                        line.append(str(td.string).strip())
-                all_lines.append(line)
-            major_table_name = year + "-" + district[:-1] + "-major"
-            major_table_head = ["专业", "类别", "最高分", "平均分", "最低分", "人数"]
-            major_table_content = []
-            for line in all_lines[2:]:
-                major_table_content.append([line[0], "-", line[1], line[2], line[3], "-"])
-            mylogger.debug(major_table_name)
-            mylogger.debug(str(major_table_head))
-            for line in major_table_content:
-                mylogger.debug(str(line))
-            write_table(file_path, major_table_name, major_table_head, major_table_content)
-            mylogger.info(year + "的录取分数已存入文件")
+            engine.add(meta["search_url"], handle_score_page_xjtu,
+                       {"file_path": meta["file_path"], "year": year, "district": district}, data=params)
+
+
+# 西安交通大学某年份、某地区的录取分数查询结果
+def handle_score_page_xjtu(engine, url, page_source, meta):
+    mylogger = get_logger("handle_score_page_xjtu")
+    year = meta["year"]
+    district = meta["district"]
+    return_soup = BeautifulSoup(page_source, "lxml")
+    all_lines = []
+    for tr in return_soup.find("div", id="fybt").find_all("tr"):
+        line = []
+        for td in tr:
+            if td.string != "\n":
+                line.append(str(td.string).strip())
+        all_lines.append(line)
+    major_table_name = year + "-" + district[:-1] + "-major"
+    major_table_head = ["专业", "类别", "最高分", "平均分", "最低分", "人数"]
+    major_table_content = []
+    for line in all_lines[2:]:
+        major_table_content.append([line[0], "-", line[1], line[2], line[3], "-"])
+    mylogger.debug(major_table_name)
+    mylogger.debug(str(major_table_head))
+    for line in major_table_content:
+        mylogger.debug(str(line))
+    write_table(meta["file_path"], major_table_name, major_table_head, major_table_content)
+    mylogger.info(year + district + "的录取分数已存入文件")
 
 
 # 浙江大学录取分数
-def get_score_info_zju():
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_path = "Information/九校联盟/浙江大学/录取分数"
-
-    main_url = "http://zdzsc.zju.edu.cn"
-    # 获取分类信息
-    main_page_source = request_url(main_url + "/3303/list.htm")
-    main_page_source.encoding = main_page_source.apparent_encoding
-    main_page_soup = BeautifulSoup(main_page_source.text, "lxml")
-    main_page_soup.prettify()
+def get_score_info_zju(main_url="http://zdzsc.zju.edu.cn", file_path="Information/九校联盟/浙江大学/录取分数",
+                       engine=None):
+    """
+    浙江大学录取分数（使用异步爬虫引擎并发获取各年份的页面）
+    :param main_url: 网站地址（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(main_url + "/3303/list.htm", handle_score_main_page_zju, {"main_url": main_url, "file_path": file_path})
+    return engine.run()
+
+
+# 浙江大学录取分数列表页：添加各年份的页面
+def handle_score_main_page_zju(engine, url, page_source, meta):
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     for item in main_page_soup.find("div", id="wp_news_w5").find_all("a"):
         page_url = item["href"]
-        year = re.findall("\d{4}", item["title"])[0]
-        page_source = request_url(main_url + page_url)
-        page_source.encoding = page_source.apparent_encoding
-        page_soup = BeautifulSoup(page_source.text, "lxml")
-        page_soup.prettify()
-        table_name = year + "-pro"
-        table_head = ["地区", "批次", "类别", "分数线"]
-        mylogger.debug(table_name)
-        mylogger.debug(str(table_head))
-        all_lines = []
-        for tr in page_soup.find("div", class_="wp_articlecontent").find_all("tr"):
-            line = []
-            for td in tr:
-                line.append(td.text)
-            all_lines.append(line)
-        table_content = []
-        for line in all_lines[1:]:
-            if line[1] != "/":
-                table_content.append([line[0], "一批", "理工", line[1]])
-            if line[2] != "/":
-                table_content.append([line[0], "一批", "文史", line[2]])
-            if line[3] != "/":
-                table_content.append([line[0], "一批", "医药", line[3]])
-        for line in table_content:
-            mylogger.debug(str(line))
-        write_table(file_path, table_name, table_head, table_content)
-        mylogger.info(year + "的录取分数已存入文件")
+        year = re.findall(r"\d{4}", item["title"])[0]
+        engine.add(meta["main_url"] + page_url, handle_score_page_zju, dict(meta, year=year))
+
+
+# 浙江大学某年份的录取分数页面
+def handle_score_page_zju(engine, url, page_source, meta):
+    mylogger = get_logger("handle_score_page_zju")
+    year = meta["year"]
+    page_soup = BeautifulSoup(page_source, "lxml")
+    table_name = year + "-pro"
+    table_head = ["地区", "批次", "类别", "分数线"]
+    mylogger.debug(table_name)
+    mylogger.debug(str(table_head))
+    all_lines = []
+    for tr in page_soup.find("div", class_="wp_articlecontent").find_all("tr"):
+        line = []
+        for td in tr:
+            line.append(td.text)
+        all_lines.append(line)
+    table_content = []
+    for line in all_lines[1:]:
+        if line[1] != "/":
+            table_content.append([line[0], "一批", "理工", line[1]])
+        if line[2] != "/":
+            table_content.append([line[0], "一批", "文史", line[2]])
+        if line[3] != "/":
+            table_content.append([line[0], "一批", "医药", line[3]])
+    for line in table_content:
+        mylogger.debug(str(line))
+    write_table(meta["file_path"], table_name, table_head, table_content)
+    mylogger.info(year + "的录取分数已存入文件")
 
 
 # 中国科学技术大学录取分数
-def get_score_info_utsc():
+def get_score_info_utsc(main_url="https://zsb.ustc.edu.cn", file_path="Information/九校联盟/中国科学技术大学/录取分数",
+                        engine=None):
+    """
+    中国科学技术大学录取分数（使用异步爬虫引擎并发获取各地区的页面）
+    各地区页面为该地区历年的分数，全部页面获取完成后按年份重新组织表格写入文本文件
+    :param main_url: 网站地址（可替换为本地测试服务器）
+    :param file_path: 文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
     mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_path = "Information/九校联盟/中国科学技术大学/录取分数"
-    main_url = "https://zsb.ustc.edu.cn"
-    # 获取分类信息
-    main_page_source = request_url(main_url + "/12994/list.htm")
-    main_page_source.encoding = main_page_source.apparent_encoding
-    main_page_soup = BeautifulSoup(main_page_source.text, "lxml")
-    main_page_soup.prettify()
-    all_tables = []  # 保存所有地区的分数情况
-    for area in main_page_soup.find_all("area"):
-        page_url = area["href"]
-        page_source = request_url(page_url)
-        page_source.encoding = page_source.apparent_encoding
-        page_soup = BeautifulSoup(page_source.text, "lxml")
-        page_soup.prettify()
-        title = page_soup.find("h1", class_="arti_title").string
-        district = title[:-6]
-
-        all_lines = []
-        for tr in page_soup.find("div", class_="wp_articlecontent").find_all("tr"):
-            line = []
-            for td in tr:
-                line.append(td.text)
-            all_lines.append(line)
-        all_tables.append([district, all_lines])
-
+    engine = engine or crawl_engine.CrawlEngine()
+    # 保存所有地区的分数情况：地图中的序号 -> [地区, 表格各行]
+    all_tables = {}
+    engine.add(main_url + "/12994/list.htm", handle_score_main_page_ustc, {"all_tables": all_tables})
+    stats = engine.run()
+    all_tables = [all_tables[i_area] for i_area in sorted(all_tables)]
+    if not all_tables:
+        mylogger.warning("没有获取到各地区的录取分数")
+        return stats
     # 按年份重新组织表格
     for i_year in range(1, len(all_tables[0][1])):
         year = all_tables[0][1][i_year][0]
@@ -1510,21 +1533,55 @@ def get_score_info_utsc():
         for line in table_content:
             mylogger.debug(str(line))
         write_table(file_path, table_name, table_head, table_content)
-        mylogger.info(year + district + "的招生计划已存入文件")
+        mylogger.info(year + "的录取分数已存入文件")
+    return stats
+
+
+# 中国科学技术大学录取分数主页：添加地图中各地区的页面
+def handle_score_main_page_ustc(engine, url, page_source, meta):
+    main_page_soup = BeautifulSoup(page_source, "lxml")
+    for i_area, area in enumerate(main_page_soup.find_all("area")):
+        engine.add(area["href"], handle_score_page_ustc, dict(meta, i_area=i_area))
+
+
+# 中国科学技术大学某地区的录取分数页面
+def handle_score_page_ustc(engine, url, page_source, meta):
+    page_soup = BeautifulSoup(page_source, "lxml")
+    title = page_soup.find("h1", class_="arti_title").string
+    district = title[:-6]
+    all_lines = []
+    for tr in page_soup.find("div", class_="wp_articlecontent").find_all("tr"):
+        line = []
+        for td in tr:
+            line.append(td.text)
+        all_lines.append(line)
+    meta["all_tables"][meta["i_area"]] = [district, all_lines]
 
 
 # 复旦大学录取分数
-def get_score_info_fudan():
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_path_benbu = "Information/九校联盟/复旦大学/录取分数"
-    file_path_yixue = "Information/九校联盟/复旦大学上海医学部/录取分数"
-    # 直接从官网进行数据查询，使用form提交
-    # 获取可查询的年份和地区
-    main_url = "http://www.ao.fudan.edu.cn/index!scores.html"
-    main_page_source = request_url(main_url)
-    main_page_source.encoding = main_page_source.apparent_encoding
-    main_page_soup = BeautifulSoup(main_page_source.text, "lxml")
-    main_page_soup.prettify()
+def get_score_info_fudan(main_url="http://www.ao.fudan.edu.cn/index!scores.html",
+                         search_url="http://www.ao.fudan.edu.cn/index!scores.action",
+                         file_path_benbu="Information/九校联盟/复旦大学/录取分数",
+                         file_path_yixue="Information/九校联盟/复旦大学上海医学部/录取分数", engine=None):
+    """
+    复旦大学录取分数：直接从官网进行数据查询，使用form提交（使用异步爬虫引擎并发查询各年份、各地区）
+    :param main_url: 查询主页（可替换为本地测试服务器）
+    :param search_url: 查询表单提交地址
+    :param file_path_benbu: 本部文本文件存放目录
+    :param file_path_yixue: 上海医学部文本文件存放目录
+    :param engine: 爬虫引擎，为None时使用默认配置
+    :return: 爬虫引擎统计信息
+    """
+    engine = engine or crawl_engine.CrawlEngine()
+    engine.add(main_url, handle_score_main_page_fudan,
+               {"search_url": search_url, "file_path_benbu": file_path_benbu, "file_path_yixue": file_path_yixue})
+    return engine.run()
+
+
+# 复旦大学录取分数查询主页：获取可查询的年份和地区，提交各年份、各地区的查询
+def handle_score_main_page_fudan(engine, url, page_source, meta):
+    mylogger = get_logger("handle_score_main_page_fudan")
+    main_page_soup = BeautifulSoup(page_source, "lxml")
     years = []
     districts = []
     for year in main_page_soup.find("select", id="nf").find_all("option"):
@@ -1533,7 +1590,6 @@ def get_score_info_fudan():
         districts.append(district.string)
     mylogger.debug("可查询的年份" + str(years))
     mylogger.debug("可查询的省份" + str(districts))
-    search_url = "http://www.ao.fudan.edu.cn/index!scores.action"
     # 2006-2015年有数据
     for year in years:
         for district in districts:
@@ -1542,69 +1598,76 @@ def get_score_info_fudan():
                 "nf": year,
                 "ss": district
             }
-            return_html = requests.post(search_url, data=params)
-            return_soup = BeautifulSoup(return_html.text, "lxml")
-            return_soup.prettify()
-            all_lines = []
-            for div in return_soup.find_all("div", class_="inquirytable_result"):
-                for tr in div.find_all("tr"):
-                    line = []
-                    for td in tr:
-                        if td.string != "\n":
-                            line.append(str(td.string).strip())
-                    all_lines.append(line)
-            table_name = year + "-" + district + "-major"
-            table_head = ["专业", "类别", "最高分", "平均分", "最低分", "人数"]
-            mylogger.debug(table_name)
-            mylogger.debug(str(table_head))
-            # 数据查询为空
-            if len(all_lines) < 2:
+            engine.add(meta["search_url"], handle_score_page_fudan, dict(meta, year=year, district=district),
+                       data=params)
+
+
+# 复旦大学某年份、某地区的录取分数查询结果
+def handle_score_page_fudan(engine, url, page_source, meta):
+    mylogger = get_logger("handle_score_page_fudan")
+    year = meta["year"]
+    district = meta["district"]
+    return_soup = BeautifulSoup(page_source, "lxml")
+    all_lines = []
+    for div in return_soup.find_all("div", class_="inquirytable_result"):
+        for tr in div.find_all("tr"):
+            line = []
+            for td in tr:
+                if td.string != "\n":
+                    line.append(str(td.string).strip())
+            all_lines.append(line)
+    table_name = year + "-" + district + "-major"
+    table_head = ["专业", "类别", "最高分", "平均分", "最低分", "人数"]
+    mylogger.debug(table_name)
+    mylogger.debug(str(table_head))
+    # 数据查询为空
+    if len(all_lines) < 2:
+        return
+    # 开始提取数据
+    table_content_benbu = []
+    table_content_yixue = []
+    # 2013年开始复旦大学与复旦大学上海医学部分开招生
+    if int(year) < 2013:
+        for line in all_lines[1:-1]:
+            # 去除文史汇总和理工汇总
+            if line[0] == "文史汇总" or line[0] == "理工汇总":
                 continue
-            # 开始提取数据
-            table_content_benbu = []
-            table_content_yixue = []
-            # 2013年开始复旦大学与复旦大学上海医学部分开招生
-            if int(year) < 2013:
-                for line in all_lines[1:-1]:
-                    # 去除文史汇总和理工汇总
-                    if line[0] == "文史汇总" or line[0] == "理工汇总":
-                        continue
-                    table_content_benbu.append([line[1], line[0], line[2],line[4],line[3],"-"])
-            else:
-                # 先将本部和医学院的数据分开
-                index = 0
-                for i_line in range(1, len(all_lines)):
-                    if all_lines[i_line][0] == "科类":
-                        index = i_line
-                        break
-                if index == 0:
-                    all_lines_benbu = all_lines
-                    all_lines_yixue = []
-                else:
-                    all_lines_benbu = all_lines[:index]
-                    all_lines_yixue = all_lines[index:]
-                for line in all_lines_benbu[1:-1]:
-                    # 去除文史汇总和理工汇总
-                    if line[0] == "文史汇总" or line[0] == "理工汇总":
-                        continue
-                    table_content_benbu.append([line[1], line[0], line[2],line[4],line[3],"-"])
-                if len(all_lines_yixue)!=0:
-                    for line in all_lines_yixue[1:-1]:
-                        # 去除文史汇总和理工汇总
-                        if line[0] == "文史汇总" or line[0] == "理工汇总":
-                            continue
-                        table_content_yixue.append([line[1], line[0], line[2], line[4], line[3], "-"])
-            mylogger.debug("本部招生计划：")
-            for line in table_content_benbu:
-                mylogger.debug(str(line))
-            mylogger.debug("医学院招生计划：")
-            for line in table_content_yixue:
-                mylogger.debug(str(line))
-            write_table(file_path_benbu, table_name, table_head, table_content_benbu)
-            mylogger.info("本部" + year + district + "的招生计划已存入文件")
-            if len(table_content_yixue) != 0:
-                write_table(file_path_yixue, table_name, table_head, table_content_yixue)
-                mylogger.info("医学院" + year + district + "的招生计划已存入文件")
+            table_content_benbu.append([line[1], line[0], line[2], line[4], line[3], "-"])
+    else:
+        # 先将本部和医学院的数据分开
+        index = 0
+        for i_line in range(1, len(all_lines)):
+            if all_lines[i_line][0] == "科类":
+                index = i_line
+                break
+        if index == 0:
+            all_lines_benbu = all_lines
+            all_lines_yixue = []
+        else:
+            all_lines_benbu = all_lines[:index]
+            all_lines_yixue = all_lines[index:]
+        for line in all_lines_benbu[1:-1]:
+            # 去除文史汇总和理工汇总
+            if line[0] == "文史汇总" or line[0] == "理工汇总":
+                continue
+            table_content_benbu.append([line[1], line[0], line[2], line[4], line[3], "-"])
+        if len(all_lines_yixue) != 0:
+            for line in all_lines_yixue[1:-1]:
+                # 去除文史汇总和理工汇总
+                if line[0] == "文史汇总" or line[0] == "理工汇总":
+                    continue
+                table_content_yixue.append([line[1], line[0], line[2], line[4], line[3], "-"])
+    mylogger.debug("本部招生计划：")
+    for line in table_content_benbu:
+        mylogger.debug(str(line))
+    mylogger.debug("医学院招生计划：")
+    for line in table_content_yixue:
+        mylogger.debug(str(line))
+    write_table(meta["file_path_benbu"], table_name, table_head, table_content_benbu)
+    mylogger.info("本部" + year + district + "的招生计划已存入文件")
+    if len(table_content_yixue) != 0:
+        write_table(meta["file_path_yixue"], table_name, table_head, table_content_yixue)
+        mylogger.info("医学院" + year + district + "的招生计划已存入文件")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : HttpCache.py
+@Author: SangYu
+@Date  : 2019/5/19 9:40
+@Desc  : 爬虫HTTP缓存：复用连接的会话（每个线程一个连接池），磁盘响应缓存（页面内容按摘要存放，相同内容只存一份），
+使用ETag/Last-Modified条件请求，页面未变化时不重新下载；离线模式只从缓存读取，便于开发解析代码时回放
+离线模式可使用环境变量开启：QA_CRAWL_OFFLINE=1
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+
+from Log.Logger import get_logger
+from Monitor.Metrics import cache_access
+
+# 缓存配置
+# cache_dir: 缓存目录（objects为页面内容，index为各链接的响应信息）
+# offline: 离线模式，只从缓存读取
+# timeout: 请求超时时间(s)
+cache_config = {
+    "cache_dir": "Information/http_cache",
+    "offline": os.environ.get("QA_CRAWL_OFFLINE", "0") == "1",
+    "timeout": 30,
+}
+# 缓存的响应头
+cached_header_names = ("Content-Type", "ETag", "Last-Modified")
+
+_local = threading.local()
+
+
+class CacheMissError(Exception):
+    """
+    离线模式下缓存中没有该链接
+    """
+    pass
+
+
+# 设置缓存配置
+def set_http_cache(cache_dir: str = None, offline: bool = None, timeout: float = None):
+    if cache_dir is not None:
+        cache_config["cache_dir"] = cache_dir
+    if offline is not None:
+        cache_config["offline"] = offline
+    if timeout is not None:
+        cache_config["timeout"] = timeout
+
+
+# 获取当前线程的会话
+def get_session() -> requests.Session:
+    """
+    获取当前线程的会话（requests.Session不保证线程安全，每个线程一个会话），会话保持连接并对连接错误与服务器错误重试
+    :return: 会话
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        # 重试用尽后返回最后一次的5xx响应（由调用方按状态码处理），不抛出RetryError
+        retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _local.session = session
+    return session
+
+
+# 链接的响应信息文件路径
+def index_path(url: str) -> str:
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_config["cache_dir"], "index", digest[:2], digest + ".json")
+
+
+# 页面内容文件路径
+def object_path(digest: str) -> str:
+    return os.path.join(cache_config["cache_dir"], "objects", digest[:2], digest)
+
+
+# 写文件（先写临时文件再替换）
+def write_file_atomic(file_path: str, data: bytes):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = "%s.%d.%d.tmp" % (file_path, os.getpid(), threading.get_ident())
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, file_path)
+
+
+# 读取链接的缓存
+def load_cache_entry(url: str):
+    """
+    读取链接的缓存
+    :param url: 链接
+    :return: (响应信息, 页面内容)，没有缓存或缓存不完整时返回(None, None)
+    """
+    try:
+        with open(index_path(url), "r", encoding="utf-8") as index_file:
+            entry = json.load(index_file)
+        with open(object_path(entry["digest"]), "rb") as object_file:
+            return entry, object_file.read()
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+# 保存链接的缓存
+def save_cache_entry(url: str, response: requests.Response) -> dict:
+    """
+    保存链接的缓存：页面内容按sha1摘要存放，响应信息记录摘要、状态码、部分响应头与获取时间
+    :param url: 链接
+    :param response: 响应
+    :return: 响应信息
+    """
+    return store_cache_entry(url, response.url, response.status_code, response.headers, response.content)
+
+
+# 保存链接的缓存（与HTTP客户端无关，异步爬虫引擎同样使用）
+def store_cache_entry(url: str, final_url: str, status: int, headers, body: bytes) -> dict:
+    """
+    保存链接的缓存
+    :param url: 链接
+    :param final_url: 重定向后的链接
+    :param status: 状态码
+    :param headers: 响应头（不区分大小写的映射）
+    :param body: 页面内容
+    :return: 响应信息
+    """
+    digest = hashlib.sha1(body).hexdigest()
+    if not os.path.exists(object_path(digest)):
+        write_file_atomic(object_path(digest), body)
+    entry = {"url": url, "final_url": final_url, "status": status, "digest": digest,
+             "headers": {name: headers[name] for name in cached_header_names if name in headers},
+             "fetch_time": time.time()}
+    write_file_atomic(index_path(url), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+    return entry
+
+
+# 刷新链接缓存的获取时间（服务器返回304时）
+def refresh_cache_entry(url: str, entry: dict):
+    entry["fetch_time"] = time.time()
+    write_file_atomic(index_path(url), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+
+# 由缓存构造条件请求头
+def conditional_headers(entry: dict) -> dict:
+    """
+    由缓存构造条件请求头（If-None-Match/If-Modified-Since）
+    :param entry: 响应信息，为None时返回空字典
+    :return: 条件请求头
+    """
+    headers = {}
+    if entry is not None:
+        if "ETag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+    return headers
+
+
+# 识别页面编码
+def detect_encoding(headers, body: bytes) -> str:
+    """
+    识别页面编码：优先使用Content-Type中的charset，没有时按内容识别（与requests的apparent_encoding相同）
+    :param headers: 响应头（不区分大小写的映射）
+    :param body: 页面内容
+    :return: 编码
+    """
+    headers = CaseInsensitiveDict(headers)
+    if "charset" in headers.get("Content-Type", "").lower():
+        return get_encoding_from_headers(headers)
+    return chardet.detect(body)["encoding"] or "utf-8"
+
+
+# 由缓存构造响应
+def build_cached_response(entry: dict, body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response._content = body
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.url = entry.get("final_url") or entry["url"]
+    response.encoding = get_encoding_from_headers(response.headers)
+    return response
+
+
+# 获取页面（带缓存）
+def cached_get(url: str, headers: dict = None, offline: bool = None, max_age: float = 0) -> requests.Response:
+    """
+    获取页面：有缓存时发送条件请求，服务器返回304则使用缓存；只缓存状态码为200的响应
+    :param url: 链接
+    :param headers: 请求头
+    :param offline: 是否离线（只从缓存读取），为None时使用缓存配置
+    :param max_age: 缓存获取时间在max_age(s)以内时直接使用缓存，不发送请求
+    :return: 响应（来自缓存时同样可使用text、content、encoding、apparent_encoding等）
+    """
+    function_logger = get_logger("cached_get")
+    if offline is None:
+        offline = cache_config["offline"]
+    entry, body = load_cache_entry(url)
+    if offline:
+        cache_access("http", entry is not None)
+        if entry is None:
+            raise CacheMissError("离线模式下缓存中没有%s" % url)
+        return build_cached_response(entry, body)
+    if entry is not None and time.time() - entry["fetch_time"] < max_age:
+        cache_access("http", True)
+        return build_cached_response(entry, body)
+    request_headers = dict(headers or {})
+    request_headers.update(conditional_headers(entry))
+    response = get_session().get(url, headers=request_headers, timeout=cache_config["timeout"])
+    if response.status_code == 304 and entry is not None:
+        cache_access("http", True)
+        function_logger.debug("%s未变化，使用缓存", url)
+        refresh_cache_entry(url, entry)
+        return build_cached_response(entry, body)
+    cache_access("http", False)
+    if response.status_code == 200:
+        save_cache_entry(url, response)
+    return response
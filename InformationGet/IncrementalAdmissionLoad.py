@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : IncrementalAdmissionLoad.py
+@Author: SangYu
+@Date  : 2019/5/18 10:30
+@Desc  : 招生数据增量导入：在数据目录中保存源文档清单（路径、大小、修改时间、内容摘要），只重新解析、写入变化的文档，
+删除已移除文档的数据，并将变更通知下游（回调函数与变更记录文件）
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+
+from InformationGet import MysqlOperation
+from InformationGet.InsertAdmissionData import admission_data_root, admission_table_info, \
+    admission_file_name_pattern, iter_admission_files, ensure_natural_key_index, write_admission_files
+from Log.Logger import MyLog, get_logger
+
+# 源文档清单与变更记录文件名（保存在招生数据根目录下）
+manifest_file_name = "manifest.json"
+change_feed_file_name = "change_feed.jsonl"
+# 变更回调函数列表，每次导入完成后以变更列表调用
+change_listeners = []
+
+
+# 添加变更回调函数
+def add_change_listener(listener):
+    """
+    添加变更回调函数（如答案缓存、列存快照、专业词典的刷新函数）
+    :param listener: 函数(变更列表)，变更格式见incremental_load_admission_data
+    :return:
+    """
+    if listener not in change_listeners:
+        change_listeners.append(listener)
+
+
+# 移除变更回调函数
+def remove_change_listener(listener):
+    if listener in change_listeners:
+        change_listeners.remove(listener)
+
+
+# 计算文档内容摘要
+def file_content_hash(file_path: str) -> str:
+    """
+    计算文档内容摘要（分块读取）
+    :param file_path: 文档路径
+    :return: sha1摘要
+    """
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+# 读取源文档清单
+def load_manifest(manifest_path: str) -> dict:
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+
+# 保存源文档清单
+def save_manifest(manifest: dict, manifest_path: str):
+    """
+    保存源文档清单（先写临时文件再替换，中断时不会留下不完整的清单）
+    :param manifest: 源文档清单
+    :param manifest_path: 清单文件路径
+    :return:
+    """
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+# 构造源文档清单
+def build_manifest(root: str = admission_data_root, schools: list = None, tables: list = None,
+                   old_manifest: dict = None) -> dict:
+    """
+    构造源文档清单，大小与修改时间均未变化的文档沿用原清单中的摘要，不重新读取
+    :param root: 招生数据根目录
+    :param schools: 学校列表，为None时包含根目录下所有学校
+    :param tables: 数据表列表，为None时包含所有数据表
+    :param old_manifest: 原清单
+    :return: 相对路径 -> {"table": 数据表名, "school": 学校, "size": 大小, "mtime": 修改时间(ns), "hash": 摘要}
+    """
+    old_manifest = old_manifest or {}
+    manifest = {}
+    for table, school, file_path in iter_admission_files(root, schools, tables):
+        relative_path = os.path.relpath(file_path, root).replace(os.sep, "/")
+        file_stat = os.stat(file_path)
+        old_entry = old_manifest.get(relative_path)
+        if old_entry and old_entry["size"] == file_stat.st_size and old_entry["mtime"] == file_stat.st_mtime_ns:
+            digest = old_entry["hash"]
+        else:
+            digest = file_content_hash(file_path)
+        manifest[relative_path] = {"table": table, "school": school, "size": file_stat.st_size,
+                                   "mtime": file_stat.st_mtime_ns, "hash": digest}
+    return manifest
+
+
+# 文档数据在数据表中的范围
+def file_scope(table: str, school: str, file_path: str):
+    """
+    文档数据在数据表中的范围：招生计划、各专业录取分数文档为(数据表, 学校, 年份, 地区)；
+    各省份录取分数文档中地区为每行的列，同一年份可能有多个文档，范围为(数据表, 学校, 年份, None)
+    :param table: 数据表名
+    :param school: 学校
+    :param file_path: 文档路径
+    :return: 范围元组，文档名不合法时返回None
+    """
+    match = admission_file_name_pattern.match(os.path.basename(file_path.replace("\\", "/")))
+    if match is None:
+        return None
+    if table == "admission_score_pro":
+        return table, school, int(match.group(1)), None
+    if not match.group(2):
+        return None
+    return table, school, int(match.group(1)), match.group(2)
+
+
+# 删除范围内的数据
+# noinspection SqlResolve
+def delete_scope_rows(mycursor, scope: tuple) -> int:
+    """
+    删除范围内的数据
+    :param mycursor: 数据库游标
+    :param scope: 范围元组，见file_scope
+    :return: 删除的行数
+    """
+    table, school, year, district = scope
+    sql_string = "DELETE FROM " + table + " WHERE school = %s AND year = %s"
+    params = [school, year]
+    if district is not None:
+        sql_string += " AND district = %s"
+        params.append(district)
+    mycursor.execute(sql_string, params)
+    return mycursor.rowcount
+
+
+# 发布变更
+def publish_changes(changes: list, root: str = admission_data_root):
+    """
+    发布变更：追加到变更记录文件（每行一个json），并调用所有变更回调函数（回调出错只记录日志）
+    :param changes: 变更列表
+    :param root: 招生数据根目录
+    :return:
+    """
+    function_logger = get_logger("publish_changes")
+    if not changes:
+        return
+    with open(os.path.join(root, change_feed_file_name), "a", encoding="utf-8") as feed_file:
+        for change in changes:
+            feed_file.write(json.dumps(change, ensure_ascii=False) + "\n")
+    for listener in list(change_listeners):
+        try:
+            listener(changes)
+        except Exception:
+            function_logger.exception("变更回调函数%r出错", listener)
+
+
+# 增量导入招生数据
+def incremental_load_admission_data(root: str = admission_data_root, schools: list = None, tables: list = None,
+                                    force: bool = False, batch_size: int = 1000, processes: int = 0,
+                                    queue_size: int = 16) -> list:
+    """
+    增量导入招生数据：与源文档清单比较，找出新增、内容变化与移除的文档，在一个事务中删除其范围内的数据，
+    再重新解析、写入范围内现有的文档；提交后更新清单并发布变更
+    有文档解析失败时回滚，排除该文档所在的范围后重新导入：该范围内的原有数据保持不变，清单中保留原记录，下次导入时重试
+    :param root: 招生数据根目录
+    :param schools: 学校列表，为None时导入根目录下所有学校
+    :param tables: 数据表列表，为None时导入所有数据表
+    :param force: 是否忽略清单，重新导入范围内的所有文档
+    :param batch_size: 每条INSERT语句写入的行数
+    :param processes: 解析进程数，为None时使用CPU核数，为0时在当前进程中解析（变化的文档通常较少）
+    :param queue_size: 已解析未写入的文档数上限
+    :return: 变更列表，每项为{"time": 时间, "table": 数据表名, "school": 学校, "year": 年份, "district": 地区或None,
+             "action": "update"或"delete", "files": 范围内现有的文档, "deleted_rows": 重新写入前删除的行数}
+    """
+    function_logger = get_logger("incremental_load_admission_data")
+    tables = tables or list(admission_table_info)
+    start_time = time.time()
+    manifest_path = os.path.join(root, manifest_file_name)
+    old_manifest = load_manifest(manifest_path)
+
+    # 只比较本次导入的学校与数据表
+    def in_range(entry):
+        return entry["table"] in tables and (schools is None or entry["school"] in schools)
+
+    old_entries = {path: entry for path, entry in old_manifest.items() if in_range(entry)}
+    new_entries = build_manifest(root, schools, tables, None if force else old_entries)
+    changed_paths = sorted(path for path, entry in new_entries.items() if force or path not in old_entries or
+                           old_entries[path]["hash"] != entry["hash"])
+    removed_paths = sorted(path for path in old_entries if path not in new_entries)
+    function_logger.info("文档%d个，变化%d个，移除%d个", len(new_entries), len(changed_paths), len(removed_paths))
+
+    # 范围 -> 范围内现有的文档
+    scope_files = {}
+    for path, entry in sorted(new_entries.items()):
+        scope_files.setdefault(file_scope(entry["table"], entry["school"], path), []).append(path)
+    affected_scopes = set()
+    for path in changed_paths:
+        affected_scopes.add(file_scope(new_entries[path]["table"], new_entries[path]["school"], path))
+    for path in removed_paths:
+        affected_scopes.add(file_scope(old_entries[path]["table"], old_entries[path]["school"], path))
+    # 文档名不合法的文档没有范围，只重新解析（解析时报告错误），不删除数据
+    invalid_paths = [path for path in changed_paths if path in scope_files.get(None, [])]
+    affected_scopes.discard(None)
+    affected_scopes = sorted(affected_scopes, key=lambda item: (item[0], item[1], item[2], item[3] or ""))
+
+    # 解析失败的文档：其范围内的数据不删除、不重新写入，清单中保留原记录，下次导入时重试
+    failed_paths = set()
+    changes = []
+    if affected_scopes or invalid_paths:
+        mydb = MysqlOperation.connect_mysql_with_db("university_admission")
+        mycursor = mydb.cursor()
+        # 添加索引为DDL语句，会隐式提交，需在事务开始前执行
+        for table in tables:
+            ensure_natural_key_index(mycursor, table)
+        try:
+            while True:
+                skipped_scopes = {file_scope(new_entries[path]["table"], new_entries[path]["school"], path)
+                                  for path in failed_paths}
+                load_scopes = [scope for scope in affected_scopes if scope not in skipped_scopes]
+                task_paths = [path for scope in load_scopes for path in scope_files.get(scope, [])] + \
+                             [path for path in invalid_paths if path not in failed_paths]
+                full_paths = {os.path.join(root, path): path for path in task_paths}
+                tasks = [(new_entries[path]["table"], new_entries[path]["school"], full_path)
+                         for full_path, path in full_paths.items()]
+                deleted_rows = {scope: delete_scope_rows(mycursor, scope) for scope in load_scopes}
+                stats = write_admission_files(mycursor, tasks, tables, True, batch_size, processes, queue_size)
+                new_failed_paths = {full_paths[full_path] for table_stats in stats.values()
+                                    for full_path in table_stats["failed_paths"]}
+                if not new_failed_paths - failed_paths:
+                    break
+                # 有文档解析失败时回滚已删除的数据，排除其范围后重新导入
+                mydb.rollback()
+                failed_paths |= new_failed_paths
+                function_logger.warning("文档解析失败，保留其范围内的原有数据：%s", sorted(new_failed_paths))
+            mydb.commit()
+        except Exception:
+            mydb.rollback()
+            raise
+        finally:
+            mydb.close()
+        now_time = time.strftime("%Y-%m-%d %H:%M:%S")
+        for scope in load_scopes:
+            table, school, year, district = scope
+            changes.append({"time": now_time, "table": table, "school": school, "year": year, "district": district,
+                            "action": "update" if scope in scope_files else "delete",
+                            "files": scope_files.get(scope, []), "deleted_rows": deleted_rows[scope]})
+        # 未导入范围内的文档（包括移除的文档）在清单中保留原记录
+        skipped_scopes.discard(None)
+        for path in list(new_entries):
+            entry = new_entries[path]
+            if path in failed_paths or file_scope(entry["table"], entry["school"], path) in skipped_scopes:
+                if path in old_entries:
+                    new_entries[path] = old_entries[path]
+                else:
+                    del new_entries[path]
+        for path in removed_paths:
+            if file_scope(old_entries[path]["table"], old_entries[path]["school"], path) in skipped_scopes:
+                new_entries[path] = old_entries[path]
+    # 清单中保留本次未导入的学校与数据表
+    manifest = {path: entry for path, entry in old_manifest.items() if not in_range(entry)}
+    manifest.update(new_entries)
+    if manifest != old_manifest:
+        save_manifest(manifest, manifest_path)
+    publish_changes(changes, root)
+    function_logger.info("增量导入完成，变更范围%d个，耗时%.2fs", len(changes), time.time() - start_time)
+    return changes
+
+
+if __name__ == "__main__":
+    main_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    main_logger.info("begin...")
+    for main_change in incremental_load_admission_data():
+        main_logger.info("%s\t%s\t%s\t%s\t%s", main_change["action"], main_change["table"], main_change["school"],
+                         main_change["year"], main_change["district"])
+    main_logger.info("end...")
@@ -7,10 +7,36 @@
 """
 from InformationGet import MysqlOperation
 from FileRead.FileNameRead import read_all_file_list
-from Log.Logger import MyLog
+from Log.Logger import MyLog, get_logger
+from collections import deque
+from multiprocessing import Pool
+import os
+import re
 import sys
 import time
 
+# 招生数据根目录（按学校分目录，每个学校下有招生计划、录取分数两个目录）
+admission_data_root = "Information/九校联盟"
+# 各数据表的列（与文档构造的元组顺序一致）与自然键（唯一确定一条记录的列）
+admission_table_info = {
+    "admission_plan": {"columns": ("school", "district", "year", "major", "classy", "numbers"),
+                       "key": ("school", "district", "year", "major", "classy")},
+    "admission_score_major": {"columns": ("school", "district", "year", "major", "classy", "highest", "average",
+                                          "lowest", "amount"),
+                              "key": ("school", "district", "year", "major", "classy")},
+    "admission_score_pro": {"columns": ("school", "year", "district", "batch", "classy", "line"),
+                            "key": ("school", "year", "district", "batch", "classy")},
+}
+# 各数据表文档的列数（不含由文件名得到的学校、年份、地区）
+admission_doc_column_count = {"admission_plan": 3, "admission_score_major": 6, "admission_score_pro": 4}
+# 各数据表文档中的数值列（文档内的列序号，不含由文件名得到的列）
+admission_doc_numeric_columns = {"admission_plan": (2,), "admission_score_major": (2, 3, 4, 5),
+                                 "admission_score_pro": (3,)}
+# 文档中表示缺失值的字段
+admission_doc_missing_values = ("-", "")
+# 文档名格式：招生计划为年份-地区，录取分数（各专业）为年份-地区-major，录取分数（各省份）为年份-pro或年份-...-pro
+admission_file_name_pattern = re.compile(r"^(\d{4})(?:-([^-]+))?")
+
 
 # 读取文档内容
 def read_file_content(file_path):
@@ -18,189 +44,318 @@ def read_file_content(file_path):
         return file.readlines()
 
 
+# 将文档中的数值字段转换为数值
+def parse_admission_number(value: str):
+    """
+    将文档中的数值字段转换为数值
+    :param value: 字段字符串
+    :return: 整数或小数，缺失值（“-”或空）返回None；不是数值时抛出ValueError
+    """
+    value = value.strip()
+    if value in admission_doc_missing_values:
+        return None
+    number = float(value)
+    return int(number) if number.is_integer() and "." not in value else number
+
+
+# 流式读取招生数据文档并校验，生成表项
+def iter_admission_doc_rows(table: str, file_path: str, school: str):
+    """
+    流式读取招生数据文档（每行只读取、切分一次）并校验，生成表项元组
+    文档名不以年份开头（招生计划、各专业录取分数文档还需包含地区）或文档为空时抛出ValueError；
+    列数不符或数值列不是数值的行记录日志后跳过，招生计划中的“无数据”行跳过
+    :param table: 数据表名
+    :param file_path: 文档路径
+    :param school: 学校名
+    :return: 表项元组生成器（列顺序与admission_table_info一致，年份与数值列为int/float，缺失值“-”为None）
+    """
+    function_logger = get_logger("iter_admission_doc_rows")
+    file_name = os.path.basename(file_path.replace("\\", "/"))
+    match = admission_file_name_pattern.match(file_name)
+    if match is None or (table != "admission_score_pro" and not match.group(2)):
+        raise ValueError("文档名%s不符合“年份-地区”格式" % file_name)
+    year = int(match.group(1))
+    district = match.group(2)
+    column_count = admission_doc_column_count[table]
+    numeric_columns = admission_doc_numeric_columns[table]
+    with open(file_path, "r", encoding="utf-8") as file:
+        # 第一行为表头
+        if not file.readline():
+            raise ValueError("文档%s为空" % file_path)
+        for line_number, line in enumerate(file, 2):
+            line = line.strip()
+            if not line:
+                continue
+            item = [field.strip() for field in line.split("\t")]
+            # 去除无数据的项
+            if table == "admission_plan" and item[0] == "无数据":
+                continue
+            if len(item) != column_count:
+                function_logger.warning("%s第%d行列数为%d（应为%d），已跳过", file_path, line_number, len(item),
+                                        column_count)
+                continue
+            try:
+                for i_column in numeric_columns:
+                    item[i_column] = parse_admission_number(item[i_column])
+            except ValueError:
+                function_logger.warning("%s第%d行数值列不是数值：%s，已跳过", file_path, line_number, line)
+                continue
+            # 非数值列的缺失值同样记为None
+            item = [None if field in admission_doc_missing_values else field for field in item]
+            if table == "admission_plan":
+                major, classy, numbers = item
+                yield school, district, year, major, classy, numbers
+            elif table == "admission_score_major":
+                major, classy, highest, average, lowest, amount = item
+                yield school, district, year, major, classy, highest, average, lowest, amount
+            else:
+                # 分省份文档中地区为每行第一列
+                district, batch, classy, line = item
+                yield school, year, district, batch, classy, line
+
+
 # 获取招生计划文档构造表项列表
 def plan_doc_to_mysql_table_tuple(file_path, school):
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    mylogger.info("插入文件" + file_path)
-    file_content = read_file_content(file_path)
-    file_name = file_path.split("\\")[-1]
-    year = file_name.split("-")[0]
-    district = file_name.split("-")[1]
-    # mylogger.debug("年份：" + year + "地区：" + district)
-    table_content = []
-    for i in range(len(file_content)):
-        file_content[i] = file_content[i].strip()
-        temp = file_content[i].split("\t")
-        table_content.append(temp)
-    table_head = table_content[0]
-    # mylogger.debug("表头：" + str(table_head))
-    table_content = table_content[1:]
-    # 去除统计部分的数据项、无数据的项
-    for item in table_content:
-        if item[0] == "无数据":
-            table_content.remove(item)
-        # elif item[1] == "统计":
-        #     table_content.remove(item)
-    mysql_content = []
-    for item in table_content:
-        major = item[0]
-        classy = item[1]
-        numbers = item[2]
-        temp = (school, district, year, major, classy, numbers)
-        mysql_content.append(temp)
-    # mylogger.debug("构造后的数据表项如下：")
-    # for item in mysql_content:
-    #     mylogger.debug(str(item))
-    return mysql_content
-
-
-# 插入数据库表admission_plan(一张表)
-def insert_table_admission_plan(mysql_tuple_list):
-    db_name = "university_admission"
-    mydb = MysqlOperation.connect_mysql_with_db(db_name)
-    mycursor = mydb.cursor()
-    sql_string = "INSERT INTO admission_plan(school,district,year,major,classy,numbers) " \
-                 "VALUES (%s,%s,%s,%s,%s,%s)"
-    mycursor.executemany(sql_string, mysql_tuple_list)
-    mydb.commit()
+    mylogger = get_logger("plan_doc_to_mysql_table_tuple")
+    mylogger.info("插入文件%s", file_path)
+    return list(iter_admission_doc_rows("admission_plan", file_path, school))
 
 
 # 插入所有学校的数据
 def insert_all_school_table_admission_plan():
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    c9 = ["北京大学", "清华大学", "复旦大学", "上海交通大学", "浙江大学",
-          "南京大学", "中国科学技术大学", "哈尔滨工业大学", "西安交通大学",
-          "北京大学医学部", "上海交通大学医学部", "复旦大学上海医学部"]
     already_get = ["南京大学"]
-    for school in already_get:
-        mylogger.info("开始插入" + school + "的招生计划数据...")
-        dir_path = "Information/九校联盟/" + school + "/招生计划"
-        file_list = read_all_file_list(dir_path)
-        for file in file_list:
-            mylogger.info("构造数据项元组...")
-            mysql_content = plan_doc_to_mysql_table_tuple(file, school)
-            mylogger.info("将元组数据插入数据库...")
-            insert_table_admission_plan(mysql_content)
-            mylogger.info("元组数据插入完成!")
-        time.sleep(5)
+    return bulk_load_admission_data(schools=already_get, tables=["admission_plan"])
 
 
 # 获取录取分数（各专业）文档构造表项列表
 def score_major_doc_to_mysql_table_tuple(file_path, school):
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_content = read_file_content(file_path)
-    file_name = file_path.split("\\")[-1]
-    year = file_name.split("-")[0]
-    district = file_name.split("-")[1]
-    table_format = file_name.split("-")[-1]
-    # mylogger.debug("年份：" + year + "地区：" + district + "表类型：" + table_format)
-    table_content = []
-    for i in range(len(file_content)):
-        file_content[i] = file_content[i].strip().replace("-", "NULL")
-        temp = file_content[i].split("\t")
-        table_content.append(temp)
-    table_head = table_content[0]
-    # mylogger.debug("表头：" + str(table_head))
-    table_content = table_content[1:]
-    # # 去除统计部分的数据项、无数据的项
-    # for item in table_content:
-    #     if item[0] == "无数据":
-    #         table_content.remove(item)
-    #     elif item[1] == "统计":
-    #         table_content.remove(item)
-    mysql_content = []
-    for item in table_content:
-        major = item[0]
-        classy = item[1]
-        highest = item[2]
-        average = item[3]
-        lowest = item[4]
-        amount = item[5]
-        temp = (school, district, year, major, classy, highest, average, lowest, amount)
-        mysql_content.append(temp)
-    # for item in mysql_content:
-    #     print(item)
-    return mysql_content
-
-
-# 插入数据库表admission_score_major(一张表)
-def insert_table_admission_score_major(mysql_tuple_list):
-    db_name = "university_admission"
-    mydb = MysqlOperation.connect_mysql_with_db(db_name)
-    mycursor = mydb.cursor()
-    sql_string = "INSERT INTO admission_score_major(school,district,year,major,classy,highest,average,lowest,amount) " \
-                 "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)"
-    mycursor.executemany(sql_string, mysql_tuple_list)
-    mydb.commit()
+    return list(iter_admission_doc_rows("admission_score_major", file_path, school))
 
 
 # 获取录取分数（各省份）文档构造表项列表
 def score_pro_doc_to_mysql_table_tuple(file_path, school):
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    file_content = read_file_content(file_path)
-    file_name = file_path.split("\\")[-1]
-    year = file_name.split("-")[0]
-    table_format = file_name.split("-")[-1]
-    # mylogger.debug("年份：" + year + "表类型：" + table_format)
-    table_content = []
-    for i in range(len(file_content)):
-        file_content[i] = file_content[i].strip().replace("-", "NULL")
-        temp = file_content[i].split("\t")
-        table_content.append(temp)
-    table_head = table_content[0]
-    # mylogger.debug("表头：" + str(table_head))
-    table_content = table_content[1:]
-    mysql_content = []
-    for item in table_content:
-        district = item[0]
-        batch = item[1]
-        classy = item[2]
-        line = item[3]
-        temp = (school, year, district, batch, classy, line)
-        mysql_content.append(temp)
-    # for item in mysql_content:
-    #     print(item)
-    return mysql_content
-
-
-# 插入数据库表admission_score_pro(一张表)
-def insert_table_admission_score_pro(mysql_tuple_list):
-    db_name = "university_admission"
-    mydb = MysqlOperation.connect_mysql_with_db(db_name)
-    mycursor = mydb.cursor()
-    sql_string = "INSERT INTO admission_score_pro(school,year,district,batch,classy,line) " \
-                 "VALUES (%s,%s,%s,%s,%s,%s)"
-    mycursor.executemany(sql_string, mysql_tuple_list)
-    mydb.commit()
+    return list(iter_admission_doc_rows("admission_score_pro", file_path, school))
 
 
 # 插入所有学校的数据(录取分数，分专业和分省份)
 def insert_all_school_table_admission_score():
-    mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    c9 = ["北京大学", "清华大学", "复旦大学", "上海交通大学", "浙江大学",
-          "南京大学", "中国科学技术大学", "哈尔滨工业大学", "西安交通大学",
-          "北京大学医学部", "上海交通大学医学部", "复旦大学上海医学部"]
     already_get = ["复旦大学", "复旦大学上海医学部"]
-    for school in already_get:
-        dir_path = "Information/九校联盟/" + school + "/录取分数"
-        file_list = read_all_file_list(dir_path)
-        for file in file_list:
-            table_format = file.split("-")[-1]
-            if table_format == "major":
-                mysql_content = score_major_doc_to_mysql_table_tuple(file, school)
-                insert_table_admission_score_major(mysql_content)
-            elif table_format == "pro":
-                mysql_content = score_pro_doc_to_mysql_table_tuple(file, school)
-                insert_table_admission_score_pro(mysql_content)
-            # for item in mysql_content:
-            #     mylogger.debug(str(item))
+    return bulk_load_admission_data(schools=already_get, tables=["admission_score_major", "admission_score_pro"])
+
+
+# 遍历所有学校的招生数据文档
+def iter_admission_files(root: str = admission_data_root, schools: list = None, tables: list = None):
+    """
+    遍历所有学校的招生数据文档
+    :param root: 招生数据根目录
+    :param schools: 学校列表，为None时遍历根目录下所有学校
+    :param tables: 数据表列表，为None时遍历所有数据表
+    :return: (数据表名, 学校, 文档路径)生成器
+    """
+    tables = tables or list(admission_table_info)
+    if schools is None:
+        schools = sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+    for school in schools:
+        if "admission_plan" in tables:
+            dir_path = os.path.join(root, school, "招生计划")
+            if os.path.isdir(dir_path):
+                for file in sorted(read_all_file_list(dir_path)):
+                    yield "admission_plan", school, file
+        dir_path = os.path.join(root, school, "录取分数")
+        if os.path.isdir(dir_path):
+            for file in sorted(read_all_file_list(dir_path)):
+                table_format = file.split("-")[-1]
+                if table_format == "major" and "admission_score_major" in tables:
+                    yield "admission_score_major", school, file
+                elif table_format == "pro" and "admission_score_pro" in tables:
+                    yield "admission_score_pro", school, file
+
+
+# 解析一个招生数据文档（多进程解析的工作函数）
+def parse_admission_file(task: tuple) -> tuple:
+    """
+    解析一个招生数据文档，文档不合法时返回错误信息而不抛出异常
+    :param task: (数据表名, 学校, 文档路径)
+    :return: (数据表名, 学校, 文档路径, 表项列表, 错误信息或None)
+    """
+    table, school, file_path = task
+    try:
+        return table, school, file_path, list(iter_admission_doc_rows(table, file_path, school)), None
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return table, school, file_path, [], "%s: %s" % (type(e).__name__, e)
+
+
+# 多进程解析招生数据文档
+def parse_admission_files_parallel(tasks: list, processes: int = None, queue_size: int = 16):
+    """
+    多进程解析招生数据文档，按文档顺序生成解析结果；已提交未取走的文档最多queue_size个，
+    写入方处理结果时工作进程继续解析后续文档，解析与写入并行且内存占用有界
+    :param tasks: (数据表名, 学校, 文档路径)列表
+    :param processes: 进程数，为None时使用CPU核数，为0时在当前进程中解析
+    :param queue_size: 已提交未取走的文档数上限
+    :return: parse_admission_file返回值的生成器
+    """
+    if processes == 0:
+        for task in tasks:
+            yield parse_admission_file(task)
+        return
+    with Pool(processes) as pool:
+        pending = deque()
+        for task in tasks:
+            if len(pending) >= queue_size:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(parse_admission_file, (task,)))
+        while pending:
+            yield pending.popleft().get()
+
+
+# 为数据表添加自然键唯一索引
+# noinspection SqlResolve
+def ensure_natural_key_index(mycursor, table: str):
+    """
+    为数据表添加自然键唯一索引（已存在则跳过），添加前删除已有的重复记录（保留id最小的一条）
+    :param mycursor: 数据库游标
+    :param table: 数据表名
+    :return:
+    """
+    function_logger = get_logger("ensure_natural_key_index")
+    index_name = "uk_" + table
+    key = admission_table_info[table]["key"]
+    mycursor.execute("SHOW INDEX FROM " + table + " WHERE Key_name = %s", (index_name,))
+    if mycursor.fetchall():
+        return
+    condition = " AND ".join("t1.%s <=> t2.%s" % (column, column) for column in key)
+    mycursor.execute("DELETE t1 FROM %s t1 JOIN %s t2 ON %s AND t1.id > t2.id" % (table, table, condition))
+    function_logger.info("%s表删除重复记录%d条", table, mycursor.rowcount)
+    mycursor.execute("ALTER TABLE %s ADD UNIQUE INDEX %s (%s)" % (table, index_name, ", ".join(key)))
+    function_logger.info("%s表已添加唯一索引%s", table, index_name)
+
+
+# 多行批量写入（插入或更新）
+def bulk_upsert_rows(mycursor, table: str, rows: list, batch_size: int = 1000, upsert: bool = True) -> int:
+    """
+    使用多行INSERT语句批量写入，自然键重复时更新其余列（upsert）或跳过
+    :param mycursor: 数据库游标
+    :param table: 数据表名
+    :param rows: 表项元组列表（列顺序与admission_table_info一致）
+    :param batch_size: 每条INSERT语句写入的行数
+    :param upsert: True时自然键重复则更新，False时跳过
+    :return: 受影响的行数（MySQL中更新的行计2）
+    """
+    columns = admission_table_info[table]["columns"]
+    key = admission_table_info[table]["key"]
+    row_placeholder = "(" + ",".join(["%s"] * len(columns)) + ")"
+    if upsert:
+        sql_head = "INSERT INTO "
+        sql_tail = " ON DUPLICATE KEY UPDATE " + ",".join("%s=VALUES(%s)" % (column, column)
+                                                          for column in columns if column not in key)
+    else:
+        sql_head = "INSERT IGNORE INTO "
+        sql_tail = ""
+    affected_count = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        sql_string = "%s%s(%s) VALUES %s%s" % (sql_head, table, ",".join(columns),
+                                               ",".join([row_placeholder] * len(batch)), sql_tail)
+        mycursor.execute(sql_string, [value for row in batch for value in row])
+        affected_count += mycursor.rowcount
+    return affected_count
+
+
+# 解析招生数据文档并批量写入
+def write_admission_files(mycursor, tasks: list, tables: list, upsert: bool = True, batch_size: int = 1000,
+                          processes: int = None, queue_size: int = 16) -> dict:
+    """
+    多进程解析招生数据文档，解析结果按自然键去重后多行批量写入（解析与写入并行，不提交事务）
+    重复的表项以后读取的为准：upsert时按批写入，后写入的批次覆盖先写入的；不upsert时INSERT IGNORE会保留先写入的表项，
+    因此在整个导入中去重，全部解析完成后再写入
+    :param mycursor: 数据库游标
+    :param tasks: (数据表名, 学校, 文档路径)列表
+    :param tables: 数据表列表
+    :param upsert: True时已存在的记录更新为文档中的值，False时跳过已存在的记录
+    :param batch_size: 每条INSERT语句写入的行数
+    :param processes: 解析进程数，为None时使用CPU核数，为0时在当前进程中解析
+    :param queue_size: 已解析未写入的文档数上限
+    :return: 数据表名 -> {"files": 文档数, "failed": 不合法的文档数, "failed_paths": 不合法的文档路径列表,
+                         "rows": 文档中的表项数, "written": 去重后写入的表项数, "affected": 受影响的行数}
+    """
+    function_logger = get_logger("write_admission_files")
+    stats = {table: {"files": 0, "failed": 0, "failed_paths": [], "rows": 0, "written": 0, "affected": 0}
+             for table in tables}
+    key_index = {table: [admission_table_info[table]["columns"].index(column)
+                         for column in admission_table_info[table]["key"]] for table in tables}
+    # 待写入的表项：自然键 -> 表项，重复的表项以后读取的为准
+    pending_rows = {table: {} for table in tables}
+
+    # 写入一个数据表的待写入表项
+    def flush_rows(flush_table):
+        rows = list(pending_rows[flush_table].values())
+        pending_rows[flush_table].clear()
+        stats[flush_table]["written"] += len(rows)
+        stats[flush_table]["affected"] += bulk_upsert_rows(mycursor, flush_table, rows, batch_size, upsert)
+
+    for table, school, file_path, rows, error in parse_admission_files_parallel(tasks, processes, queue_size):
+        if error is not None:
+            stats[table]["failed"] += 1
+            stats[table]["failed_paths"].append(file_path)
+            function_logger.warning("文档%s不合法，已跳过：%s", file_path, error)
+            continue
+        stats[table]["files"] += 1
+        stats[table]["rows"] += len(rows)
+        table_rows = pending_rows[table]
+        for row in rows:
+            table_rows[tuple(str(row[index]) for index in key_index[table])] = row
+        if upsert and len(table_rows) >= batch_size:
+            flush_rows(table)
+    for table in tables:
+        flush_rows(table)
+        function_logger.info("%s表：文档%d个（不合法%d个），表项%d条，写入%d条，受影响%d行", table,
+                             stats[table]["files"], stats[table]["failed"], stats[table]["rows"],
+                             stats[table]["written"], stats[table]["affected"])
+    return stats
+
+
+# 批量、幂等地导入招生数据
+def bulk_load_admission_data(root: str = admission_data_root, schools: list = None, tables: list = None,
+                             upsert: bool = True, batch_size: int = 1000, processes: int = None,
+                             queue_size: int = 16) -> dict:
+    """
+    批量导入招生数据：多进程解析所有学校的文档，解析结果按自然键去重后，使用一个连接、在一个事务中多行批量写入，
+    解析与写入并行；自然键上有唯一索引，重复导入不会产生重复记录
+    :param root: 招生数据根目录
+    :param schools: 学校列表，为None时导入根目录下所有学校
+    :param tables: 数据表列表，为None时导入所有数据表
+    :param upsert: True时已存在的记录更新为文档中的值，False时跳过已存在的记录
+    :param batch_size: 每条INSERT语句写入的行数
+    :param processes: 解析进程数，为None时使用CPU核数，为0时在当前进程中解析
+    :param queue_size: 已解析未写入的文档数上限
+    :return: 同write_admission_files
+    """
+    function_logger = get_logger("bulk_load_admission_data")
+    tables = tables or list(admission_table_info)
+    start_time = time.time()
+    tasks = list(iter_admission_files(root, schools, tables))
+    function_logger.info("共%d个文档", len(tasks))
+    mydb = MysqlOperation.connect_mysql_with_db("university_admission")
+    mycursor = mydb.cursor()
+    # 添加索引为DDL语句，会隐式提交，需在事务开始前执行
+    for table in tables:
+        ensure_natural_key_index(mycursor, table)
+    try:
+        stats = write_admission_files(mycursor, tasks, tables, upsert, batch_size, processes, queue_size)
+        mydb.commit()
+    except Exception:
+        mydb.rollback()
+        raise
+    finally:
+        mydb.close()
+    function_logger.info("招生数据导入完成，耗时%.2fs", time.time() - start_time)
+    return stats
 
 
 if __name__ == "__main__":
     mylogger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
     mylogger.info("begin...")
-    mylogger.info("插入所有学校的招生计划数据...")
-    insert_all_school_table_admission_plan()
-    mylogger.info("插入所有学校的录取分数数据...")
-    # insert_all_school_table_admission_score()
+    mylogger.info("插入所有学校的招生数据...")
+    bulk_load_admission_data()
     mylogger.info("end...")
@@ -5,11 +5,19 @@
 @Date  : 2019/3/4 9:24
 @Desc  : 爬虫时网络连接
 """
-import requests
 import random
+import threading
 import time
+from contextlib import contextmanager
+from queue import Queue, Empty
 
+from bs4 import BeautifulSoup
 from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
+
+from InformationGet.HttpCache import cached_get
 
 
 # 返回一个随机的请求头 headers
@@ -107,16 +115,20 @@ def get_headers():
     ]
     user_agent_list = user_agent_list_1 + user_agent_list_2 + user_agent_list_3
     UserAgent = random.choice(user_agent_list)
-    headers = {'User-Agent': UserAgent, "Connection": "close"}
+    # 不再发送"Connection: close"，由会话复用连接
+    headers = {'User-Agent': UserAgent}
     return headers
 
 
-# 返回url连接
-def request_url(url):
-    requests.adapters.DEFAULT_RETRIES = 5  # 增加重连次数
-    s = requests.session()
-    s.keep_alive = False  # 关闭多余连接
-    return s.get(url, headers=get_headers())
+# 返回url连接（复用连接，使用磁盘缓存与条件请求）
+def request_url(url, offline=None):
+    """
+    返回url连接：连接错误与服务器错误自动重试，页面未变化时使用缓存
+    :param url: 链接
+    :param offline: 是否离线（只从缓存读取），为None时使用HttpCache的缓存配置
+    :return: 响应
+    """
+    return cached_get(url, headers=get_headers(), offline=offline)
 
 
 # 使用selenium连接网络
@@ -124,6 +136,115 @@ def selenium_chrome(url):
     browser = webdriver.Chrome()
     browser.get(url)
     return browser
+
+
+# 创建无界面Chrome
+def create_headless_chrome():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    return webdriver.Chrome(options=options)
+
+
+# 浏览器池：复用浏览器会话，避免每个页面启动、退出一次Chrome
+class BrowserPool:
+    def __init__(self, size=2, browser_factory=create_headless_chrome):
+        """
+        :param size: 浏览器数量上限（按需创建）
+        :param browser_factory: 创建浏览器的函数
+        """
+        self.size = size
+        self.browser_factory = browser_factory
+        self.idle_browsers = Queue()
+        self.all_browsers = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        获取空闲浏览器，没有空闲浏览器且未达到数量上限时创建，否则等待
+        :return: 浏览器
+        """
+        while True:
+            try:
+                return self.idle_browsers.get_nowait()
+            except Empty:
+                pass
+            with self.lock:
+                if len(self.all_browsers) < self.size:
+                    browser = self.browser_factory()
+                    self.all_browsers.append(browser)
+                    return browser
+            # 定时重新检查，等待期间有浏览器被关闭时可重新创建
+            try:
+                return self.idle_browsers.get(timeout=1)
+            except Empty:
+                continue
+
+    def release(self, browser):
+        self.idle_browsers.put(browser)
+
+    def discard(self, browser):
+        """
+        关闭出错的浏览器（不再放回池中），之后可重新创建
+        :param browser: 浏览器
+        :return:
+        """
+        with self.lock:
+            if browser in self.all_browsers:
+                self.all_browsers.remove(browser)
+        try:
+            browser.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def browser(self):
+        """
+        使用浏览器，用法：with browser_pool.browser() as browser: ...
+        使用中出错时关闭该浏览器
+        """
+        browser = self.acquire()
+        try:
+            yield browser
+        except Exception:
+            self.discard(browser)
+            raise
+        self.release(browser)
+
+    def close(self):
+        with self.lock:
+            browsers = self.all_browsers
+            self.all_browsers = []
+        for browser in browsers:
+            try:
+                browser.quit()
+            except Exception:
+                pass
+
+
+# 获取页面中表格的内容
+def get_table_html(url, class_name, browser_pool, wait_time=10):
+    """
+    获取页面中表格的内容（innerHTML）：先直接请求页面并解析，页面中没有该表格或表格没有数据（由脚本生成）时使用浏览器
+    :param url: 页面链接
+    :param class_name: 表格的class
+    :param browser_pool: 浏览器池
+    :param wait_time: 浏览器等待表格出现的最长时间(s)
+    :return: 表格的innerHTML
+    """
+    page_source = request_url(url)
+    page_source.encoding = page_source.apparent_encoding
+    table = BeautifulSoup(page_source.text, "lxml").find(class_=class_name)
+    if table is not None and table.find("td") is not None:
+        return table.decode_contents()
+    with browser_pool.browser() as browser:
+        browser.get(url)
+        element = WebDriverWait(browser, wait_time).until(
+            expected_conditions.presence_of_element_located((By.CLASS_NAME, class_name)))
+        return element.get_attribute("innerHTML")
+
+
 if __name__ == '__main__':
     print("start...")
     url = "https://www.baidu.com"
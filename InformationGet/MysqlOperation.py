@@ -5,13 +5,29 @@
 @Date  : 2018/12/21 11:22
 @Desc  : Mysql连接、数据表创建、增删查改
 """
-import mysql.connector
-import sys
-from Log.Logger import MyLog
+from Log.Logger import MyLog, get_logger
+from Monitor.Tracer import trace_span
+from Monitor.Metrics import timed, counter_inc
+from InformationGet.QueryRow import build_rows
+
+# 数据库连接工厂，为None时连接本地MySQL；可替换为其它DB-API连接（如基准测试使用的内存数据库）
+connection_factory = None
+
+
+# 设置数据库连接工厂
+def set_connection_factory(factory):
+    """
+    设置数据库连接工厂
+    :param factory: 函数(数据库名)->数据库连接，为None时恢复连接本地MySQL
+    :return:
+    """
+    global connection_factory
+    connection_factory = factory
 
 
 # 数据库连接（事先不确定数据库）
 def connect_mysql_without_db():
+    import mysql.connector
     mydb = mysql.connector.connect(
         host="localhost",
         user="root",
@@ -21,12 +37,15 @@ def connect_mysql_without_db():
 
 
 # 数据库连接(已知数据库名)
-def connect_mysql_with_db(db_name: str)->mysql.connector.connect:
+def connect_mysql_with_db(db_name: str):
     """
     数据库连接(已知数据库名)
     :param db_name: 数据库名
     :return: 数据库连接
     """
+    if connection_factory is not None:
+        return connection_factory(db_name)
+    import mysql.connector
     mydb = mysql.connector.connect(
         host="localhost",
         user="root",
@@ -37,14 +56,13 @@ def connect_mysql_with_db(db_name: str)->mysql.connector.connect:
 
 
 # 创建数据库university_admission
-# noinspection PyProtectedMember
 def create_database(db_name: str):
     """
     创建数据库university_admission
     :param db_name: 数据库名
     :return:
     """
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    function_logger = get_logger("create_database")
     mydb = connect_mysql_without_db()
     mycursor = mydb.cursor()
     mycursor.execute("SHOW DATABASES")
@@ -54,26 +72,25 @@ def create_database(db_name: str):
         dbs.append(db[0])
         function_logger.debug(db[0])
     if db_name in dbs:
-        function_logger.info("数据库" + db_name + "已存在!")
+        function_logger.info("数据库%s已存在!", db_name)
     else:
         mycursor.execute("CREATE DATABASE " + db_name)
-        function_logger.info(db_name + "已创建!")
+        function_logger.info("%s已创建!", db_name)
 
 
 # 查询数据库中表名
-# noinspection PyProtectedMember
 def search_table_in_db(db_name: str)->list:
     """
     查询数据库中表名
     :param db_name: 数据库名
     :return: 数据库中表名列表
     """
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    function_logger = get_logger("search_table_in_db")
     mydb = connect_mysql_with_db(db_name)
     mycursor = mydb.cursor()
     mycursor.execute("SHOW TABLES")
     tables = []
-    function_logger.debug(db_name + "数据库中有以下表：")
+    function_logger.debug("%s数据库中有以下表：", db_name)
     for table in mycursor:
         tables.append(table[0])
         function_logger.debug(table[0])
@@ -81,9 +98,14 @@ def search_table_in_db(db_name: str)->list:
 
 
 # 创建招生计划表
-# noinspection PyProtectedMember,SqlResolve
-def create_admission_plan_table():
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+# noinspection SqlResolve
+def create_admission_plan_table(drop_exist: bool = False):
+    """
+    创建招生计划表（自然键上有唯一索引）
+    :param drop_exist: 表已存在时是否删除后重新创建，为False时保留已有的表与数据
+    :return:
+    """
+    function_logger = get_logger("create_admission_plan_table")
     db_name = "university_admission"
     tables = search_table_in_db(db_name)
     mydb = connect_mysql_with_db(db_name)
@@ -91,6 +113,8 @@ def create_admission_plan_table():
 
     if "admission_plan" in tables:
         function_logger.info("admission_plan表已存在！")
+        if not drop_exist:
+            return
         function_logger.info("正在删除admission_plan表...")
         mycursor.execute("DROP TABLE admission_plan;")
 
@@ -101,20 +125,28 @@ def create_admission_plan_table():
                      "year INT,"
                      "major VARCHAR(100),"
                      "classy varchar(10),"
-                     "numbers varchar(10))")
+                     "numbers varchar(10),"
+                     "UNIQUE INDEX uk_admission_plan (school, district, year, major, classy))")
     function_logger.info("admission_plan表已重新创建！")
 
 
 # 创建录取分数表（各省）
-# noinspection PyProtectedMember,SqlResolve
-def create_admission_score_pro_table():
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+# noinspection SqlResolve
+def create_admission_score_pro_table(drop_exist: bool = False):
+    """
+    创建录取分数表（各省，自然键上有唯一索引）
+    :param drop_exist: 表已存在时是否删除后重新创建，为False时保留已有的表与数据
+    :return:
+    """
+    function_logger = get_logger("create_admission_score_pro_table")
     db_name = "university_admission"
     tables = search_table_in_db(db_name)
     mydb = connect_mysql_with_db(db_name)
     mycursor = mydb.cursor()
     if "admission_score_pro" in tables:
         function_logger.info("admission_score_pro表已存在！")
+        if not drop_exist:
+            return
         function_logger.info("正在删除admission_score_pro表...")
         mycursor.execute("DROP TABLE admission_score_pro;")
     mydb = connect_mysql_with_db(db_name)
@@ -127,20 +159,28 @@ def create_admission_score_pro_table():
                      "district VARCHAR(10),"
                      "batch varchar(30),"
                      "classy varchar(10),"
-                     "line varchar(30))")
+                     "line varchar(30),"
+                     "UNIQUE INDEX uk_admission_score_pro (school, year, district, batch, classy))")
     function_logger.info("admission_score_pro表创建完成！")
 
 
 # 创建录取分数表（各专业）
-# noinspection PyProtectedMember,SqlResolve
-def create_admission_score_major_table():
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+# noinspection SqlResolve
+def create_admission_score_major_table(drop_exist: bool = False):
+    """
+    创建录取分数表（各专业，自然键上有唯一索引）
+    :param drop_exist: 表已存在时是否删除后重新创建，为False时保留已有的表与数据
+    :return:
+    """
+    function_logger = get_logger("create_admission_score_major_table")
     db_name = "university_admission"
     tables = search_table_in_db(db_name)
     mydb = connect_mysql_with_db(db_name)
     mycursor = mydb.cursor()
     if "admission_score_major" in tables:
         function_logger.info("admission_score_major表已存在！")
+        if not drop_exist:
+            return
         function_logger.info("正在删除admission_score_major表...")
         mycursor.execute("DROP TABLE admission_score_major;")
 
@@ -155,33 +195,96 @@ def create_admission_score_major_table():
                      "highest varchar(10) NULL,"
                      "average varchar(10) NULL,"
                      "lowest varchar(10),"
-                     "amount varchar(10) NULL)")
+                     "amount varchar(10) NULL,"
+                     "UNIQUE INDEX uk_admission_score_major (school, district, year, major, classy))")
     function_logger.info("admission_score_major表创建完成！")
 
 
 # mysql 查询语句,返回查询结果
-def mysql_query_sentence(mysql_string: str)->list:
+def mysql_query_sentence(mysql_string: str, compact_rows: bool = False)->list:
     """
     mysql 查询语句,返回查询结果,记录键值列表
     :param mysql_string: MySQL查询语句
+    :param compact_rows: 为True时返回紧凑记录（共享列名索引的元组，支持row["列名"]），不为每条记录创建字典
     :return: 记录键值列表
     """
     dbname = "university_admission"
-    mydb = connect_mysql_with_db(dbname)
-    mycursor = mydb.cursor()
-    mycursor.execute(mysql_string)
-    des = mycursor.description
-    column_name = [column[0] for column in des]
-    tempresult = mycursor.fetchall()
-    myresult = []
-    for record in tempresult:
-        record_dict = {}
-        for column, word in zip(column_name, record):
-            record_dict[column] = word
-        myresult.append(record_dict)
+    with trace_span("mysql_query"), timed("mysql_query"):
+        with trace_span("connect"):
+            mydb = connect_mysql_with_db(dbname)
+        mycursor = mydb.cursor()
+        with trace_span("execute"):
+            mycursor.execute(mysql_string)
+        des = mycursor.description
+        column_name = [column[0] for column in des]
+        with trace_span("fetch"):
+            tempresult = mycursor.fetchall()
+        if compact_rows:
+            myresult = build_rows(column_name, tempresult)
+        else:
+            myresult = []
+            for record in tempresult:
+                record_dict = {}
+                for column, word in zip(column_name, record):
+                    record_dict[column] = word
+                myresult.append(record_dict)
+    counter_inc("mysql_query_rows_total", len(myresult))
     return myresult
 
 
+# 为查询语句添加分页
+def add_limit_to_sentence(mysql_string: str, limit: int = 0, offset: int = 0, order_by: str = "id") -> str:
+    """
+    为查询语句添加limit/offset分页
+    MySQL不保证多次查询的记录顺序相同，语句中没有order by时按order_by排序，保证各页不重复、不遗漏
+    :param mysql_string: MySQL查询语句（不含limit）
+    :param limit: 最多返回的记录数，0表示不限制
+    :param offset: 跳过的记录数
+    :param order_by: 排序列（应唯一，默认为主键id），为""时不添加排序
+    :return: 分页后的查询语句
+    """
+    if not limit and not offset:
+        return mysql_string
+    mysql_string = mysql_string.rstrip().rstrip(";")
+    if order_by and "order by" not in mysql_string.lower():
+        mysql_string = "%s order by %s" % (mysql_string, order_by)
+    # MySQL中只有offset时需指定一个足够大的limit
+    return "%s limit %d offset %d;" % (mysql_string, limit if limit else 9223372036854775807, offset)
+
+
+# 流式查询，按批返回记录键值列表
+def mysql_query_batches(mysql_string: str, batch_size: int = 100, limit: int = 0, offset: int = 0,
+                        compact_rows: bool = False):
+    """
+    流式查询：使用非缓冲游标（结果保留在服务器端，按批读取），内存占用只与批大小有关
+    需要读取完毕或关闭生成器，数据库连接才会释放
+    :param mysql_string: MySQL查询语句
+    :param batch_size: 每批读取的记录数
+    :param limit: 最多返回的记录数，0表示不限制
+    :param offset: 跳过的记录数
+    :param compact_rows: 为True时产出紧凑记录（见mysql_query_sentence）
+    :return: 记录键值列表的生成器（每次产出一批）
+    """
+    dbname = "university_admission"
+    mydb = connect_mysql_with_db(dbname)
+    try:
+        mycursor = mydb.cursor()
+        with timed("mysql_query"):
+            mycursor.execute(add_limit_to_sentence(mysql_string, limit, offset))
+        column_name = [column[0] for column in mycursor.description]
+        while True:
+            records = mycursor.fetchmany(batch_size)
+            if not records:
+                break
+            counter_inc("mysql_query_rows_total", len(records))
+            if compact_rows:
+                yield build_rows(column_name, records)
+            else:
+                yield [dict(zip(column_name, record)) for record in records]
+    finally:
+        mydb.close()
+
+
 # 查询指定表的表头
 def query_table_head(table_name: str)->list:
     """
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : QueryRow.py
+@Author: SangYu
+@Date  : 2019/5/17 10:20
+@Desc  : 紧凑的查询结果记录：元组子类，同一列名组合的记录共享列名索引，支持row["列名"]访问
+"""
+from functools import lru_cache
+
+
+class QueryRow(tuple):
+    """
+    查询结果记录基类（不直接使用，由build_row_class按列名生成子类）
+    记录本身是元组，不为每条记录创建字典；按列名取值、keys()/items()/get()/to_dict()与字典一致，
+    in判断列名是否存在，迭代与下标访问与元组一致
+    """
+    __slots__ = ()
+    column_names = ()
+    column_index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self.column_index[key])
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self.column_index
+
+    def get(self, key, default=None):
+        index = self.column_index.get(key)
+        if index is None:
+            return default
+        return tuple.__getitem__(self, index)
+
+    def keys(self):
+        return self.column_names
+
+    def items(self):
+        return zip(self.column_names, self)
+
+    def to_dict(self) -> dict:
+        return dict(zip(self.column_names, self))
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    __str__ = __repr__
+
+    def __reduce__(self):
+        return make_row, (self.column_names, tuple(self))
+
+
+# 按列名生成记录类（同一列名组合只生成一次）
+@lru_cache(maxsize=256)
+def build_row_class(column_names: tuple) -> type:
+    """
+    按列名生成记录类，同一列名组合的记录共享列名索引
+    :param column_names: 列名元组
+    :return: 记录类
+    """
+    return type("QueryRow", (QueryRow,), {"__slots__": (),
+                                          "column_names": column_names,
+                                          "column_index": {name: index for index, name in enumerate(column_names)}})
+
+
+# 由列名与值构造记录（用于pickle）
+def make_row(column_names: tuple, values: tuple) -> QueryRow:
+    return build_row_class(column_names)(values)
+
+
+# 将游标返回的元组转换为记录
+def build_rows(column_names, records: list) -> list:
+    """
+    将游标返回的元组列表转换为记录列表
+    :param column_names: 列名序列
+    :param records: 游标返回的元组列表
+    :return: 记录列表
+    """
+    row_class = build_row_class(tuple(column_names))
+    return list(map(row_class, records))
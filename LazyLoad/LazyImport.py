@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : LazyImport.py
+@Author: SangYu
+@Date  : 2019/5/10 14:05
+@Desc  : 模块懒加载与导入耗时分析
+"""
+import importlib
+import importlib.util
+import os
+import subprocess
+import sys
+import threading
+
+# 项目根目录
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_import_lock = threading.Lock()
+
+
+# 懒加载模块，首次访问模块属性时才真正执行导入
+def lazy_import(module_name: str):
+    """
+    懒加载模块，首次访问模块属性时才真正执行导入
+    :param module_name: 模块名
+    :return: 模块（已导入时直接返回，否则返回懒加载模块对象）
+    """
+    with _import_lock:
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+        spec = importlib.util.find_spec(module_name)
+        if spec is None:
+            raise ImportError("No module named '%s'" % module_name, name=module_name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        loader.exec_module(module)
+        return module
+
+
+# 延迟初始化对象，首次调用时执行初始化函数并缓存结果（线程安全）
+class LazyObject:
+    """
+    延迟初始化对象，首次调用get()时执行初始化函数并缓存结果
+    """
+
+    def __init__(self, factory):
+        """
+        :param factory: 无参初始化函数
+        """
+        self.factory = factory
+        self.value = None
+        self.initialized = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        获取对象，未初始化时先执行初始化函数
+        :return: 初始化结果
+        """
+        if not self.initialized:
+            with self.lock:
+                if not self.initialized:
+                    self.value = self.factory()
+                    self.initialized = True
+        return self.value
+
+
+# 分析模块导入耗时（python -X importtime）
+def import_time_profile(module_name: str, top_n: int = 15) -> dict:
+    """
+    在子进程中使用python -X importtime导入模块，统计导入耗时
+    :param module_name: 模块名
+    :param top_n: 返回累计耗时最多的前n个模块
+    :return: {"total_ms": 总耗时, "module_count": 导入模块数, "top": [(模块名, 自身耗时ms, 累计耗时ms)],
+              "error": 导入错误信息}
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module_name],
+                             cwd=project_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True, env=dict(os.environ, PYTHONPATH=project_dir))
+    records = []
+    error_lines = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            error_lines.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        records.append((fields[2].strip(), int(fields[0]) / 1000, int(fields[1]) / 1000))
+    # 顶层模块（无缩进）的累计耗时之和即总导入耗时
+    total_ms = sum(record[2] for record in records if not record[0].startswith(" "))
+    top = sorted(((name.strip(), self_ms, cumulative_ms) for name, self_ms, cumulative_ms in records),
+                 key=lambda x: x[2], reverse=True)[:top_n]
+    return {"total_ms": total_ms, "module_count": len(records), "top": top,
+            "error": "\n".join(error_lines[-3:]) if process.returncode else ""}
+
+
+# 打印导入耗时报告
+def print_import_time_report(module_names: list, watch_modules: list = None, top_n: int = 15):
+    """
+    打印模块导入耗时报告，并检查重量级模块是否在导入时被加载
+    :param module_names: 需要分析的模块名列表
+    :param watch_modules: 需要检查的重量级模块，如["pyhanlp", "fastText", "aiohttp"]
+    :param top_n: 每个模块显示累计耗时最多的前n项
+    :return:
+    """
+    if watch_modules is None:
+        watch_modules = ["pyhanlp", "jpype", "fastText", "aiohttp", "pypinyin", "requests"]
+    for module_name in module_names:
+        profile = import_time_profile(module_name, top_n=100000)
+        print("模块%s导入耗时：%.1fms，共导入%d个模块" % (module_name, profile["total_ms"], profile["module_count"]))
+        if profile["error"]:
+            print("导入失败：%s" % profile["error"])
+        loaded = {name.split(".")[0] for name, _, _ in profile["top"]}
+        for watch in watch_modules:
+            print("\t%-10s%s" % (watch, "已加载" if watch in loaded else "未加载"))
+        for name, self_ms, cumulative_ms in profile["top"][:top_n]:
+            print("\t%10.1fms %10.1fms  %s" % (self_ms, cumulative_ms, name))
+
+
+if __name__ == '__main__':
+    # 例：python LazyLoad/LazyImport.py SystemUI.QASystem QuestionAnswer.TemplateAnswerQuestion
+    print_import_time_report(sys.argv[1:] or ["SystemUI.QASystem"])
@@ -9,9 +9,130 @@
 import logging
 import logging.handlers
 import datetime
+import threading
+import atexit
+import queue
+import os
 
 log_path = "../Logs/"
 
+# 日志配置：
+# async: 是否使用异步日志（QueueHandler+QueueListener，磁盘与控制台输出在后台线程中进行），可用环境变量QA_LOG_ASYNC=1开启
+# level: 默认日志级别
+# module_levels: 按日志名配置日志级别，如{"build_mysql_string_by_template_and_keymap": logging.WARNING}
+# debug_sample_every: DEBUG日志采样间隔，每个日志名每N条DEBUG日志只输出1条（1表示不采样）
+log_config = {
+    "async": os.environ.get("QA_LOG_ASYNC", "0") == "1",
+    "level": logging.DEBUG,
+    "module_levels": {},
+    "debug_sample_every": 1,
+}
+_async_lock = threading.Lock()
+_log_queue = None
+_log_listener = None
+
+
+# 设置日志配置
+def set_log_config(async_mode: bool = None, level: int = None, module_levels: dict = None,
+                   debug_sample_every: int = None):
+    """
+    设置日志配置，应在创建日志前调用；日志级别的修改会同时作用于已创建的日志
+    :param async_mode: 是否使用异步日志
+    :param level: 默认日志级别
+    :param module_levels: 按日志名配置的日志级别
+    :param debug_sample_every: DEBUG日志采样间隔
+    :return:
+    """
+    if async_mode is not None:
+        log_config["async"] = async_mode
+    if level is not None:
+        log_config["level"] = level
+    if module_levels is not None:
+        log_config["module_levels"].update(module_levels)
+    if debug_sample_every is not None:
+        log_config["debug_sample_every"] = max(1, debug_sample_every)
+    # 更新已创建日志的级别
+    for name, logger in logging.Logger.manager.loggerDict.items():
+        if isinstance(logger, logging.Logger) and logger.handlers:
+            logger.setLevel(log_config["module_levels"].get(name, log_config["level"]))
+
+
+# 创建日志输出
+def build_handlers() -> list:
+    """
+    创建日志输出（all.log、error.log、控制台）
+    :return: 日志输出列表
+    """
+    # all.log文件中记录所有的日志信息，日志格式为：日期和时间 - 日志名 - 日志级别 - 日志信息
+    rf_handler = logging.handlers.TimedRotatingFileHandler(log_path + 'all.log', when='midnight', interval=1,
+                                                           backupCount=7, encoding="utf-8",
+                                                           atTime=datetime.time(0, 0, 0, 0))
+    rf_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    # error.log文件中单独记录error及以上级别的日志信息，日志格式为：日期和时间 - 日志级别 - 文件名[:行号] - 日志信息
+    f_handler = logging.FileHandler(log_path + 'error.log', encoding="utf-8")
+    f_handler.setLevel(logging.ERROR)
+    f_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(levelname)s - %(filename)s[:%(lineno)d] - %(message)s"))
+
+    # 输出到控制台
+    c_handler = logging.StreamHandler()
+    c_handler.setLevel(logging.DEBUG)
+    c_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    return [rf_handler, f_handler, c_handler]
+
+
+# 启动异步日志后台线程，返回日志队列
+def start_async_logging() -> queue.Queue:
+    """
+    启动异步日志后台线程（所有日志共享同一组输出），重复调用返回同一队列
+    :return: 日志队列
+    """
+    global _log_queue, _log_listener
+    with _async_lock:
+        if _log_listener is None:
+            _log_queue = queue.Queue(-1)
+            _log_listener = logging.handlers.QueueListener(_log_queue, *build_handlers(),
+                                                           respect_handler_level=True)
+            _log_listener.start()
+        return _log_queue
+
+
+# 停止异步日志后台线程，输出队列中剩余的日志
+@atexit.register
+def stop_async_logging():
+    """
+    停止异步日志后台线程，输出队列中剩余的日志
+    :return:
+    """
+    global _log_listener
+    with _async_lock:
+        if _log_listener is not None:
+            _log_listener.stop()
+            for handler in _log_listener.handlers:
+                handler.close()
+            _log_listener = None
+
+
+# DEBUG日志采样过滤器
+class DebugSampleFilter(logging.Filter):
+    """
+    DEBUG日志采样过滤器，每N条DEBUG日志只保留1条，其它级别日志不受影响
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.debug_count = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        sample_every = log_config["debug_sample_every"]
+        if record.levelno != logging.DEBUG or sample_every <= 1:
+            return True
+        with self.lock:
+            self.debug_count += 1
+            return self.debug_count % sample_every == 1
+
 
 # 开发一个日志系统， 既要把日志输出到控制台， 还要写入日志文件
 class MyLog:
@@ -21,31 +142,40 @@ class MyLog:
 
         # 检查当前logger是否存在，若存在，直接调用即可，不必再次创建
         if not self.logger.handlers:
-            self.logger.setLevel(logging.DEBUG)
+            self.logger.setLevel(log_config["module_levels"].get(logger, log_config["level"]))
+            self.logger.addFilter(DebugSampleFilter())
 
-            # all.log文件中记录所有的日志信息，日志格式为：日期和时间 - 日志名 - 日志级别 - 日志信息
-            rf_handler = logging.handlers.TimedRotatingFileHandler(log_path + 'all.log', when='midnight', interval=1,
-                                                                   backupCount=7, encoding="utf-8",
-                                                                   atTime=datetime.time(0, 0, 0, 0))
-            rf_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+            if log_config["async"]:
+                # 异步模式：日志记录放入队列，由后台线程写入文件和控制台
+                self.logger.addHandler(logging.handlers.QueueHandler(start_async_logging()))
+            else:
+                for handler in build_handlers():
+                    self.logger.addHandler(handler)
 
-            # error.log文件中单独记录error及以上级别的日志信息，日志格式为：日期和时间 - 日志级别 - 文件名[:行号] - 日志信息
-            f_handler = logging.FileHandler(log_path + 'error.log', encoding="utf-8")
-            f_handler.setLevel(logging.ERROR)
-            f_handler.setFormatter(
-                logging.Formatter("%(asctime)s - %(levelname)s - %(filename)s[:%(lineno)d] - %(message)s"))
+    def getlog(self):
+        return self.logger
 
-            # 输出到控制台
-            c_handler = logging.StreamHandler()
-            c_handler.setLevel(logging.DEBUG)
-            c_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
 
-            self.logger.addHandler(rf_handler)
-            self.logger.addHandler(f_handler)
-            self.logger.addHandler(c_handler)
+_logger_cache = {}
+_logger_cache_lock = threading.Lock()
 
-    def getlog(self):
-        return self.logger
+
+# 获取日志（按日志名缓存，避免每次调用都构造MyLog）
+def get_logger(name: str) -> logging.Logger:
+    """
+    获取日志，按日志名缓存，命中缓存时只有一次字典查找
+    热点函数中应使用惰性格式化，如logger.debug("结果:%s", result)，日志级别关闭时不进行字符串格式化
+    :param name: 日志名（一般为函数名）
+    :return: 日志
+    """
+    logger = _logger_cache.get(name)
+    if logger is None:
+        with _logger_cache_lock:
+            logger = _logger_cache.get(name)
+            if logger is None:
+                logger = MyLog(logger=name).getlog()
+                _logger_cache[name] = logger
+    return logger
 
 
 if __name__ == '__main__':
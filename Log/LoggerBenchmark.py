@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : LoggerBenchmark.py
+@Author: SangYu
+@Date  : 2019/5/13 10:26
+@Desc  : 日志获取与惰性格式化的微基准测试
+"""
+import logging
+import sys
+import timeit
+from Log.Logger import MyLog, get_logger, set_log_config
+
+# 日志级别关闭时用于格式化的参数
+test_keyword = {"search_year": "2017", "search_school": "哈尔滨工业大学", "search_major": "软件工程",
+                "search_district": "河北", "search_classy": "理工", "search_table": "admission_plan"}
+
+
+# noinspection PyProtectedMember
+def acquire_by_mylog():
+    return MyLog(logger=sys._getframe().f_code.co_name).getlog()
+
+
+def acquire_by_get_logger():
+    return get_logger("acquire_by_get_logger")
+
+
+def disabled_eager_format():
+    function_logger = get_logger("disabled_eager_format")
+    function_logger.debug("关键词:%s" % str(test_keyword))
+
+
+def disabled_lazy_format():
+    function_logger = get_logger("disabled_lazy_format")
+    function_logger.debug("关键词:%s", test_keyword)
+
+
+# 运行日志微基准测试
+def run_logger_benchmark(number: int = 100000) -> dict:
+    """
+    运行日志微基准测试（日志级别为WARNING，被测日志调用均不输出）
+    :param number: 每项的执行次数
+    :return: 测试项 -> 单次耗时(us)
+    """
+    set_log_config(level=logging.WARNING)
+    result = {}
+    for func in [acquire_by_mylog, acquire_by_get_logger, disabled_eager_format, disabled_lazy_format]:
+        func()
+        result[func.__name__] = timeit.timeit(func, number=number) * 1e6 / number
+    return result
+
+
+if __name__ == '__main__':
+    for name, cost in run_logger_benchmark().items():
+        print("%-25s%8.3fus" % (name, cost))
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : Metrics.py
+@Author: SangYu
+@Date  : 2019/5/14 15:20
+@Desc  : 运行指标注册表（计数器、仪表、延迟直方图），提供本地文本接口与定时快照文件
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from Monitor.Tracer import LatencyHistogram
+
+# 是否开启指标统计，可用环境变量QA_METRICS=1开启；关闭时各记录函数只有一次判断的开销
+metrics_enabled = os.environ.get("QA_METRICS", "0") == "1"
+# 计算QPS的滑动窗口长度(s)
+rate_window = 60
+
+
+class Counter:
+    """
+    计数器，同时按秒分桶记录最近rate_window秒的增量，用于计算QPS
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.slots = [0] * rate_window
+        self.slot_seconds = [0] * rate_window
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        second = int(time.time())
+        i_slot = second % rate_window
+        with self.lock:
+            self.value += amount
+            if self.slot_seconds[i_slot] != second:
+                self.slot_seconds[i_slot] = second
+                self.slots[i_slot] = 0
+            self.slots[i_slot] += amount
+
+    def rate(self) -> float:
+        """
+        最近rate_window秒（不含当前秒）的平均每秒增量
+        :return: 每秒增量
+        """
+        now = int(time.time())
+        with self.lock:
+            total = sum(count for count, second in zip(self.slots, self.slot_seconds)
+                        if now - rate_window <= second < now)
+        return total / rate_window
+
+
+class Gauge:
+    """
+    仪表，记录当前值
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+
+class Histogram(LatencyHistogram):
+    """
+    线程安全的延迟直方图
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self.lock:
+            self.record(value)
+
+
+class MetricsRegistry:
+    """
+    指标注册表，指标以(指标名, 标签)区分
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    @staticmethod
+    def metric_key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def get_metric(self, metrics: dict, metric_class, name: str, labels: dict):
+        key = self.metric_key(name, labels)
+        metric = metrics.get(key)
+        if metric is None:
+            with self.lock:
+                metric = metrics.get(key)
+                if metric is None:
+                    metric = metrics[key] = metric_class()
+        return metric
+
+    def counter(self, name: str, labels: dict = None) -> Counter:
+        return self.get_metric(self.counters, Counter, name, labels)
+
+    def gauge(self, name: str, labels: dict = None) -> Gauge:
+        return self.get_metric(self.gauges, Gauge, name, labels)
+
+    def histogram(self, name: str, labels: dict = None) -> Histogram:
+        return self.get_metric(self.histograms, Histogram, name, labels)
+
+    def reset(self):
+        with self.lock:
+            self.start_time = time.time()
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        """
+        当前所有指标的快照
+        :return: {"uptime", "counters", "gauges", "histograms"}，指标以"指标名{标签}"为键
+        """
+        with self.lock:
+            counters = list(self.counters.items())
+            gauges = list(self.gauges.items())
+            histograms = list(self.histograms.items())
+        result = {"time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                  "uptime": time.time() - self.start_time,
+                  "counters": {},
+                  "gauges": {},
+                  "histograms": {}}
+        for key, counter in sorted(counters):
+            result["counters"][format_metric_name(*key)] = {"value": counter.value, "qps": counter.rate()}
+        for key, gauge in sorted(gauges):
+            result["gauges"][format_metric_name(*key)] = gauge.value
+        for key, histogram in sorted(histograms):
+            with histogram.lock:
+                result["histograms"][format_metric_name(*key)] = histogram.summary()
+        return result
+
+
+registry = MetricsRegistry()
+
+
+# 指标名与标签拼接为文本
+def format_metric_name(name: str, labels: tuple) -> str:
+    if not labels:
+        return name
+    return "%s{%s}" % (name, ",".join('%s="%s"' % (key, value) for key, value in labels))
+
+
+# 计数器加1（或指定增量）
+def counter_inc(name: str, amount=1, labels: dict = None):
+    if metrics_enabled:
+        registry.counter(name, labels).inc(amount)
+
+
+# 设置仪表值
+def gauge_set(name: str, value, labels: dict = None):
+    if metrics_enabled:
+        registry.gauge(name, labels).set(value)
+
+
+# 记录延迟
+def observe(name: str, value: float, labels: dict = None):
+    if metrics_enabled:
+        registry.histogram(name, labels).observe(value)
+
+
+# 缓存命中/未命中计数
+def cache_access(cache_name: str, hit: bool):
+    if metrics_enabled:
+        registry.counter("cache_access_total", {"cache": cache_name, "result": "hit" if hit else "miss"}).inc()
+
+
+class Timer:
+    """
+    计时区间：退出时记录延迟直方图、调用计数、错误计数与进行中仪表
+    """
+    __slots__ = ("name", "labels", "start_time")
+
+    def __init__(self, name: str, labels: dict = None):
+        self.name = name
+        self.labels = labels
+        self.start_time = 0.0
+
+    def __enter__(self):
+        registry.gauge(self.name + "_inflight", self.labels).inc()
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        cost_time = time.perf_counter() - self.start_time
+        registry.gauge(self.name + "_inflight", self.labels).dec()
+        registry.histogram(self.name + "_latency_seconds", self.labels).observe(cost_time)
+        registry.counter(self.name + "_total", self.labels).inc()
+        if exc_type is not None:
+            registry.counter(self.name + "_errors_total", self.labels).inc()
+        return False
+
+
+class NoopTimer:
+    """
+    指标关闭时使用的空计时区间
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_noop_timer = NoopTimer()
+
+
+# 创建计时区间
+def timed(name: str, labels: dict = None):
+    """
+    创建计时区间，用法：with timed("mysql_query"): ...
+    生成指标：name_total、name_errors_total、name_inflight、name_latency_seconds
+    :param name: 指标名前缀
+    :param labels: 标签
+    :return: 计时区间（指标关闭时返回空区间）
+    """
+    if metrics_enabled:
+        return Timer(name, labels)
+    return _noop_timer
+
+
+# 开启/关闭指标统计
+def set_metrics(enabled: bool):
+    global metrics_enabled
+    metrics_enabled = enabled
+
+
+# 以文本格式输出所有指标
+def render_metrics_text() -> str:
+    """
+    以文本格式输出所有指标，每行一个"指标名{标签} 值"
+    直方图输出count、mean与p50/p90/p95/p99（单位秒），计数器额外输出_qps
+    :return: 指标文本
+    """
+    snapshot = registry.snapshot()
+    lines = ["qa_uptime_seconds %.3f" % snapshot["uptime"]]
+    for name, counter in snapshot["counters"].items():
+        lines.append("%s %d" % (name, counter["value"]))
+        lines.append("%s %.3f" % (suffix_metric_name(name, "_qps"), counter["qps"]))
+    for name, value in snapshot["gauges"].items():
+        lines.append("%s %s" % (name, value))
+    for name, summary in snapshot["histograms"].items():
+        lines.append("%s %d" % (suffix_metric_name(name, "_count"), summary["count"]))
+        if summary["count"]:
+            lines.append("%s %.6f" % (suffix_metric_name(name, "_mean"), summary["mean_ms"] / 1000))
+            for percent in ("p50", "p90", "p95", "p99"):
+                lines.append("%s %.6f" % (suffix_metric_name(name, "_" + percent),
+                                          summary[percent + "_ms"] / 1000))
+    return "\n".join(lines) + "\n"
+
+
+# 在指标名（标签之前）加后缀
+def suffix_metric_name(name: str, suffix: str) -> str:
+    if "{" in name:
+        index = name.index("{")
+        return name[:index] + suffix + name[index:]
+    return name + suffix
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """
+    指标接口：/metrics返回文本格式，/metrics.json返回json格式
+    """
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = render_metrics_text().encode("utf-8")
+            content_type = "text/plain; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 不向控制台输出访问日志
+        pass
+
+
+class ThreadingMetricsServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+# 在后台线程中启动指标接口
+def start_metrics_server(port: int = 9310, host: str = "127.0.0.1") -> HTTPServer:
+    """
+    在后台线程中启动本地指标接口（http://host:port/metrics），同时开启指标统计
+    :param port: 端口，为0时自动分配
+    :param host: 监听地址，默认只监听本机
+    :return: 服务器对象，调用shutdown()停止
+    """
+    set_metrics(True)
+    server = ThreadingMetricsServer((host, port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    return server
+
+
+# 写入一次指标快照
+def write_metrics_snapshot(file_path: str):
+    """
+    写入一次指标快照（json），先写临时文件再替换，避免读取到不完整的快照
+    :param file_path: 快照文件路径
+    :return:
+    """
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f_snapshot:
+        json.dump(registry.snapshot(), f_snapshot, ensure_ascii=False, indent=2)
+    os.replace(temp_path, file_path)
+
+
+# 在后台线程中定时写入指标快照
+def start_snapshot_writer(file_path: str = "../Logs/metrics.json", interval: float = 60) -> threading.Event:
+    """
+    在后台线程中定时写入指标快照，同时开启指标统计
+    :param file_path: 快照文件路径
+    :param interval: 写入间隔(s)
+    :return: 停止事件，调用set()停止写入（停止前会再写入一次）
+    """
+    set_metrics(True)
+    stop_event = threading.Event()
+
+    def write_loop():
+        while not stop_event.wait(interval):
+            write_metrics_snapshot(file_path)
+        write_metrics_snapshot(file_path)
+
+    threading.Thread(target=write_loop, name="MetricsSnapshot", daemon=True).start()
+    return stop_event
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : Profiler.py
+@Author: SangYu
+@Date  : 2019/5/16 14:40
+@Desc  : 请求级性能剖析：对前N次请求使用cProfile或采样剖析，按阶段（HanLP、编辑距离、MySQL、pickle加载）汇总后输出到文件
+使用环境变量开启，无需修改代码：
+QA_PROFILE=N              剖析前N次请求
+QA_PROFILE_MODE=sample    使用采样剖析（默认cprofile）
+QA_PROFILE_OUTPUT=路径前缀 输出文件路径前缀（默认../Logs/profile）
+"""
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+# 剖析配置
+# remaining: 剩余需要剖析的请求数
+# mode: cprofile（确定性剖析，记录完整调用关系）或sample（采样剖析，开销低）
+# output: 输出文件路径前缀
+# sample_interval: 采样间隔(s)
+profile_config = {
+    "remaining": int(os.environ.get("QA_PROFILE", "0") or 0),
+    "mode": os.environ.get("QA_PROFILE_MODE", "cprofile"),
+    "output": os.environ.get("QA_PROFILE_OUTPUT", "../Logs/profile"),
+    "sample_interval": 0.001,
+}
+
+# 阶段划分规则：阶段名 -> 文件路径或函数名中包含的关键字
+stage_rules = [
+    ("hanlp", ["HanLPAPI.py", "pyhanlp", "jpype"]),
+    ("edit_distance", ["SentenceSimilartity.py", os.sep + "distance" + os.sep, "levenshtein"]),
+    ("mysql", ["MysqlOperation.py", "mysql" + os.sep + "connector", "sqlite3", "MemoryBackend.py"]),
+    ("pickle_load", ["_pickle.load", "load_template_by_file", "pickle.py"]),
+]
+
+# 同一时刻只允许一个请求被剖析（cProfile不支持多个剖析器同时开启），嵌套或并发的请求不剖析
+_profile_lock = threading.Lock()
+_state_lock = threading.Lock()
+# 请求名 -> 累计的pstats.Stats（cprofile模式）
+_profile_stats = {}
+# 请求名 -> {调用栈(由根到叶的函数名元组): 采样次数}（sample模式）
+_sample_stacks = {}
+# 请求名 -> 已剖析的请求数
+_request_count = {}
+
+
+# 设置剖析配置
+def set_profiling(request_count: int, mode: str = None, output: str = None, sample_interval: float = None):
+    """
+    设置剖析配置
+    :param request_count: 需要剖析的请求数，0表示关闭
+    :param mode: cprofile或sample
+    :param output: 输出文件路径前缀
+    :param sample_interval: 采样间隔(s)
+    :return:
+    """
+    with _state_lock:
+        profile_config["remaining"] = request_count
+        if mode is not None:
+            profile_config["mode"] = mode
+        if output is not None:
+            profile_config["output"] = output
+        if sample_interval is not None:
+            profile_config["sample_interval"] = sample_interval
+
+
+# 按文件路径与函数名判断所属阶段
+def classify_stage(filename: str, function_name: str) -> str:
+    """
+    按文件路径与函数名判断所属阶段
+    :param filename: 文件路径（内置函数为"~"）
+    :param function_name: 函数名
+    :return: 阶段名，不属于任何阶段时返回"other"
+    """
+    text = filename + ":" + function_name
+    for stage, keywords in stage_rules:
+        for keyword in keywords:
+            if keyword in text:
+                return stage
+    return "other"
+
+
+class SampleProfiler:
+    """
+    采样剖析器：后台线程定时读取目标线程的调用栈
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.sample_loop, name="SampleProfiler", daemon=True)
+
+    def sample_loop(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s:%s" % (code.co_filename, code.co_name))
+                frame = frame.f_back
+            if stack:
+                stack = tuple(reversed(stack))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self) -> dict:
+        self.stop_event.set()
+        self.thread.join()
+        return self.stacks
+
+
+class ProfileRequest:
+    """
+    剖析一次请求
+    """
+    __slots__ = ("name", "profiler", "locked")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.profiler = None
+        self.locked = False
+
+    def __enter__(self):
+        self.locked = _profile_lock.acquire(blocking=False)
+        if not self.locked:
+            return self
+        # 获得锁后再次检查，避免并发请求剖析超过设定的次数
+        if profile_config["remaining"] <= 0:
+            _profile_lock.release()
+            self.locked = False
+            return self
+        if profile_config["mode"] == "sample":
+            self.profiler = SampleProfiler(threading.get_ident(), profile_config["sample_interval"])
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self.locked:
+            return False
+        try:
+            if isinstance(self.profiler, SampleProfiler):
+                record_samples(self.name, self.profiler.stop())
+            else:
+                self.profiler.disable()
+                record_profile(self.name, self.profiler)
+        finally:
+            _profile_lock.release()
+        finish_request(self.name)
+        return False
+
+
+class NoopProfileRequest:
+    """
+    剖析关闭时使用的空区间
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_noop_profile_request = NoopProfileRequest()
+
+
+# 创建请求剖析区间
+def profile_request(name: str):
+    """
+    创建请求剖析区间，用法：with profile_request("answer_question_by_template"): ...
+    :param name: 请求名，不同请求名的统计分别输出
+    :return: 剖析区间（剖析关闭或已剖析足够请求时返回空区间）
+    """
+    if profile_config["remaining"] > 0:
+        return ProfileRequest(name)
+    return _noop_profile_request
+
+
+# 累计cProfile结果
+def record_profile(name: str, profiler: cProfile.Profile):
+    with _state_lock:
+        if name in _profile_stats:
+            _profile_stats[name].add(profiler)
+        else:
+            _profile_stats[name] = pstats.Stats(profiler)
+
+
+# 累计采样结果
+def record_samples(name: str, stacks: dict):
+    with _state_lock:
+        name_stacks = _sample_stacks.setdefault(name, {})
+        for stack, count in stacks.items():
+            name_stacks[stack] = name_stacks.get(stack, 0) + count
+
+
+# 一次请求剖析完成，达到请求数后输出结果
+def finish_request(name: str):
+    with _state_lock:
+        _request_count[name] = _request_count.get(name, 0) + 1
+        profile_config["remaining"] -= 1
+        finished = profile_config["remaining"] == 0
+    if finished:
+        dump_profile()
+
+
+# cProfile结果按阶段汇总
+def summarize_profile_stages(stats: pstats.Stats) -> dict:
+    """
+    cProfile结果按阶段汇总（各函数自身耗时之和，不会因嵌套调用重复计算）
+    :param stats: 剖析统计
+    :return: 阶段名 -> {"time": 耗时(s), "calls": 调用次数, "functions": [(自身耗时, 函数)]}
+    """
+    stages = {}
+    for (filename, line_number, function_name), (cc, nc, tt, ct, callers) in stats.stats.items():
+        stage = classify_stage(filename, function_name)
+        stage_stats = stages.setdefault(stage, {"time": 0.0, "calls": 0, "functions": []})
+        stage_stats["time"] += tt
+        stage_stats["calls"] += nc
+        stage_stats["functions"].append((tt, "%s:%d(%s)" % (filename, line_number, function_name)))
+    for stage_stats in stages.values():
+        stage_stats["functions"] = sorted(stage_stats["functions"], reverse=True)[:10]
+    return stages
+
+
+# 采样结果按阶段汇总
+def summarize_sample_stages(stacks: dict) -> dict:
+    """
+    采样结果按阶段汇总：每个样本归入离栈顶最近的可识别阶段
+    :param stacks: 调用栈 -> 采样次数
+    :return: 阶段名 -> {"samples": 采样次数, "functions": [(采样次数, 栈顶函数)]}
+    """
+    stages = {}
+    for stack, count in stacks.items():
+        stage = "other"
+        for frame in reversed(stack):
+            filename, function_name = frame.rsplit(":", 1)
+            stage = classify_stage(filename, function_name)
+            if stage != "other":
+                break
+        stage_stats = stages.setdefault(stage, {"samples": 0, "functions": {}})
+        stage_stats["samples"] += count
+        stage_stats["functions"][stack[-1]] = stage_stats["functions"].get(stack[-1], 0) + count
+    for stage_stats in stages.values():
+        stage_stats["functions"] = sorted(((count, function) for function, count in
+                                           stage_stats["functions"].items()), reverse=True)[:10]
+    return stages
+
+
+# 输出剖析结果
+@atexit.register
+def dump_profile():
+    """
+    输出剖析结果（每个请求名一组文件）：
+    cprofile模式：.prof（pstats格式，可用snakeviz等工具查看）与.txt（分阶段汇总及累计耗时前40的函数）
+    sample模式：.collapsed（火焰图折叠栈格式）与.txt（分阶段汇总）
+    :return:
+    """
+    with _state_lock:
+        profile_stats = dict(_profile_stats)
+        sample_stacks = {name: dict(stacks) for name, stacks in _sample_stacks.items()}
+        request_count = dict(_request_count)
+        _profile_stats.clear()
+        _sample_stacks.clear()
+        _request_count.clear()
+    if not profile_stats and not sample_stacks:
+        return
+    output_dir = os.path.dirname(profile_config["output"])
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    now_time = time.strftime("%Y%m%d_%H%M%S")
+    for name, stats in profile_stats.items():
+        path_prefix = "%s_%s_%s" % (profile_config["output"], name, now_time)
+        stats.dump_stats(path_prefix + ".prof")
+        stages = summarize_profile_stages(stats)
+        with open(path_prefix + ".txt", "w", encoding="utf-8") as f_report:
+            f_report.write("请求：%s\t剖析次数：%d\t总耗时：%.3fs\n" % (name, request_count.get(name, 0),
+                                                                stats.total_tt))
+            f_report.write("分阶段汇总（函数自身耗时）：\n")
+            for stage, stage_stats in sorted(stages.items(), key=lambda item: -item[1]["time"]):
+                f_report.write("%-16s%10.3fs%8.1f%%%12d次\n" % (
+                    stage, stage_stats["time"], stage_stats["time"] * 100 / stats.total_tt if stats.total_tt else 0,
+                    stage_stats["calls"]))
+                for function_time, function in stage_stats["functions"]:
+                    f_report.write("    %10.4fs  %s\n" % (function_time, function))
+            f_report.write("\n累计耗时前40的函数：\n")
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats("cumulative").print_stats(40)
+            f_report.write(stream.getvalue())
+    for name, stacks in sample_stacks.items():
+        path_prefix = "%s_%s_%s" % (profile_config["output"], name, now_time)
+        with open(path_prefix + ".collapsed", "w", encoding="utf-8") as f_collapsed:
+            for stack, count in sorted(stacks.items()):
+                f_collapsed.write("%s %d\n" % (";".join(stack), count))
+        stages = summarize_sample_stages(stacks)
+        total_samples = sum(stacks.values())
+        with open(path_prefix + ".txt", "w", encoding="utf-8") as f_report:
+            f_report.write("请求：%s\t剖析次数：%d\t采样数：%d\t采样间隔：%.1fms\n" % (
+                name, request_count.get(name, 0), total_samples, profile_config["sample_interval"] * 1000))
+            f_report.write("分阶段汇总（采样数）：\n")
+            for stage, stage_stats in sorted(stages.items(), key=lambda item: -item[1]["samples"]):
+                f_report.write("%-16s%10d%8.1f%%\n" % (stage, stage_stats["samples"],
+                                                     stage_stats["samples"] * 100 / total_samples))
+                for count, function in stage_stats["functions"]:
+                    f_report.write("    %10d  %s\n" % (count, function))
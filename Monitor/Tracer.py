@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : Tracer.py
+@Author: SangYu
+@Date  : 2019/5/14 9:52
+@Desc  : 轻量级分阶段耗时追踪（span），按阶段聚合为直方图并导出json
+"""
+import json
+import math
+import os
+import threading
+import time
+
+# 是否开启追踪，可用环境变量QA_TRACE=1开启；关闭时trace_span只有一次判断的开销
+tracing_enabled = os.environ.get("QA_TRACE", "0") == "1"
+
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图（HDR风格，相对误差约9%），记录单位为秒
+    桶i的上界为 min_value * growth^i
+    """
+    min_value = 1e-6
+    growth = 2 ** 0.125
+    bucket_count = 240
+
+    def __init__(self):
+        self.buckets = [0] * (self.bucket_count + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def bucket_index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        index = int(math.ceil(math.log(value / self.min_value, self.growth)))
+        return min(index, self.bucket_count)
+
+    def record(self, value: float):
+        """
+        记录一个延迟值
+        :param value: 延迟(s)
+        :return:
+        """
+        self.buckets[self.bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        合并另一个直方图
+        :param other: 直方图
+        :return:
+        """
+        for i_bucket, count in enumerate(other.buckets):
+            self.buckets[i_bucket] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> float:
+        """
+        估计百分位数（返回所在桶的上界，不超过最大值）
+        :param percent: 百分位，如99
+        :return: 延迟(s)
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(self.count * percent / 100)))
+        seen = 0
+        for i_bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(self.min_value * self.growth ** i_bucket, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """
+        直方图摘要，单位为毫秒
+        :return: {"count", "mean_ms", "min_ms", "max_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "total_ms"}
+        """
+        if self.count == 0:
+            return {"count": 0}
+        return {"count": self.count,
+                "total_ms": self.total * 1000,
+                "mean_ms": self.total * 1000 / self.count,
+                "min_ms": self.min * 1000,
+                "max_ms": self.max * 1000,
+                "p50_ms": self.percentile(50) * 1000,
+                "p90_ms": self.percentile(90) * 1000,
+                "p95_ms": self.percentile(95) * 1000,
+                "p99_ms": self.percentile(99) * 1000}
+
+
+_stats_lock = threading.Lock()
+# 阶段路径 -> 延迟直方图
+_span_stats = {}
+_local = threading.local()
+
+
+class Span:
+    """
+    追踪区间，嵌套的区间以"父/子"路径聚合
+    """
+    __slots__ = ("name", "path", "start_time")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = name
+        self.start_time = 0.0
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            self.path = stack[-1] + "/" + self.name
+        stack.append(self.path)
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        cost_time = time.perf_counter() - self.start_time
+        _local.stack.pop()
+        record_span(self.path, cost_time)
+        return False
+
+
+class NoopSpan:
+    """
+    追踪关闭时使用的空区间
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_noop_span = NoopSpan()
+
+
+# 创建追踪区间
+def trace_span(name: str):
+    """
+    创建追踪区间，用法：with trace_span("mysql_query"): ...
+    :param name: 阶段名
+    :return: 追踪区间（追踪关闭时返回空区间）
+    """
+    if tracing_enabled:
+        return Span(name)
+    return _noop_span
+
+
+# 追踪装饰器
+def traced(name: str = None):
+    """
+    追踪装饰器，将整个函数调用作为一个区间
+    :param name: 阶段名，默认为函数名
+    :return:
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        def wrapper(*args, **kwargs):
+            if not tracing_enabled:
+                return func(*args, **kwargs)
+            with Span(span_name):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+
+# 记录区间耗时
+def record_span(path: str, cost_time: float):
+    """
+    记录区间耗时
+    :param path: 阶段路径
+    :param cost_time: 耗时(s)
+    :return:
+    """
+    with _stats_lock:
+        histogram = _span_stats.get(path)
+        if histogram is None:
+            histogram = _span_stats[path] = LatencyHistogram()
+        histogram.record(cost_time)
+
+
+# 开启/关闭追踪
+def set_tracing(enabled: bool):
+    global tracing_enabled
+    tracing_enabled = enabled
+
+
+# 清空追踪数据
+def reset_trace():
+    with _stats_lock:
+        _span_stats.clear()
+
+
+# 返回各阶段耗时统计
+def get_trace_stats() -> dict:
+    """
+    返回各阶段耗时统计
+    :return: 阶段路径 -> 直方图摘要（毫秒）
+    """
+    with _stats_lock:
+        return {path: histogram.summary() for path, histogram in sorted(_span_stats.items())}
+
+
+# 导出追踪数据为json
+def export_trace_json(file_path: str, include_buckets: bool = False):
+    """
+    导出各阶段耗时统计为json文件
+    :param file_path: 输出文件路径
+    :param include_buckets: 是否输出直方图原始分桶（桶上界(ms) -> 计数，只输出非空桶）
+    :return:
+    """
+    stats = get_trace_stats()
+    if include_buckets:
+        with _stats_lock:
+            for path, histogram in _span_stats.items():
+                stats[path]["buckets"] = {"%.4f" % (histogram.min_value * histogram.growth ** i_bucket * 1000): count
+                                          for i_bucket, count in enumerate(histogram.buckets) if count}
+    with open(file_path, "w", encoding="utf-8") as f_trace:
+        json.dump({"export_time": time.strftime("%Y-%m-%d %H:%M:%S"), "spans": stats}, f_trace,
+                  ensure_ascii=False, indent=2)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : KeywordAutomaton.py
+@Author: SangYu
+@Date  : 2019/5/6 10:12
+@Desc  : 关键词AC自动机（Aho-Corasick），对原始问句单次扫描匹配所有关键词
+"""
+from collections import deque
+
+
+class KeywordAutomaton:
+    """
+    关键词AC自动机
+    节点使用列表存储（状态转移字典、失败指针、输出列表），便于pickle序列化
+    节点自身的关键词与合并失败链后的输出分开保存，构造后再添加关键词并重新构造时输出不会重复
+    """
+
+    def __init__(self):
+        # 状态转移：goto[state][char] -> next_state
+        self.goto = [{}]
+        # 失败指针
+        self.fail = [0]
+        # 节点自身的关键词：node_output[state] -> [(关键词, 标签, 优先级)]
+        self.node_output = [[]]
+        # 输出（合并失败链上的关键词，build时重新构造）：output[state] -> [(关键词, 标签, 优先级)]
+        self.output = [[]]
+        # 关键词最大长度
+        self.max_length = 0
+        self.built = False
+
+    def add_keyword(self, keyword: str, label: str, priority: int = 0):
+        """
+        向自动机中添加关键词
+        :param keyword: 关键词
+        :param label: 关键词对应的标签
+        :param priority: 优先级，数值越小优先级越高
+        :return:
+        """
+        if keyword == "":
+            return
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.node_output.append([])
+                self.output.append([])
+            state = next_state
+        # 同一关键词重复出现时以后出现的标签为准（与字典覆盖语义一致）
+        self.node_output[state] = [(keyword, label, priority)]
+        self.max_length = max(self.max_length, len(keyword))
+        self.built = False
+
+    def build(self):
+        """
+        广度优先构造失败指针，并将失败链上的输出合并到当前节点（输出由各节点自身的关键词重新构造）
+        :return:
+        """
+        self.output = [list(keywords) for keywords in self.node_output]
+        queue = deque()
+        for char, state in self.goto[0].items():
+            self.fail[state] = 0
+            queue.append(state)
+        while queue:
+            current = queue.popleft()
+            for char, next_state in self.goto[current].items():
+                queue.append(next_state)
+                fail_state = self.fail[current]
+                while fail_state and char not in self.goto[fail_state]:
+                    fail_state = self.fail[fail_state]
+                self.fail[next_state] = self.goto[fail_state].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+        self.built = True
+
+    def iter_match(self, text: str):
+        """
+        单次扫描文本，依次产出匹配结果
+        :param text: 待匹配文本
+        :return: (起始位置, 结束位置(不包含), 关键词, 标签, 优先级)生成器
+        """
+        if not self.built:
+            self.build()
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for i_char, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, label, priority in output[state]:
+                yield i_char + 1 - len(keyword), i_char + 1, keyword, label, priority
+
+    def match_all(self, text: str) -> list:
+        """
+        返回文本中所有关键词匹配结果
+        :param text: 待匹配文本
+        :return: 匹配结果列表
+        """
+        return list(self.iter_match(text))
+
+    def match_best(self, text: str, by_priority: bool = False) -> tuple:
+        """
+        返回最优匹配结果
+        :param text: 待匹配文本
+        :param by_priority: True按优先级选择，False按最左最长原则选择（与分词后逐词查找的语义一致）
+        :return: 最优匹配(起始位置, 结束位置, 关键词, 标签, 优先级)，无匹配返回()
+        """
+        best = ()
+        best_key = None
+        for match in self.iter_match(text):
+            start, end, keyword, label, priority = match
+            # 最左最长模式下，之后的匹配起点不可能早于最优结果时提前结束扫描
+            if not by_priority and best and end - self.max_length > best[0]:
+                break
+            if by_priority:
+                key = (priority, start, -len(keyword))
+            else:
+                key = (start, -len(keyword), priority)
+            if best_key is None or key < best_key:
+                best_key = key
+                best = match
+        return best
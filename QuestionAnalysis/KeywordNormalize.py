@@ -7,7 +7,6 @@
 """
 from Log.Logger import MyLog
 import json
-import requests
 from QuestionAnalysis.TimeNER import text_to_year
 from QuestionAnalysis.LocationNER import text_to_location
 
@@ -42,6 +41,7 @@ from QuestionAnalysis.LocationNER import text_to_location
 # 时间词正则化，返回20xx(年)
 # noinspection PyDictCreation
 def time_word_normalize_web(time_word):
+    import requests
     src = time_word
     # 外部访问url
     url_web = 'http://api.deepintell.net/timeanlz'
@@ -87,6 +87,7 @@ def time_word_normalize_web(time_word):
 # 地点词正则化
 # noinspection PyDictCreation
 def district_word_normalize_web(district_word):
+    import requests
     src = district_word
     # 外部访问
     url_web = 'http://api.deepintell.net/locanlz'
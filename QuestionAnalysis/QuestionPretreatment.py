@@ -5,13 +5,14 @@
 @Date  : 2018/12/25 15:32
 @Desc  : 自然语言问句的预处理
 """
-from HanLP.HanLPTest import hanlp_nlp_segmentor
+from HanLP.HanLPAPI import hanlp_nlp_segmentor
 from TemplateLoad.QuestionTemplate import load_template_by_file
 from SimilarityCalculate.SemanticSimilarity import deepintell_api_asy
 from QuestionAnalysis.KeywordNormalize import (time_word_normalize_local, time_word_normalize_web,
                                                district_word_normalize_local, district_word_normalize_web)
 from SimilarityCalculate.SentenceSimilartity import edit_distance
 import copy
+import os
 import time
 
 
@@ -21,20 +22,54 @@ def question_segment_hanlp(question):
     return hanlp_nlp_segmentor(question)
 
 
+# 问题模板缓存：模板路径 -> ((文件修改时间, 文件大小), (问句条件词, 问句目标词, 模板答句, 模板问句集, 替换模板词后的问句集))
+template_cache = {}
+
+
+# 加载问题模板（按模板路径缓存，同一模板只读取一次pickle并只替换一次模板词）
+def load_question_template_cached(template_path: str) -> tuple:
+    """
+    加载问题模板，按模板路径缓存，模板文件重新构建（修改时间或大小变化）后自动重新加载
+    :param template_path: 模板路径
+    :return: 问句条件词、问句目标词、模板答句、模板问句集、替换模板词后的问句集
+    """
+    file_stat = os.stat(template_path)
+    file_version = (file_stat.st_mtime_ns, file_stat.st_size)
+    cached = template_cache.get(template_path)
+    template = cached[1] if cached is not None and cached[0] == file_version else None
+    if template is None:
+        fq_condition, fq_target, ts_answers, ts_questions = load_template_by_file(template_path)
+        # 替换模板词
+        temp_sentence = []
+        for sentence in ts_questions:
+            for fqc in fq_condition:
+                key_en = fqc.split(" ")[0]
+                key_ch = fqc.split(" ")[1]
+                sentence = sentence.replace("(" + key_en + ")", key_ch).split("--")[0]
+            temp_sentence.append(sentence)
+        template = (fq_condition, fq_target, ts_answers, ts_questions, temp_sentence)
+        template_cache[template_path] = (file_version, template)
+    return template
+
+
+# 预加载全部问题模板
+def pre_load_question_templates(template_sentence_types=("admission_plan", "admission_score_pro",
+                                                          "admission_score_major")):
+    for template_sentence_type in template_sentence_types:
+        load_question_template_cached("../TemplateLoad/Template/" + template_sentence_type)
+
+
+# 清空问题模板缓存（模板文件重新构建后调用）
+def clear_template_cache():
+    template_cache.clear()
+
+
 # 加载问题模板并返回最匹配的模板及相应的答句模板
 # noinspection PyShadowingNames
 def find_question_match_template(ab_question, template_sentence_type, calculate_type = 0):
     main_path = "../TemplateLoad/Template"
     template_path = main_path + "/" + template_sentence_type
-    fq_condition, fq_target, ts_answers, ts_questions = load_template_by_file(template_path)
-    # 替换模板词
-    temp_sentence = []
-    for sentence in ts_questions:
-        for fqc in fq_condition:
-            key_en = fqc.split(" ")[0]
-            key_ch = fqc.split(" ")[1]
-            sentence = sentence.replace("(" + key_en + ")", key_ch).split("--")[0]
-        temp_sentence.append(sentence)
+    fq_condition, fq_target, ts_answers, ts_questions, temp_sentence = load_question_template_cached(template_path)
     # deepintellAPI
     if calculate_type:
         input_pairs = [{"sent1": ab_question, "sent2": sentence} for sentence in temp_sentence]
@@ -6,10 +6,17 @@
 @Desc  : 问题类型预测
 """
 import jieba
-import fastText.FastText as ff
 import time
 import os
-from SimilarityCalculate.SentenceSimilartity import edit_distance
+import threading
+from SimilarityCalculate.SentenceSimilartity import NGramIndex
+from QuestionAnalysis.KeywordAutomaton import KeywordAutomaton
+from QuestionAnalysis.ResourceLoader import ResourceLoader
+from QuestionAnalysis.WarmStartCache import load_or_build, prepare_jieba_cache
+from Monitor.Metrics import observe, counter_inc
+
+# 问句类型预测数据文件所在目录（不依赖当前工作目录）
+data_dir = os.path.dirname(os.path.abspath(__file__))
 
 
 class QTPredictModel:
@@ -19,12 +26,14 @@ class QTPredictModel:
     label_to_name = None
     stop_words = None
     classifier = None
+    model_lock = threading.Lock()
 
     def pre_load_jieba(self):
         """
-        初始化结巴字典树
+        初始化结巴字典树（前缀词典缓存于热启动缓存目录）
         :return:
         """
+        prepare_jieba_cache(jieba.dt)
         jieba.initialize()
 
     def pre_load_label_name_map(self):
@@ -32,29 +41,40 @@ class QTPredictModel:
         预加载标签名字映射
         :return:
         """
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
-        self.label_to_name = self.load_label_name_map("label_name_map")[0]
+        file_path = os.path.join(data_dir, "label_name_map")
+        self.label_to_name = load_or_build("label_name_map", [file_path],
+                                           lambda: self.load_label_name_map(file_path))[0]
 
     def pre_load_stop_words(self):
         """
         预加载停用词
         :return:
         """
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
-        file_path = "stopwords.txt"
-        stop_words = set()
-        with open(file_path, "r", encoding="utf-8") as f_stopwords:
-            for line in f_stopwords:
-                stop_words.add(line.strip())
-        self.stop_words = stop_words
+        file_path = os.path.join(data_dir, "stopwords.txt")
+        self.stop_words = load_or_build("stop_words", [file_path], lambda: self.load_stop_words(file_path))
 
     def pre_load_fastText_model(self):
         """
-        预加载fastText模型
+        预加载fastText模型（已加载时直接返回，可在首次预测时懒加载）
         :return:
         """
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
-        self.classifier = ff.load_model("model_w2_e24")
+        with self.model_lock:
+            if self.classifier is None:
+                # fastText只在加载模型时导入
+                import fastText.FastText as ff
+                self.classifier = ff.load_model(os.path.join(data_dir, "model_w2_e24"))
+
+    def load_stop_words(self, file_path):
+        """
+        加载停用词
+        :param file_path: 停用词文件路径
+        :return: 停用词集合
+        """
+        stop_words = set()
+        with open(file_path, "r", encoding="utf-8") as f_stopwords:
+            for line in f_stopwords:
+                stop_words.add(line.strip())
+        return stop_words
 
     def load_label_name_map(self, file_path):
         """
@@ -71,70 +91,341 @@ class QTPredictModel:
                 name_to_label[name] = label
         return label_to_name, name_to_label
 
-    def question_predict_by_fastText(self, question):
+    def question_predict_by_fastText(self, question, seg_list=None):
         """
         使用fashText对问句进行分类
-        :return:
+        :param question: 问句
+        :param seg_list: 问句的结巴分词结果，为None时重新分词
+        :return: 问句类型
+        """
+        return self.question_predict_by_fastText_with_prob(question, seg_list)[0]
+
+    def question_predict_by_fastText_with_prob(self, question, seg_list=None):
+        """
+        使用fashText对问句进行分类，并返回分类概率
+        :param question: 问句
+        :param seg_list: 问句的结巴分词结果，为None时重新分词
+        :return: 问句类型，概率
         """
-        seg_line = jieba.cut(question)
+        # 模型未预加载时，在首次使用时加载
+        if self.classifier is None:
+            self.pre_load_fastText_model()
+        if seg_list is None:
+            seg_list = jieba.cut(question)
         add_str = ""
-        for word in seg_line:
+        for word in seg_list:
             if word not in self.stop_words:
                 add_str += word + " "
         predict = self.classifier.predict(add_str.strip())
-        return self.label_to_name[predict[0][0]]
+        return self.label_to_name[predict[0][0]], float(predict[1][0])
 
 
 class QTPredictKeyword:
     """
     使用问句中的关键词对问句类型进行判断
+    关键词编译为AC自动机，直接扫描原始问句，无需分词
     """
     keywords_label_map = {}
+    keyword_automaton = None
 
     def pre_load_keyword(self):
         """
-        预加载关键词
+        预加载关键词，并编译为AC自动机（文件中行号越小优先级越高）
         :return:
         """
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
-        with open("question_type_keyword", "r", encoding="utf-8") as f_keywords:
-            for line in f_keywords:
+        file_path = os.path.join(data_dir, "question_type_keyword")
+        self.keywords_label_map, self.keyword_automaton = load_or_build("question_type_keyword", [file_path],
+                                                                        lambda: self.load_keyword(file_path))
+
+    def load_keyword(self, file_path):
+        """
+        加载关键词标签映射并编译AC自动机
+        :param file_path: 关键词文件路径
+        :return: 关键词标签映射，关键词自动机
+        """
+        keywords_label_map = {}
+        automaton = KeywordAutomaton()
+        with open(file_path, "r", encoding="utf-8") as f_keywords:
+            for i_line, line in enumerate(f_keywords):
                 split_line = line.strip().split(" ")
                 for word in split_line[1:]:
-                    self.keywords_label_map[word] = split_line[0]
+                    keywords_label_map[word] = split_line[0]
+                    automaton.add_keyword(word, split_line[0], i_line)
+        automaton.build()
+        return keywords_label_map, automaton
 
-    def question_predict_by_keyword(self, question):
-        for word in jieba.cut(question):
-            if word in self.keywords_label_map:
-                return self.keywords_label_map[word]
+    def question_predict_by_keyword(self, question, by_priority=False):
+        """
+        使用关键词自动机判断问句类型
+        :param question: 问句
+        :param by_priority: True返回优先级最高的标签，False返回问句中最先出现（最左最长）的关键词标签
+        :return: 问句类型标签，无匹配返回""
+        """
+        match = self.keyword_automaton.match_best(question, by_priority)
+        if match:
+            return match[3]
         return ""
 
 
 class QTPredictTemplate:
     """
     使用问题模板对问句类型进行判断
+    模板建立n-gram候选索引，使用有界编辑距离求最相似的模板，阈值可按标签配置
     """
-    question_template_label_map={}
+    question_template_label_map = {}
+    template_index = None
+    # 各标签的归一化编辑距离阈值（小于阈值才认为匹配）
+    label_threshold = {}
+    default_threshold = 0.5
+
     def pre_load_question_template(self):
         """
-        预加载问题模板
+        预加载问题模板，并建立模板索引
         :return:
         """
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
-        with open("question_type_template", "r", encoding="utf-8") as f_template:
+        file_path = os.path.join(data_dir, "question_type_template")
+        self.question_template_label_map, self.template_index = load_or_build(
+            "question_type_template", [file_path], lambda: self.load_question_template(file_path))
+
+    def load_question_template(self, file_path):
+        """
+        加载问题模板标签映射并建立模板索引
+        :param file_path: 问题模板文件路径
+        :return: 模板标签映射，模板索引
+        """
+        question_template_label_map = {}
+        with open(file_path, "r", encoding="utf-8") as f_template:
             for line in f_template:
                 split_line = line.strip().split(" ")
                 for template in split_line[1:]:
-                    self.question_template_label_map[template]=split_line[0]
-
-    def question_predict_by_template(self,question):
-        # 相似度计算
-        score_list = edit_distance(question,list(self.question_template_label_map.keys()))
-        print(score_list[0])
-        if score_list[0][0]<0.5:
-            return self.question_template_label_map[score_list[0][2]]
+                    question_template_label_map[template] = split_line[0]
+        return question_template_label_map, NGramIndex(list(question_template_label_map.keys()))
+
+    def pre_load_template_threshold(self, file_path="question_type_threshold"):
+        """
+        预加载各标签的匹配阈值（每行：标签 阈值），文件不存在时使用默认阈值
+        :param file_path: 阈值文件路径（相对路径相对于本模块所在目录）
+        :return:
+        """
+        file_path = os.path.join(data_dir, file_path)
+        if not os.path.exists(file_path):
+            return
+        with open(file_path, "r", encoding="utf-8") as f_threshold:
+            for line in f_threshold:
+                split_line = line.strip().split(" ")
+                if len(split_line) == 2:
+                    self.set_label_threshold(split_line[0], float(split_line[1]))
+
+    def set_label_threshold(self, label, threshold):
+        """
+        设置标签的匹配阈值
+        :param label: 问句类型标签
+        :param threshold: 归一化编辑距离阈值
+        :return:
+        """
+        self.label_threshold[label] = threshold
+
+    def question_predict_top_k(self, question, top_k=3):
+        """
+        返回最相似的前k个模板及其标签
+        :param question: 问句
+        :param top_k: 返回结果个数
+        :return: [(归一化编辑距离, 标签, 模板)]，按距离升序排列，只包含低于标签阈值的结果
+        """
+        max_threshold = max([self.default_threshold] + list(self.label_threshold.values()))
+        template_index = self.template_index
+        label_map = self.question_template_label_map
+
+        # 在搜索中按标签阈值过滤，阈值不满足的模板不占用前k个的位置
+        def below_label_threshold(i_template, score):
+            label = label_map[template_index.sentences[i_template]]
+            return score < self.label_threshold.get(label, self.default_threshold)
+
+        return [(score, label_map[template], template)
+                for score, _, template in template_index.search(question, top_k, max_threshold,
+                                                                below_label_threshold)]
+
+    def question_predict_by_template(self, question):
+        """
+        使用最相似的模板判断问句类型
+        :param question: 问句
+        :return: 问句类型标签，无满足阈值的模板时返回""
+        """
+        result = self.question_predict_top_k(question, 1)
+        if result:
+            return result[0][1]
+        return ""
+
+
+class QuestionTypePipeline:
+    """
+    问句类型预测级联，优先级：关键词>模板>模型
+    各阶段共享同一次结巴分词结果，记录各阶段命中率与耗时，并支持按置信度提前退出
+    """
+    stage_names = ["keyword", "template", "model"]
+
+    def __init__(self, keyword_predictor=None, template_predictor=None, model_predictor=None, min_confidence=None):
+        """
+        :param keyword_predictor: 关键词预测器，为None时新建
+        :param template_predictor: 模板预测器，为None时新建
+        :param model_predictor: 模型预测器，为None时新建
+        :param min_confidence: 各阶段提前退出的最低置信度，如{"template": 0.6}，未指定的阶段为0
+        """
+        self.keyword_predictor = keyword_predictor if keyword_predictor is not None else QTPredictKeyword()
+        self.template_predictor = template_predictor if template_predictor is not None else QTPredictTemplate()
+        self.model_predictor = model_predictor if model_predictor is not None else QTPredictModel()
+        self.min_confidence = {stage: 0.0 for stage in self.stage_names}
+        if min_confidence:
+            self.min_confidence.update(min_confidence)
+        self.stats_lock = threading.Lock()
+        self.stage_stats = {}
+        self.reset_stats()
+
+    def pre_load(self):
+        """
+        预加载三个预测器的数据
+        :return:
+        """
+        self.keyword_predictor.pre_load_keyword()
+        self.template_predictor.pre_load_question_template()
+        self.template_predictor.pre_load_template_threshold()
+        self.model_predictor.pre_load_jieba()
+        self.model_predictor.pre_load_stop_words()
+        self.model_predictor.pre_load_label_name_map()
+        self.model_predictor.pre_load_fastText_model()
+
+    def pre_load_parallel(self, progress_callback=None, lazy_model=False, max_workers=4) -> dict:
+        """
+        使用线程池并行预加载三个预测器的数据
+        :param progress_callback: 进度回调函数(资源名, 完成百分比)，在调用线程中执行
+        :param lazy_model: 为True时不加载fastText模型，在首次使用时懒加载
+        :param max_workers: 线程池大小
+        :return: 资源名 -> 加载耗时(s)
+        """
+        loader = ResourceLoader(max_workers)
+        loader.add_task("加载关键词标签映射", self.keyword_predictor.pre_load_keyword)
+        loader.add_task("加载问题模板标签映射", self.template_predictor.pre_load_question_template)
+        loader.add_task("加载模板匹配阈值", self.template_predictor.pre_load_template_threshold)
+        loader.add_task("加载结巴字典树", self.model_predictor.pre_load_jieba, 2)
+        loader.add_task("加载停用词典", self.model_predictor.pre_load_stop_words)
+        loader.add_task("加载标签名字映射", self.model_predictor.pre_load_label_name_map)
+        if not lazy_model:
+            loader.add_task("加载分类模型", self.model_predictor.pre_load_fastText_model, 4)
+        return loader.load(progress_callback)
+
+    def warm_up_model_async(self) -> threading.Thread:
+        """
+        在后台线程中加载fastText模型，界面可先行显示
+        :return: 加载线程
+        """
+        thread = threading.Thread(target=self.model_predictor.pre_load_fastText_model, daemon=True)
+        thread.start()
+        return thread
+
+    def reset_stats(self):
+        """
+        清空各阶段统计信息
+        :return:
+        """
+        with self.stats_lock:
+            self.stage_stats = {stage: {"calls": 0, "hits": 0, "time": 0.0}
+                                for stage in self.stage_names + ["segment"]}
+
+    def record_stage(self, stage, hit, cost_time):
+        """
+        记录单个阶段的调用结果
+        :param stage: 阶段名
+        :param hit: 是否命中（提前退出）
+        :param cost_time: 耗时(s)
+        :return:
+        """
+        with self.stats_lock:
+            stats = self.stage_stats[stage]
+            stats["calls"] += 1
+            stats["hits"] += int(hit)
+            stats["time"] += cost_time
+        stage_labels = {"stage": stage}
+        observe("question_type_stage_latency_seconds", cost_time, stage_labels)
+        counter_inc("question_type_stage_calls_total", labels=stage_labels)
+        if hit:
+            counter_inc("question_type_stage_hits_total", labels=stage_labels)
+
+    def get_stats(self) -> dict:
+        """
+        返回各阶段统计信息
+        :return: 阶段名 -> {调用次数、命中次数、命中率、总耗时(s)、平均耗时(ms)}
+        """
+        with self.stats_lock:
+            result = {}
+            for stage, stats in self.stage_stats.items():
+                calls = stats["calls"]
+                result[stage] = {"calls": calls,
+                                 "hits": stats["hits"],
+                                 "hit_rate": stats["hits"] / calls if calls else 0.0,
+                                 "time": stats["time"],
+                                 "avg_ms": stats["time"] * 1000 / calls if calls else 0.0}
+            return result
+
+    def segment(self, question, context):
+        """
+        对问句进行结巴分词，同一问句只分词一次
+        :param question: 问句
+        :param context: 本次预测的共享上下文
+        :return: 分词列表
+        """
+        if "seg_list" not in context:
+            start_time = time.perf_counter()
+            context["seg_list"] = list(jieba.cut(question))
+            self.record_stage("segment", True, time.perf_counter() - start_time)
+        return context["seg_list"]
+
+    def predict_stage(self, stage, question, context) -> tuple:
+        """
+        使用单个阶段进行预测
+        :param stage: 阶段名
+        :param question: 问句
+        :param context: 本次预测的共享上下文
+        :return: 问句类型，置信度（关键词为1，模板为1-归一化编辑距离，模型为分类概率）
+        """
+        if stage == "keyword":
+            label = self.keyword_predictor.question_predict_by_keyword(question)
+            return label, 1.0 if label else 0.0
+        elif stage == "template":
+            result = self.template_predictor.question_predict_top_k(question, 1)
+            if result:
+                return result[0][1], 1.0 - result[0][0]
+            return "", 0.0
         else:
-            return ""
+            return self.model_predictor.question_predict_by_fastText_with_prob(question,
+                                                                               self.segment(question, context))
+
+    def predict_with_detail(self, question) -> tuple:
+        """
+        级联预测问句类型
+        :param question: 问句
+        :return: 问句类型，命中阶段，置信度
+        """
+        context = {}
+        best = ("", "", 0.0)
+        for stage in self.stage_names:
+            start_time = time.perf_counter()
+            label, confidence = self.predict_stage(stage, question, context)
+            hit = label != "" and confidence >= self.min_confidence[stage]
+            self.record_stage(stage, hit, time.perf_counter() - start_time)
+            if hit:
+                return label, stage, confidence
+            if label != "" and confidence > best[2]:
+                best = (label, stage, confidence)
+        # 各阶段置信度均未达到要求时，返回置信度最高的结果
+        return best
+
+    def predict(self, question) -> str:
+        """
+        级联预测问句类型
+        :param question: 问句
+        :return: 问句类型
+        """
+        return self.predict_with_detail(question)[0]
 
 
 if __name__ == '__main__':
@@ -153,5 +444,7 @@ if __name__ == '__main__':
     # print(label)
     qt_predict_template = QTPredictTemplate()
     qt_predict_template.pre_load_question_template()
+    qt_predict_template.pre_load_template_threshold()
+    print(qt_predict_template.question_predict_top_k("今年哈工大招多少人？"))
     label = qt_predict_template.question_predict_by_template("今年哈工大招多少人？")
     print(label)
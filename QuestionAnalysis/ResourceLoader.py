@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : ResourceLoader.py
+@Author: SangYu
+@Date  : 2019/5/8 15:20
+@Desc  : 资源并行加载器
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+
+
+class ResourceLoader:
+    """
+    使用线程池并行加载资源，进度回调在调用线程中执行（便于刷新界面）
+    """
+
+    def __init__(self, max_workers: int = 4):
+        """
+        :param max_workers: 线程池大小
+        """
+        self.max_workers = max_workers
+        # 任务列表：(资源名, 加载函数, 进度权重)
+        self.tasks = []
+
+    def add_task(self, name: str, func, weight: int = 1):
+        """
+        添加加载任务
+        :param name: 资源名
+        :param func: 无参加载函数
+        :param weight: 进度权重，耗时越长的资源权重越大
+        :return:
+        """
+        self.tasks.append((name, func, weight))
+
+    @staticmethod
+    def run_task(func) -> float:
+        """
+        执行单个加载任务并计时
+        :param func: 加载函数
+        :return: 耗时(s)
+        """
+        start_time = time.perf_counter()
+        func()
+        return time.perf_counter() - start_time
+
+    def load(self, progress_callback=None) -> dict:
+        """
+        并行执行所有加载任务，全部完成后返回
+        :param progress_callback: 进度回调函数(资源名, 完成百分比)
+        :return: 资源名 -> 加载耗时(s)
+        """
+        total_weight = sum(task[2] for task in self.tasks) or 1
+        done_weight = 0
+        cost_time = {}
+        first_error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.run_task, func): (name, weight) for name, func, weight in self.tasks}
+            for future in as_completed(futures):
+                name, weight = futures[future]
+                try:
+                    cost_time[name] = future.result()
+                except Exception as e:
+                    if first_error is None:
+                        first_error = e
+                    continue
+                done_weight += weight
+                if progress_callback is not None:
+                    progress_callback(name, int(done_weight * 100 / total_weight))
+        if first_error is not None:
+            raise first_error
+        return cost_time
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : WarmStartCache.py
+@Author: SangYu
+@Date  : 2019/5/9 9:40
+@Desc  : 预加载数据的热启动缓存（按源文件哈希校验，pickle二进制存储）
+"""
+import os
+import pickle
+import hashlib
+import threading
+
+from Log.Logger import get_logger
+from Monitor.Metrics import cache_access
+
+# 缓存格式版本，缓存结构变化时递增，旧版本缓存自动失效
+cache_version = 2
+# 缓存目录（按版本区分）
+cache_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+cache_dir = os.path.join(cache_root, "v%d" % cache_version)
+# 是否启用缓存
+cache_enabled = True
+
+# 文件哈希的进程内缓存：路径 -> (文件大小, 修改时间, 哈希值)
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+
+# 计算文件内容哈希
+def file_hash(file_path: str) -> str:
+    """
+    计算文件内容的sha1哈希（同一进程内文件大小与修改时间不变时复用结果）
+    :param file_path: 文件路径
+    :return: 哈希值，文件不存在时返回""
+    """
+    if not os.path.exists(file_path):
+        return ""
+    stat = os.stat(file_path)
+    with _hash_lock:
+        memo = _hash_memo.get(file_path)
+    if memo and memo[0] == stat.st_size and memo[1] == stat.st_mtime:
+        return memo[2]
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as f_source:
+        for block in iter(lambda: f_source.read(1 << 20), b""):
+            sha1.update(block)
+    digest = sha1.hexdigest()
+    with _hash_lock:
+        _hash_memo[file_path] = (stat.st_size, stat.st_mtime, digest)
+    return digest
+
+
+# 构造缓存校验头
+def build_cache_header(source_paths: list) -> dict:
+    """
+    构造缓存校验头（缓存版本+各源文件哈希）
+    :param source_paths: 源文件路径列表
+    :return: 校验头
+    """
+    return {"version": cache_version,
+            "sources": {os.path.basename(path): file_hash(path) for path in source_paths}}
+
+
+# 从缓存加载数据，缓存不存在或失效时重新构造并写入缓存
+def load_or_build(name: str, source_paths: list, builder):
+    """
+    从缓存加载数据，缓存不存在或源文件发生变化时调用builder重新构造并写入缓存
+    :param name: 缓存名
+    :param source_paths: 数据依赖的源文件路径列表
+    :param builder: 无参构造函数，返回需要缓存的数据
+    :return: 数据
+    """
+    if not cache_enabled:
+        return builder()
+    header = build_cache_header(source_paths)
+    cache_path = os.path.join(cache_dir, name + ".pkl")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as p_file:
+                cache_header = pickle.load(p_file)
+                if cache_header == header:
+                    data = pickle.load(p_file)
+                    cache_access("warm_start", True)
+                    return data
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            pass
+    cache_access("warm_start", False)
+    data = builder()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 先写临时文件再替换，避免并发读取到不完整的缓存
+        temp_path = "%s.%d.%d.tmp" % (cache_path, os.getpid(), threading.get_ident())
+        with open(temp_path, "wb") as p_file:
+            pickle.dump(header, p_file, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, p_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+    return data
+
+
+# 将结巴前缀词典缓存放入热启动缓存目录，并按词典哈希校验
+def prepare_jieba_cache(tokenizer) -> str:
+    """
+    将结巴前缀词典缓存（marshal格式）放入热启动缓存目录，词典内容变化时删除旧缓存
+    需在tokenizer.initialize()之前调用；缓存目录不可写（如只读安装）时只记录日志，结巴使用默认方式加载
+    :param tokenizer: 结巴分词器（jieba.dt）
+    :return: 结巴缓存文件路径，未启用缓存或缓存目录不可写时返回""
+    """
+    if not cache_enabled:
+        return ""
+    if tokenizer.dictionary:
+        dict_path = tokenizer.dictionary
+    else:
+        import jieba
+        dict_path = os.path.join(os.path.dirname(os.path.abspath(jieba.__file__)), "dict.txt")
+    jieba_cache_path = os.path.join(cache_dir, "jieba.cache")
+    hash_path = jieba_cache_path + ".sha1"
+    dict_hash = file_hash(dict_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_hash = ""
+        if os.path.exists(hash_path):
+            with open(hash_path, "r", encoding="utf-8") as f_hash:
+                cache_hash = f_hash.read().strip()
+        if cache_hash != dict_hash:
+            if os.path.exists(jieba_cache_path):
+                os.remove(jieba_cache_path)
+            with open(hash_path, "w", encoding="utf-8") as f_hash:
+                f_hash.write(dict_hash)
+    except OSError as e:
+        get_logger("prepare_jieba_cache").warning("结巴词典缓存目录%s不可用（%s），不使用热启动缓存", cache_dir, e)
+        return ""
+    tokenizer.cache_file = jieba_cache_path
+    return jieba_cache_path
+
+
+# 清空热启动缓存
+def clear_cache():
+    """
+    删除所有版本的热启动缓存文件
+    :return:
+    """
+    if not os.path.exists(cache_root):
+        return
+    for root, dirs, files in os.walk(cache_root, topdown=False):
+        for file in files:
+            os.remove(os.path.join(root, file))
+        for directory in dirs:
+            os.rmdir(os.path.join(root, directory))
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : FrequentQuestionRetrieval.py
+@Author: SangYu
+@Date  : 2019/5/20 10:15
+@Desc  : 常问问题集检索：由预处理后的常问问题集列存文件（见SystemTest.DataNormalize）按学校离线构建
+字符n-gram（单字与双字）BM25倒排索引，查询时以mmap加载，
+返回与问题最相似的已回答问题，作为模板方法无法回答时的备用回答
+每个学校的索引由三个文件组成：学校名.docs.col（问题与回答，列存）、学校名.terms.col（按字符串排序的词项，列存）、
+学校名.bm25（文档长度、各词项的倒排列表）
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+from FileRead.ColumnarRead import ColumnarWriter, ColumnarReader, align8
+from Log.Logger import MyLog, get_logger
+from Monitor.Metrics import timed
+from SystemTest.DataNormalize import frequent_question_normalize_columnar
+
+# 常问问题集目录（source为抓取的csv）、预处理后的列存文件目录与索引目录
+faq_question_set_dir = "../InformationGet/Information/大学/常问问题集"
+faq_columnar_dir = faq_question_set_dir + "/预处理/columnar"
+faq_index_dir = faq_question_set_dir + "/预处理/index"
+# BM25参数
+bm25_k1 = 1.2
+bm25_b = 0.75
+# 倒排列表文件魔数
+bm25_magic = b"QABM25\x001"
+# 问题中保留的字符（汉字、字母、数字），其余字符不参与检索
+term_char_pattern = re.compile(r"[一-龥a-z0-9]+")
+# 学校简称 -> 常问问题集中的学校名（简称后紧跟“学”时不识别，如“东北大学”中的“北大”、“东南大学”中的“南大”）
+faq_school_alias = {"北大": "北京大学", "北大医学部": "北京大学医学部", "清华": "清华大学", "复旦": "复旦大学",
+                    "上交医学院": "上海交通大学医学院", "上海交通大学医学部": "上海交通大学医学院",
+                    "浙大": "浙江大学", "南大": "南京大学", "中科大": "中国科学技术大学", "哈工大": "哈尔滨工业大学",
+                    "哈工大(威海)": "哈尔滨工业大学(威海)", "哈工大威海": "哈尔滨工业大学(威海)", "西交大": "西安交通大学"}
+# 已加载的索引：(索引目录, 学校名) -> (.bm25文件的修改时间, FrequentQuestionIndex)，索引重新构建后重新加载
+index_cache = {}
+
+
+# 问题切分为词项
+def question_terms(question: str, unigram: bool = True, bigram: bool = True) -> list:
+    """
+    问题切分为词项：去除标点等字符后取所有单字与相邻双字
+    :param question: 问题
+    :param unigram: 是否包含单字
+    :param bigram: 是否包含双字
+    :return: 词项列表（可重复）
+    """
+    terms = []
+    for segment in term_char_pattern.findall(question.lower()):
+        if unigram:
+            terms.extend(segment)
+        if bigram:
+            terms.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return terms
+
+
+# 构建常问问题集索引
+# noinspection PyProtectedMember
+def build_frequent_question_index(columnar_dir: str = faq_columnar_dir, index_dir: str = faq_index_dir,
+                                  schools: list = None) -> dict:
+    """
+    构建常问问题集索引（离线执行）：相同问题只保留最长的回答，问题或回答为空的记录不参与检索
+    列存文件不在版本库中，目录中没有列存文件时先由常问问题集(csv)生成（见SystemTest.DataNormalize）
+    :param columnar_dir: 常问问题集列存文件目录（每个学校一个“学校名.col”文件，位于常问问题集目录/预处理/columnar）
+    :param index_dir: 索引目录
+    :param schools: 学校列表，为None时构建目录下所有学校
+    :return: 学校名 -> 索引的问题数
+    """
+    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    # 关闭已加载的索引后再替换索引文件
+    clear_frequent_question_index_cache(index_dir)
+    if not os.path.isdir(columnar_dir) or not any(file.endswith(".col") for file in os.listdir(columnar_dir)):
+        question_set_dir = os.path.dirname(os.path.dirname(os.path.normpath(columnar_dir)))
+        function_logger.info("常问问题集列存文件不存在，由%s/source中的常问问题集生成...", question_set_dir)
+        frequent_question_normalize_columnar(question_set_dir)
+    os.makedirs(index_dir, exist_ok=True)
+    schools = schools or sorted(file[:-len(".col")] for file in os.listdir(columnar_dir) if file.endswith(".col"))
+    doc_count = {}
+    for school in schools:
+        # 词项 -> [(文档号, 词频)]
+        postings = {}
+        doc_lengths = array("I")
+        with ColumnarReader(os.path.join(columnar_dir, school + ".col")) as fqa_reader, \
+                ColumnarWriter(os.path.join(index_dir, school + ".docs.col"),
+                               ["question", "answer", "title", "time"]) as docs_writer:
+            # 问题 -> (行号, 回答长度)，相同问题保留最长的回答，只在写入索引时读取回答等其它列
+            question_rows = {}
+            for i_row, (question, answer) in enumerate(zip(fqa_reader.column("question"),
+                                                           fqa_reader.column("answer"))):
+                question = question.strip()
+                answer_length = len(answer.strip())
+                if not question or not answer_length:
+                    continue
+                if question not in question_rows or answer_length > question_rows[question][1]:
+                    question_rows[question] = (i_row, answer_length)
+            row_count = len(fqa_reader)
+            for doc_id, (question, (i_row, _)) in enumerate(question_rows.items()):
+                docs_writer.append([question, fqa_reader.get(i_row, "answer").strip(),
+                                    fqa_reader.get(i_row, "title"), fqa_reader.get(i_row, "time")])
+                terms = question_terms(question)
+                doc_lengths.append(len(terms))
+                term_count = {}
+                for term in terms:
+                    term_count[term] = term_count.get(term, 0) + 1
+                for term, count in term_count.items():
+                    postings.setdefault(term, []).append((doc_id, count))
+        sorted_terms = sorted(postings)
+        posting_offsets = array("Q", [0])
+        posting_docs = array("I")
+        posting_tfs = array("I")
+        with ColumnarWriter(os.path.join(index_dir, school + ".terms.col"), ["term"]) as terms_writer:
+            for term in sorted_terms:
+                terms_writer.append([term])
+                for doc_id, count in postings[term]:
+                    posting_docs.append(doc_id)
+                    posting_tfs.append(count)
+                posting_offsets.append(len(posting_docs))
+        header = {"docs": len(doc_lengths), "terms": len(sorted_terms),
+                  "avgdl": sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0}
+        write_index_arrays(os.path.join(index_dir, school + ".bm25"), header,
+                           [("doc_lengths", doc_lengths), ("posting_offsets", posting_offsets),
+                            ("posting_docs", posting_docs), ("posting_tfs", posting_tfs)])
+        doc_count[school] = len(doc_lengths)
+        function_logger.info("%s：问题%d条（去重后%d条），词项%d个" % (school, row_count, len(doc_lengths),
+                                                               len(sorted_terms)))
+    return doc_count
+
+
+# 写入数组文件
+def write_index_arrays(file_path: str, header: dict, arrays: list):
+    """
+    写入数组文件：魔数 | 文件头长度(uint32) | 文件头(json，包含各数组的位置、类型与长度) | 各数组（8字节对齐）
+    :param file_path: 文件路径
+    :param header: 文件头中的其它信息
+    :param arrays: [(数组名, array)]
+    :return:
+    """
+    header = dict(header, byteorder=sys.byteorder, arrays={})
+    for name, values in arrays:
+        header["arrays"][name] = {"pos": 0, "typecode": values.typecode, "length": len(values)}
+    header_size = len(json.dumps(header).encode("utf-8")) + 32 * len(arrays)
+    position = align8(len(bm25_magic) + 4 + header_size)
+    for name, values in arrays:
+        header["arrays"][name]["pos"] = position
+        position = align8(position + values.itemsize * len(values))
+    header_data = json.dumps(header).encode("utf-8")
+    header_data += b" " * (header_size - len(header_data))
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(bm25_magic)
+        file.write(struct.pack("<I", header_size))
+        file.write(header_data)
+        for name, values in arrays:
+            file.write(b"\x00" * (header["arrays"][name]["pos"] - file.tell()))
+            values.tofile(file)
+    os.replace(temp_path, file_path)
+
+
+class FrequentQuestionIndex:
+    """
+    一个学校的常问问题集索引（mmap加载，只在加载时计算各文档的长度归一化系数）
+    """
+
+    def __init__(self, index_dir: str, school: str):
+        self.school = school
+        self.docs = ColumnarReader(os.path.join(index_dir, school + ".docs.col"))
+        self.terms = ColumnarReader(os.path.join(index_dir, school + ".terms.col"))
+        self.file = open(os.path.join(index_dir, school + ".bm25"), "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mmap[:len(bm25_magic)] != bm25_magic:
+            raise ValueError("%s不是常问问题集索引" % school)
+        header_size = struct.unpack_from("<I", self.mmap, len(bm25_magic))[0]
+        header_start = len(bm25_magic) + 4
+        header = json.loads(self.mmap[header_start:header_start + header_size].decode("utf-8"))
+        self.doc_count = header["docs"]
+        self.term_count = header["terms"]
+        self.avgdl = header["avgdl"] or 1.0
+        self.arrays = {}
+        for name, info in header["arrays"].items():
+            itemsize = array(info["typecode"]).itemsize
+            view = memoryview(self.mmap)[info["pos"]:info["pos"] + itemsize * info["length"]]
+            if header["byteorder"] == sys.byteorder:
+                self.arrays[name] = view.cast(info["typecode"])
+            else:
+                values = array(info["typecode"], view.tobytes())
+                values.byteswap()
+                view.release()
+                self.arrays[name] = values
+        self.length_norm = [bm25_k1 * (1 - bm25_b + bm25_b * length / self.avgdl)
+                            for length in self.arrays["doc_lengths"]]
+
+    def find_term(self, term: str) -> int:
+        """
+        二分查找词项
+        :param term: 词项
+        :return: 词项序号，不存在时返回-1
+        """
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            middle_term = self.terms.get(middle, "term")
+            if middle_term < term:
+                low = middle + 1
+            elif middle_term > term:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def search(self, question: str, k: int = 3) -> list:
+        """
+        检索与问题最相似的k个已回答问题：以双字计算得分，常见单字的倒排列表很长，只在没有双字命中时使用单字
+        :param question: 问题
+        :param k: 返回的问题数
+        :return: [{"school": 学校名, "question": 问题, "answer": 回答, "score": BM25得分}]，按得分从高到低排列
+        """
+        if not self.doc_count:
+            return []
+        term_ids = [self.find_term(term) for term in set(question_terms(question, unigram=False))]
+        term_ids = [i_term for i_term in term_ids if i_term >= 0]
+        if not term_ids:
+            term_ids = [self.find_term(term) for term in set(question_terms(question, bigram=False))]
+            term_ids = [i_term for i_term in term_ids if i_term >= 0]
+        posting_offsets = self.arrays["posting_offsets"]
+        posting_docs = self.arrays["posting_docs"]
+        posting_tfs = self.arrays["posting_tfs"]
+        length_norm = self.length_norm
+        scores = {}
+        for i_term in term_ids:
+            start = posting_offsets[i_term]
+            end = posting_offsets[i_term + 1]
+            df = end - start
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for doc_id, tf in zip(posting_docs[start:end], posting_tfs[start:end]):
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (bm25_k1 + 1) / (tf + length_norm[doc_id])
+        results = []
+        for doc_id, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            results.append({"school": self.school, "question": self.docs.get(doc_id, "question"),
+                            "answer": self.docs.get(doc_id, "answer"), "score": score})
+        return results
+
+    def close(self):
+        for values in self.arrays.values():
+            if isinstance(values, memoryview):
+                values.release()
+        self.arrays = {}
+        self.mmap.close()
+        self.file.close()
+        self.docs.close()
+        self.terms.close()
+
+
+# 索引目录中的学校
+def list_index_schools(index_dir: str = faq_index_dir) -> list:
+    if not os.path.isdir(index_dir):
+        return []
+    return sorted(file[:-len(".bm25")] for file in os.listdir(index_dir) if file.endswith(".bm25"))
+
+
+# 获取学校的索引（加载后缓存）
+def get_frequent_question_index(school: str, index_dir: str = faq_index_dir) -> FrequentQuestionIndex:
+    """
+    获取学校的索引：加载后缓存，.bm25文件的修改时间变化（索引重新构建）时重新加载
+    :param school: 学校名
+    :param index_dir: 索引目录
+    :return: 索引
+    """
+    mtime = os.stat(os.path.join(index_dir, school + ".bm25")).st_mtime_ns
+    cached = index_cache.get((index_dir, school))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    index = FrequentQuestionIndex(index_dir, school)
+    index_cache[(index_dir, school)] = (mtime, index)
+    if cached is not None:
+        cached[1].close()
+    return index
+
+
+# 关闭并清除已加载的索引
+def clear_frequent_question_index_cache(index_dir: str = None):
+    """
+    关闭并清除已加载的索引
+    :param index_dir: 只清除该索引目录的索引，为None时清除所有索引
+    :return:
+    """
+    for key in list(index_cache):
+        if index_dir is None or key[0] == index_dir:
+            index_cache.pop(key)[1].close()
+
+
+# 识别问题中提到的学校
+def match_question_schools(question: str, schools: list) -> tuple:
+    """
+    识别问题中提到的学校：先匹配全称（较长的优先，如“北京大学医学部”不会同时识别为“北京大学”），
+    替换为空格后再匹配简称，简称后紧跟“学”时不识别（如“东北大学”中的“北大”）
+    :param question: 问题
+    :param schools: 可识别的学校名列表
+    :return: 学校名列表，替换掉学校名与简称后的问题
+    """
+    detected = []
+    for school in sorted(schools, key=len, reverse=True):
+        if school in question:
+            question = question.replace(school, " ")
+            detected.append(school)
+    aliases = sorted((alias for alias, school in faq_school_alias.items() if school in schools),
+                     key=len, reverse=True)
+    if aliases:
+        alias_pattern = re.compile("(?:%s)(?!学)" % "|".join(re.escape(alias) for alias in aliases))
+
+        # 记录识别的简称并替换为空格
+        def replace_alias(match):
+            school_name = faq_school_alias[match.group(0)]
+            if school_name not in detected:
+                detected.append(school_name)
+            return " "
+
+        question = alias_pattern.sub(replace_alias, question)
+    return detected, question
+
+
+# 识别问题中提到的学校
+def detect_question_schools(question: str, schools: list) -> list:
+    """
+    识别问题中提到的学校（全称或简称），见match_question_schools
+    :param question: 问题
+    :param schools: 可识别的学校名列表
+    :return: 学校名列表
+    """
+    return match_question_schools(question, schools)[0]
+
+
+# 检索常问问题集
+def search_frequent_questions(question: str, school_names: list = None, k: int = 3,
+                              index_dir: str = faq_index_dir) -> dict:
+    """
+    检索常问问题集，返回各学校与问题最相似的k个已回答问题
+    问题中没有提到学校时检索所有学校，只返回所有学校中得分最高的k个问题（按学校分组，得分最高的学校在前）
+    :param question: 问题
+    :param school_names: 检索的学校列表，为None时检索问题中提到的学校，问题中没有提到学校时检索所有学校
+    :param k: 每个学校返回的问题数（检索所有学校时为总问题数）
+    :param index_dir: 索引目录
+    :return: 学校名 -> 检索结果列表（见FrequentQuestionIndex.search），索引不存在时返回空字典
+    """
+    function_logger = get_logger("search_frequent_questions")
+    schools = list_index_schools(index_dir)
+    if not schools:
+        function_logger.warning("常问问题集索引%s不存在，请先运行build_frequent_question_index", index_dir)
+        return {}
+    # 学校名在该校的问题中很常见，不参与检索
+    detected_schools, question = match_question_schools(question, schools)
+    search_all = school_names is None and not detected_schools
+    if school_names is None:
+        school_names = detected_schools or schools
+    results = {}
+    with timed("faq_search"):
+        for school in school_names:
+            if school in schools:
+                school_results = get_frequent_question_index(school, index_dir).search(question, k)
+                if school_results:
+                    results[school] = school_results
+    if search_all:
+        # 各学校的得分均为BM25得分，取所有学校中得分最高的k个
+        top_results = heapq.nlargest(k, (result for school_results in results.values() for result in school_results),
+                                     key=lambda result: result["score"])
+        results = {}
+        for result in top_results:
+            results.setdefault(result["school"], []).append(result)
+    return results
+
+
+if __name__ == "__main__":
+    main_logger = MyLog(logger=__name__).getlog()
+    main_logger.info("start...")
+    build_frequent_question_index()
+    for main_school, main_results in search_frequent_questions("南京大学软件工程专业怎么样？").items():
+        for main_result in main_results:
+            main_logger.info("%s\t%.2f\t%s\t%s", main_school, main_result["score"], main_result["question"],
+                             main_result["answer"][:50])
+    main_logger.info("end...")
@@ -10,68 +10,203 @@ from QuestionAnalysis.QuestionPretreatment import (question_segment_hanlp, quest
                                                    question_analysis_to_keyword, question_keyword_normalize,
                                                    find_question_match_template)
 from TemplateLoad.QuestionTemplate import (build_mysql_string_by_template_and_keymap,
-                                           build_mysql_answer_string_by_template)
-from InformationGet.MysqlOperation import mysql_query_sentence
+                                           build_mysql_answer_strings_by_template)
+from InformationGet.MysqlOperation import mysql_query_sentence, mysql_query_batches
+from Monitor.Tracer import trace_span, set_tracing, export_trace_json
+from Monitor.Metrics import timed, counter_inc
+from Monitor.Profiler import profile_request
 
 
-# 传入问题使用模板回答问题
-def answer_question_by_template(question: str, school_flag: int = 0, school_name: str = "")->(dict, list):
+# 分析问题：分词、抽象问句、提取关键词、匹配模板并构造sql语句
+def analyse_question_by_template(question: str, school_flag: int = 0, school_name: str = "") -> dict:
     """
-    分词-》提取关键词、抽象问句-》抽象问句匹配模板-》模板构造sql语句-》sql语句返回查询结果-》查询结果构造模板输出
+    分词-》提取关键词、抽象问句-》抽象问句匹配模板-》模板构造sql语句
     :param question: 问题
     :param school_flag 学校标志位，是否指定默认学校
     :param school_name 指定的默认学校名
-    :return: 中间结果词典，最终答案列表
+    :return: 中间结果词典
     """
     # 保存中间结果
     mid_result = {}
-    segment_list = question_segment_hanlp(question)
+    with trace_span("segment"):
+        segment_list = question_segment_hanlp(question)
     mid_result["segment_list"] = segment_list
-    ab_question = question_abstract(segment_list)
+    with trace_span("abstract"):
+        ab_question = question_abstract(segment_list)
     mid_result["ab_question"] = ab_question
-    keyword = question_analysis_to_keyword(segment_list)
+    with trace_span("keyword"):
+        keyword = question_analysis_to_keyword(segment_list)
     # 修改默认学校名
     if school_flag:
         keyword["search_school"] = school_name
     mid_result["keyword"] = keyword
-    keyword_normalize = question_keyword_normalize(keyword)
+    with trace_span("keyword_normalize"):
+        keyword_normalize = question_keyword_normalize(keyword)
     mid_result["keyword_normalize"] = keyword_normalize
     template_sentence_type = keyword_normalize["search_table"]
-    fq_condition, fq_target, match_template_question, match_template_answer \
-        = find_question_match_template(ab_question, template_sentence_type)
+    with trace_span("template_match"):
+        fq_condition, fq_target, match_template_question, match_template_answer \
+            = find_question_match_template(ab_question, template_sentence_type)
     # 修改模板框
     if school_flag:
         if "(school)" not in match_template_question:
             match_template_question = "(school)"+match_template_question
     mid_result["match_template_question"] = match_template_question
     mid_result["match_template_answer"] = match_template_answer
-    mysql_string = build_mysql_string_by_template_and_keymap(match_template_question, template_sentence_type,
-                                                             keyword_normalize)
+    with trace_span("build_sql"):
+        mysql_string = build_mysql_string_by_template_and_keymap(match_template_question, template_sentence_type,
+                                                                 keyword_normalize)
     mid_result["mysql_string"] = mysql_string
-    # 数据库查询
-    result = []
-    result_edit = []
+    return mid_result
+
+
+# 不能查询时的回答结果分类 -> 提示信息
+check_mysql_messages = {"no_condition": "问句条件词为空，无法构建查询语句！",
+                        "too_wide": "问句条件词只有学校，查询过宽！"}
+
+
+# 检查sql语句能否用于查询
+def check_mysql_string_result(mysql_string: str) -> str:
+    """
+    检查sql语句能否用于查询
+    :param mysql_string: sql语句
+    :return: 不能查询时返回回答结果分类（no_condition: 条件词为空，too_wide: 只有学校条件），能查询时返回""
+    """
     if mysql_string == "":
-        result_edit.append("问句条件词为空，无法构建查询语句！")
-    else:
-        # 若只有学校一个关键词
-        if "and" not in mysql_string:
-            result_edit.append("问句条件词只有学校，查询过宽！")
+        return "no_condition"
+    # 若只有学校一个关键词
+    if "and" not in mysql_string:
+        return "too_wide"
+    return ""
+
+
+# 检查sql语句能否用于查询
+def check_mysql_string(mysql_string: str) -> str:
+    """
+    检查sql语句能否用于查询
+    :param mysql_string: sql语句
+    :return: 不能查询时返回提示信息，能查询时返回""
+    """
+    return check_mysql_messages.get(check_mysql_string_result(mysql_string), "")
+
+
+# 传入问题使用模板回答问题
+def answer_question_by_template(question: str, school_flag: int = 0, school_name: str = "")->(dict, list):
+    """
+    分词-》提取关键词、抽象问句-》抽象问句匹配模板-》模板构造sql语句-》sql语句返回查询结果-》查询结果构造模板输出
+    :param question: 问题
+    :param school_flag 学校标志位，是否指定默认学校
+    :param school_name 指定的默认学校名
+    :return: 中间结果词典，最终答案列表
+    """
+    with profile_request("answer_question_by_template"), trace_span("answer_question_by_template"), \
+            timed("answer_question_by_template"):
+        mid_result = analyse_question_by_template(question, school_flag, school_name)
+        # 数据库查询
+        result_edit = []
+        message = check_mysql_string(mid_result["mysql_string"])
+        if message:
+            result_edit.append(message)
+            mid_result["answer_result"] = check_mysql_string_result(mid_result["mysql_string"])
         else:
-            result = mysql_query_sentence(mysql_string)
+            result = mysql_query_sentence(mid_result["mysql_string"], compact_rows=True)
             if len(result) == 0:
                 result_edit.append("查询结果为空！")
+                mid_result["answer_result"] = "empty"
             else:
                 mid_result["search_result"] = result
-                for item in result:
-                    answer_string = build_mysql_answer_string_by_template(match_template_answer, item)
-                    result_edit.append(answer_string)
+                mid_result["answer_result"] = "answered"
+                with trace_span("answer_render"):
+                    result_edit.extend(build_mysql_answer_strings_by_template(mid_result["match_template_answer"],
+                                                                              result))
+        counter_inc("answer_result_total", labels={"result": mid_result["answer_result"]})
     return mid_result, result_edit
 
 
+# 按分析结果流式生成答案
+def generate_answers_by_analysis(mid_result: dict, limit: int = 0, offset: int = 0, batch_size: int = 100):
+    """
+    按分析结果流式查询并生成答案，查询结果按批读取和构造，不保存全部查询结果
+    :param mid_result: analyse_question_by_template返回的中间结果词典
+    :param limit: 最多生成的答案数，0表示不限制
+    :param offset: 跳过的答案数（用于分页）
+    :param batch_size: 每批读取的记录数
+    :return: 答案生成器（无法查询或查询结果为空时只产出提示信息）
+    迭代结束后mid_result["answer_result"]为本次查询的回答结果分类（不计入指标，由调用方按问题计数一次）
+    """
+    message = check_mysql_string(mid_result["mysql_string"])
+    if message:
+        mid_result["answer_result"] = check_mysql_string_result(mid_result["mysql_string"])
+        yield message
+        return
+    answer_count = 0
+    for records in mysql_query_batches(mid_result["mysql_string"], batch_size, limit, offset, compact_rows=True):
+        answer_count += len(records)
+        yield from build_mysql_answer_strings_by_template(mid_result["match_template_answer"], records)
+    if answer_count == 0:
+        mid_result["answer_result"] = "empty"
+        yield "查询结果为空！"
+    else:
+        mid_result["answer_result"] = "answered"
+
+
+# 传入问题使用模板流式回答问题
+def answer_question_by_template_stream(question: str, school_flag: int = 0, school_name: str = "",
+                                       limit: int = 0, offset: int = 0, batch_size: int = 100) -> tuple:
+    """
+    使用模板流式回答问题：问题分析立即完成，答案在迭代时按批查询和构造
+    :param question: 问题
+    :param school_flag 学校标志位，是否指定默认学校
+    :param school_name 指定的默认学校名
+    :param limit: 最多生成的答案数，0表示不限制
+    :param offset: 跳过的答案数（用于分页）
+    :param batch_size: 每批读取的记录数
+    :return: 中间结果词典，答案生成器
+    """
+    mid_result = analyse_question_by_template(question, school_flag, school_name)
+    return mid_result, generate_answers_by_analysis(mid_result, limit, offset, batch_size)
+
+
+# 按分析结果返回一页答案
+def answer_page_by_analysis(mid_result: dict, page: int = 0, page_size: int = 20) -> tuple:
+    """
+    按分析结果返回一页答案
+    :param mid_result: analyse_question_by_template返回的中间结果词典
+    :param page: 页号（从0开始）
+    :param page_size: 每页答案数
+    :return: 本页答案列表，是否还有下一页
+    """
+    # 多取一条用于判断是否还有下一页
+    answers = list(generate_answers_by_analysis(mid_result, page_size + 1, page * page_size,
+                                                min(page_size + 1, 100)))
+    return answers[:page_size], len(answers) > page_size
+
+
+# 传入问题使用模板回答问题，返回第一页答案
+def answer_page_by_question(question: str, school_flag: int = 0, school_name: str = "",
+                            page_size: int = 20) -> tuple:
+    """
+    分析问题并返回第一页答案（与answer_question_by_template相同的剖析、链路追踪与耗时指标，回答结果按问题计数一次），
+    其余页使用answer_page_by_analysis查询
+    :param question: 问题
+    :param school_flag 学校标志位，是否指定默认学校
+    :param school_name 指定的默认学校名
+    :param page_size: 每页答案数
+    :return: 中间结果词典，第一页答案列表，是否还有下一页
+    """
+    with profile_request("answer_question_by_template"), trace_span("answer_question_by_template"), \
+            timed("answer_question_by_template"):
+        mid_result = analyse_question_by_template(question, school_flag, school_name)
+        with trace_span("answer_render"):
+            answers, has_more = answer_page_by_analysis(mid_result, 0, page_size)
+        counter_inc("answer_result_total", labels={"result": mid_result["answer_result"]})
+    return mid_result, answers, has_more
+
+
 if __name__ == '__main__':
     main_logger = MyLog(logger=__name__).getlog()
     main_logger.info("start...")
+    set_tracing(True)
     test_question = "哈工大前年软件工程石家庄招生人数？"
     main_logger.debug(test_question)
     test_mid_result, test_result = answer_question_by_template(test_question)
@@ -80,4 +215,6 @@ if __name__ == '__main__':
     main_logger.debug("查询结果：")
     for result in test_result:
         main_logger.debug(str(result))
+    # 导出各阶段耗时
+    export_trace_json("../Logs/answer_trace.json")
     main_logger.info("end...")
@@ -9,12 +9,12 @@ from Log.Logger import MyLog
 import sys
 import json
 import asyncio
-import aiohttp
-import requests
 
 
 # 深智语义相似度计算api,输入：句子对,对序号，分数列表
 async def deepintell_api(input_pair, i_pair, score_list):
+    # aiohttp只在调用接口时导入
+    import aiohttp
     async with aiohttp.ClientSession()as session:
         src = json.dumps(input_pair)
         # 外部访问
@@ -46,6 +46,7 @@ def run_event_loop(input_pairs,score_list):
 
 
 if __name__ == '__main__':
+    import requests
     mylogger = MyLog(logger=__name__).getlog()
     mylogger.info("start...")
     input_pair = {"sent1": "我是哈工大的学生", "sent2": "我是哈工程的学生"}
@@ -6,6 +6,7 @@
 @Desc  : 
 """
 import distance
+import heapq
 
 
 def edit_distance(sen1: str, sen2s: list)->list:
@@ -21,6 +22,132 @@ def edit_distance(sen1: str, sen2s: list)->list:
     return sorted(result)
 
 
+# 有界编辑距离，超过上界立即返回
+def bounded_levenshtein(sen1: str, sen2: str, max_distance: int) -> int:
+    """
+    有界编辑距离（逐行计算，当前行最小值超过上界即提前结束）
+    :param sen1: 句子1
+    :param sen2: 句子2
+    :param max_distance: 编辑距离上界
+    :return: 编辑距离，超过上界时返回max_distance+1
+    """
+    if abs(len(sen1) - len(sen2)) > max_distance:
+        return max_distance + 1
+    previous_row = list(range(len(sen2) + 1))
+    for i_char, char1 in enumerate(sen1, 1):
+        current_row = [i_char]
+        row_min = i_char
+        for j_char, char2 in enumerate(sen2, 1):
+            value = min(previous_row[j_char] + 1, current_row[j_char - 1] + 1,
+                        previous_row[j_char - 1] + (char1 != char2))
+            current_row.append(value)
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_row = current_row
+    if previous_row[-1] > max_distance:
+        return max_distance + 1
+    return previous_row[-1]
+
+
+class NGramIndex:
+    """
+    字符n-gram候选索引，配合有界编辑距离求与查询句最相似的前k个句子
+    相似度与distance.nlevenshtein(默认method=1)一致：编辑距离/较长句子长度
+    """
+
+    def __init__(self, sentences: list, n: int = 2):
+        """
+        :param sentences: 备选句子组
+        :param n: n-gram长度
+        """
+        self.n = n
+        self.sentences = list(sentences)
+        # n-gram倒排表：gram -> {句子序号: 出现次数}
+        self.postings = {}
+        # 按长度分桶：长度 -> [句子序号]
+        self.length_buckets = {}
+        for i_sen, sentence in enumerate(self.sentences):
+            for gram, count in self.grams(sentence).items():
+                self.postings.setdefault(gram, {})[i_sen] = count
+            self.length_buckets.setdefault(len(sentence), []).append(i_sen)
+
+    def grams(self, sentence: str) -> dict:
+        """
+        统计句子的n-gram
+        :param sentence: 句子
+        :return: gram -> 出现次数
+        """
+        gram_count = {}
+        for i_char in range(len(sentence) - self.n + 1):
+            gram = sentence[i_char:i_char + self.n]
+            gram_count[gram] = gram_count.get(gram, 0) + 1
+        return gram_count
+
+    def candidates(self, sentence: str, max_ratio: float) -> list:
+        """
+        使用长度过滤与n-gram计数过滤筛选候选句，按共有n-gram数降序排列
+        :param sentence: 查询句
+        :param max_ratio: 归一化编辑距离上界
+        :return: 候选句序号列表
+        """
+        shared = {}
+        for gram, count in self.grams(sentence).items():
+            for i_sen, doc_count in self.postings.get(gram, {}).items():
+                shared[i_sen] = shared.get(i_sen, 0) + min(count, doc_count)
+        length = len(sentence)
+        result = []
+        for bucket_length, bucket in self.length_buckets.items():
+            max_length = max(length, bucket_length)
+            max_distance = int(max_ratio * max_length + 1e-9)
+            if abs(length - bucket_length) > max_distance:
+                continue
+            # q-gram引理：编辑距离不超过k的两句至少共有 L-n+1-k*n 个n-gram
+            min_shared = max_length - self.n + 1 - max_distance * self.n
+            for i_sen in bucket:
+                shared_count = shared.get(i_sen, 0)
+                if shared_count >= min_shared:
+                    result.append((-shared_count, i_sen))
+        result.sort()
+        return [i_sen for _, i_sen in result]
+
+    def search(self, sentence: str, top_k: int = 1, max_ratio: float = 1.0, accept=None) -> list:
+        """
+        求与查询句最相似的前k个句子
+        :param sentence: 查询句
+        :param top_k: 返回结果个数
+        :param max_ratio: 归一化编辑距离上界（包含）
+        :param accept: 结果过滤函数accept(句子序号, 归一化编辑距离) -> bool，不满足的句子不计入前k个（如按标签的阈值）
+        :return: [(归一化编辑距离, 句子序号, 句子)]，按距离升序排列，格式与edit_distance一致
+        """
+        # 大顶堆保存当前最优的k个结果
+        heap = []
+        for i_sen in self.candidates(sentence, max_ratio):
+            candidate = self.sentences[i_sen]
+            max_length = max(len(sentence), len(candidate))
+            if max_length == 0:
+                if accept is not None and not accept(i_sen, 0.0):
+                    continue
+                heapq.heappush(heap, (-0.0, -i_sen))
+                if len(heap) > top_k:
+                    heapq.heappop(heap)
+                continue
+            max_distance = int(max_ratio * max_length + 1e-9)
+            # 已有k个结果时，以第k个结果的距离收紧上界
+            if len(heap) == top_k:
+                max_distance = min(max_distance, int(-heap[0][0] * max_length + 1e-9))
+            score = bounded_levenshtein(sentence, candidate, max_distance)
+            if score > max_distance:
+                continue
+            if accept is not None and not accept(i_sen, score / max_length):
+                continue
+            heapq.heappush(heap, (-(score / max_length), -i_sen))
+            if len(heap) > top_k:
+                heapq.heappop(heap)
+        return sorted((-score, -i_sen, self.sentences[-i_sen]) for score, i_sen in heap)
+
+
 if __name__ == '__main__':
     # sen1 = "我是学生"
     # sentences = ["我是哈工程的学生", "我是哈工大的大学生"]
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : CrawlEngineTest.py
+@Author: SangYu
+@Date  : 2019/5/20 10:15
+@Desc  : 使用本地http.server测试页面对异步爬虫引擎进行检测：429/5xx的指数退避重试、重试次数用尽、每个站点的并发上限、
+处理函数（在线程池中运行）添加后续页面、HTTP缓存（条件请求、304使用缓存、离线回放）
+"""
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from InformationGet import HttpCache
+from InformationGet.CrawlEngine import CrawlEngine
+from Log.Logger import MyLog
+
+
+class FixtureServer(ThreadingMixIn, HTTPServer):
+    """
+    测试页面服务器（每个请求一个线程），记录各路径的请求时间、最大并发请求数与返回304的次数
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FixtureHandler)
+        self.lock = threading.Lock()
+        self.request_times = {}
+        self.active = 0
+        self.max_active = 0
+        self.not_modified = 0
+
+    @property
+    def base_url(self) -> str:
+        return "http://127.0.0.1:%d" % self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    测试页面：
+    /fail/<状态码>/<次数>/<名称>：前<次数>次请求返回<状态码>，之后返回200
+    /slow/<名称>：等待0.2s后返回200
+    /etag/<名称>：返回200与ETag，请求带有相同的If-None-Match时返回304
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            times = server.request_times.setdefault(self.path, [])
+            times.append(time.time())
+            request_count = len(times)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            parts = self.path.strip("/").split("/")
+            status = 200
+            if parts[0] == "fail" and request_count <= int(parts[2]):
+                status = int(parts[1])
+            elif parts[0] == "slow":
+                time.sleep(0.2)
+            elif parts[0] == "etag" and self.headers.get("If-None-Match") == '"v1"':
+                with server.lock:
+                    server.not_modified += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = ("<html><body>%s</body></html>" % self.path).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            if parts[0] == "etag":
+                self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+# 记录页面内容的处理函数
+def collect_page(engine, url: str, page_source: str, meta: dict):
+    meta["pages"][url] = page_source
+
+
+# 添加后续页面的处理函数
+def add_child_pages(engine, url: str, page_source: str, meta: dict):
+    meta["pages"][url] = page_source
+    if meta["depth"] < 2:
+        for i_child in range(3):
+            engine.add("%s/%d" % (url, i_child), add_child_pages,
+                       {"pages": meta["pages"], "depth": meta["depth"] + 1})
+
+
+# 检测429/5xx的指数退避重试
+def test_retry_backoff(server: FixtureServer) -> bool:
+    """
+    429与503各失败两次后成功：页面应获取成功，共重试4次，相邻两次请求的间隔不小于退避时间的下限
+    :param server: 测试页面服务器
+    :return: 是否通过
+    """
+    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    backoff = 0.1
+    engine = CrawlEngine(retries=3, backoff=backoff, delay=0, use_cache=False)
+    pages = {}
+    paths = ["/fail/429/2/backoff", "/fail/503/2/backoff"]
+    for path in paths:
+        engine.add(server.base_url + path, collect_page, {"pages": pages})
+    stats = engine.run()
+    passed = stats["pages"] == 2 and stats["retries"] == 4 and len(pages) == 2
+    for path in paths:
+        times = server.request_times.get(path, [])
+        passed = passed and len(times) == 3
+        # 第i次重试等待backoff*2^i*(0.5~1.5)
+        for i_retry, (before, after) in enumerate(zip(times, times[1:])):
+            passed = passed and after - before >= backoff * (2 ** i_retry) * 0.5
+    function_logger.info("%s\t统计%s\t请求次数%s", "通过" if passed else "未通过", stats,
+                         {path: len(server.request_times.get(path, [])) for path in paths})
+    return passed
+
+
+# 检测重试次数用尽
+def test_retry_exhausted(server: FixtureServer) -> bool:
+    """
+    一直返回500：重试2次后放弃，页面记录为失败，处理函数不被调用
+    :param server: 测试页面服务器
+    :return: 是否通过
+    """
+    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    engine = CrawlEngine(retries=2, backoff=0.05, delay=0, use_cache=False)
+    pages = {}
+    path = "/fail/500/100/exhausted"
+    engine.add(server.base_url + path, collect_page, {"pages": pages})
+    stats = engine.run()
+    passed = stats["failed"] == 1 and stats["pages"] == 0 and not pages and \
+        len(server.request_times.get(path, [])) == 3 and len(engine.failed) == 1
+    function_logger.info("%s\t统计%s\t失败页面%s", "通过" if passed else "未通过", stats, engine.failed)
+    return passed
+
+
+# 检测每个站点的并发上限
+def test_per_host_limit(server: FixtureServer) -> bool:
+    """
+    全局并发8、每个站点并发2：同一站点的8个慢页面同时在处理的请求数不超过2
+    :param server: 测试页面服务器
+    :return: 是否通过
+    """
+    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    per_host = 2
+    engine = CrawlEngine(concurrency=8, per_host=per_host, delay=0, use_cache=False)
+    pages = {}
+    for i_page in range(8):
+        engine.add("%s/slow/%d" % (server.base_url, i_page), collect_page, {"pages": pages})
+    with server.lock:
+        server.max_active = 0
+    stats = engine.run()
+    passed = stats["pages"] == 8 and len(pages) == 8 and server.max_active == per_host
+    function_logger.info("%s\t统计%s\t最大并发请求数%d", "通过" if passed else "未通过", stats, server.max_active)
+    return passed
+
+
+# 检测处理函数添加后续页面
+def test_handler_add_pages(server: FixtureServer) -> bool:
+    """
+    处理函数在线程池中运行并添加后续页面（两层，每页3个）：所有页面（1+3+9个）都应在引擎结束前处理完成
+    :param server: 测试页面服务器
+    :return: 是否通过
+    """
+    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    engine = CrawlEngine(delay=0, use_cache=False)
+    pages = {}
+    engine.add(server.base_url + "/page", add_child_pages, {"pages": pages, "depth": 0})
+    stats = engine.run()
+    passed = stats["pages"] == 13 and len(pages) == 13
+    function_logger.info("%s\t统计%s", "通过" if passed else "未通过", stats)
+    return passed
+
+
+# 检测HTTP缓存
+def test_http_cache(server: FixtureServer) -> bool:
+    """
+    使用临时缓存目录：第一次获取返回200并存入缓存；第二次发送条件请求，服务器返回304，使用缓存的页面；
+    离线模式下不发送请求，缓存中有的页面从缓存读取，没有的页面记录为失败
+    :param server: 测试页面服务器
+    :return: 是否通过
+    """
+    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    cache_dir = tempfile.mkdtemp()
+    old_cache_dir = HttpCache.cache_config["cache_dir"]
+    HttpCache.set_http_cache(cache_dir=cache_dir)
+    try:
+        url = server.base_url + "/etag/cache"
+        missing_url = server.base_url + "/etag/missing"
+        all_pages = []
+        all_stats = []
+        for offline in (False, False, True):
+            engine = CrawlEngine(delay=0, offline=offline)
+            pages = {}
+            engine.add(url, collect_page, {"pages": pages})
+            if offline:
+                engine.add(missing_url, collect_page, {"pages": pages})
+            all_stats.append(engine.run())
+            all_pages.append(pages)
+        request_count = len(server.request_times.get("/etag/cache", []))
+        passed = all_stats[0]["cached"] == 0 and all_stats[1]["cached"] == 1 and server.not_modified == 1 and \
+            all_stats[2]["cached"] == 1 and all_stats[2]["failed"] == 1 and request_count == 2 and \
+            missing_url not in server.request_times and \
+            all_pages[0][url] == all_pages[1][url] == all_pages[2][url]
+        function_logger.info("%s\t统计%s\t请求次数%d\t304次数%d", "通过" if passed else "未通过", all_stats,
+                             request_count, server.not_modified)
+        return passed
+    finally:
+        HttpCache.set_http_cache(cache_dir=old_cache_dir)
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    main_logger = MyLog(logger=__name__).getlog()
+    main_logger.info("start...")
+    fixture_server = FixtureServer()
+    fixture_server.start()
+    try:
+        results = [test_retry_backoff(fixture_server), test_retry_exhausted(fixture_server),
+                   test_per_host_limit(fixture_server), test_handler_add_pages(fixture_server),
+                   test_http_cache(fixture_server)]
+    finally:
+        fixture_server.stop()
+    main_logger.info("通过%d/%d项", sum(results), len(results))
+    main_logger.info("end...")
+    sys.exit(0 if all(results) else 1)
@@ -6,11 +6,21 @@
 @Desc  : 数据预处理
 """
 from FileRead.FileNameRead import read_all_file_list
+from FileRead.FrequentQuestionRead import frequent_question_columns, frequent_question_csv_to_columnar
 from Log.Logger import MyLog
+import os
 import sys
 import csv
 import pickle
 
+# 处理常用问题集的一行（标题、来源、时间、问题、回答）
+def normalize_frequent_question_row(row: list) -> list:
+    return [row[0].replace(" ", ""),
+            row[1],
+            row[2],
+            row[3].replace("\u3000", "").replace("\n", "，").replace(" ", ""),
+            row[4].replace("\ue63c", "").replace("\u3000", "").replace("\n", "，").replace(" ", "").lstrip("，")]
+
 
 # 处理常用问题集(csv),问题和答案部分
 # noinspection PyProtectedMember,PyShadowingNames,PyDictCreation
@@ -32,14 +42,7 @@ def frequent_question_normalize(dir_path: str):
             fqa_lines = []
             for row in csv_reader:
                 if len(row) == 5:
-                    line = {}
-                    line["title"] = row[0].replace(" ", "")
-                    line["from"] = row[1]
-                    line["time"] = row[2]
-                    line["question"] = row[3].replace("\u3000", "").replace("\n", "，").replace(" ", "")
-                    line["answer"] = row[4].replace("\ue63c", "").replace("\u3000", "").replace("\n", "，")\
-                        .replace(" ", "").lstrip("，")
-                    fqa_lines.append(line)
+                    fqa_lines.append(dict(zip(frequent_question_columns, normalize_frequent_question_row(row))))
             fqa_lines.pop(0)
         function_logger.info("读取%s的常用问题集完成！" % school_name)
         function_logger.info("开始写入%s的常用问题集..." % school_name)
@@ -49,6 +52,30 @@ def frequent_question_normalize(dir_path: str):
     function_logger.info("数据处理完成！")
 
 
+# 处理常用问题集(csv)并写入列存文件
+# noinspection PyProtectedMember
+def frequent_question_normalize_columnar(dir_path: str) -> dict:
+    """
+    处理常用问题集(csv)并写入列存文件（预处理/columnar/学校名.col）：逐行读取、处理、写入，不在内存中保存整个问题集，
+    读取时使用FileRead.ColumnarRead.ColumnarReader按行迭代或随机访问
+    :param dir_path: 文件夹路径
+    :return: 学校名 -> 问题数
+    """
+    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    function_logger.info("开始进行数据处理...")
+    columnar_dir = dir_path + "/预处理/columnar"
+    os.makedirs(columnar_dir, exist_ok=True)
+    question_count = {}
+    for file in sorted(read_all_file_list(dir_path + "/source")):
+        school_name = os.path.basename(file.replace("\\", "/"))[:-9]
+        function_logger.info("开始处理%s的常问问题集..." % school_name)
+        question_count[school_name] = frequent_question_csv_to_columnar(
+            file, columnar_dir + "/" + school_name + ".col", normalize_frequent_question_row)
+        function_logger.info("%s的常用问题集处理完成，共%d条！" % (school_name, question_count[school_name]))
+    function_logger.info("数据处理完成！")
+    return question_count
+
+
 if __name__ == '__main__':
     main_logger = MyLog(logger=__name__).getlog()
     main_logger.info("start...")
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+@File  : ParallelFrequentQuestionTest.py
+@Author: SangYu
+@Date  : 2019/5/16 9:35
+@Desc  : 使用常用问题集对系统进行并行检测（多进程分片，结果按学校与问题顺序合并）
+"""
+import datetime
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from Benchmark.BenchmarkUtil import summarize_latency
+from Benchmark.MacroBenchmark import load_frequent_questions, answer_category
+from Log.Logger import MyLog, get_logger
+
+# 问答结果分类（与FrequentQuestionTest中的记录文件一致）
+category_list = ["mysql_string_null", "mysql_string_only_school", "answer_null", "answer_not_null"]
+
+
+# 工作进程初始化：预加载HanLP与问题模板
+def init_worker(memory_backend: bool):
+    """
+    工作进程初始化，每个进程只执行一次：启动HanLP（JVM）并预加载问题模板
+    :param memory_backend: 是否使用内存数据库代替MySQL
+    :return:
+    """
+    from HanLP.HanLPAPI import hanlp_nlp_tokenizer
+    from QuestionAnalysis.QuestionPretreatment import pre_load_question_templates
+    hanlp_nlp_tokenizer.get()
+    pre_load_question_templates()
+    if memory_backend:
+        from Benchmark.MemoryBackend import use_memory_backend
+        use_memory_backend()
+
+
+# 工作进程：回答一个问题
+def answer_one_question(task: tuple) -> tuple:
+    """
+    回答一个问题并分类
+    :param task: (学校名, 问题序号, 问题)
+    :return: (学校名, 问题序号, 问题, 分类, 耗时(s), 查询语句, 答案)
+    """
+    from QuestionAnswer.TemplateAnswerQuestion import answer_question_by_template
+    school_name, i_question, question = task
+    start_time = time.perf_counter()
+    try:
+        mid_result, answer = answer_question_by_template(question, 1, school_name)
+        category = answer_category(answer)
+        mysql_string = mid_result.get("mysql_string", "")
+    except Exception as e:
+        answer = ["%s: %s" % (type(e).__name__, e)]
+        category = "error"
+        mysql_string = ""
+    return school_name, i_question, question, category, time.perf_counter() - start_time, mysql_string, answer
+
+
+# 并行检测常用问题集
+def test_frequent_question_parallel(processes: int = None, limit_per_school: int = 0, memory_backend: bool = False,
+                                    record_dir: str = "record") -> dict:
+    """
+    并行检测常用问题集：问题按学校与序号编号后分发到进程池，结果按编号排序后写入记录文件
+    :param processes: 进程数，为None时使用CPU核数
+    :param limit_per_school: 每个学校最多测试的问题数，0表示不限制
+    :param memory_backend: 是否使用内存数据库代替MySQL
+    :param record_dir: 记录文件目录
+    :return: 学校名 -> {各分类计数、延迟分布}，"all"为全部学校的汇总
+    """
+    function_logger = get_logger("test_frequent_question_parallel")
+    tasks = []
+    school_index = {}
+    for school_name, question in load_frequent_questions(limit_per_school=limit_per_school):
+        i_question = school_index.get(school_name, 0)
+        school_index[school_name] = i_question + 1
+        tasks.append((school_name, i_question, question))
+    function_logger.info("共%d个学校、%d个问题，开始并行测试！", len(school_index), len(tasks))
+    start_time = time.time()
+    results = []
+    with Pool(processes, initializer=init_worker, initargs=(memory_backend,)) as pool:
+        chunk_size = max(1, len(tasks) // ((processes or os.cpu_count() or 1) * 8))
+        for i_result, result in enumerate(pool.imap_unordered(answer_one_question, tasks, chunk_size), 1):
+            results.append(result)
+            if i_result % 100 == 0:
+                function_logger.info("测试进度%d/%d", i_result, len(tasks))
+    function_logger.info("测试完成，耗时%.1fs", time.time() - start_time)
+    # 按学校、问题序号排序，保证记录文件内容与串行测试一致
+    results.sort(key=lambda item: (item[0], item[1]))
+    return write_test_record(results, record_dir)
+
+
+# 按学校写入记录文件并汇总
+def write_test_record(results: list, record_dir: str) -> dict:
+    """
+    按学校写入记录文件（格式与FrequentQuestionTest相同），并汇总各分类计数与延迟分布
+    :param results: 已排序的问答结果
+    :param record_dir: 记录文件目录
+    :return: 学校名 -> {各分类计数、延迟分布}
+    """
+    summary = {}
+    school_results = {}
+    for result in results:
+        school_results.setdefault(result[0], []).append(result)
+    all_latency = []
+    all_count = {category: 0 for category in category_list + ["error"]}
+    for school_name, school_result in school_results.items():
+        os.makedirs(os.path.join(record_dir, school_name), exist_ok=True)
+        record_files = {category: open(os.path.join(record_dir, school_name, category), "w", encoding="utf-8")
+                        for category in category_list}
+        count = {category: 0 for category in category_list + ["error"]}
+        try:
+            for school, i_question, question, category, cost_time, mysql_string, answer in school_result:
+                count[category] += 1
+                if category == "error":
+                    continue
+                record_file = record_files[category]
+                record_file.write(question + "\n")
+                record_file.write(mysql_string + "\n")
+                if category == "answer_not_null":
+                    # 多余三条的记录只记录前三条和总记录条数
+                    record_file.write("答案条数：" + str(len(answer)) + "\t")
+                    record_file.write(str(answer[:3]) + "\n")
+                else:
+                    record_file.write(str(answer) + "\n")
+            count_line = format_count_line(len(school_result), count)
+            for record_file in record_files.values():
+                record_file.write(count_line)
+        finally:
+            for record_file in record_files.values():
+                record_file.close()
+        latency_list = [result[4] for result in school_result]
+        all_latency.extend(latency_list)
+        for category in count:
+            all_count[category] += count[category]
+        summary[school_name] = {"count": count, "latency": summarize_latency(latency_list)}
+    summary["all"] = {"count": all_count, "latency": summarize_latency(all_latency)}
+    with open(os.path.join(record_dir, "all.txt"), "a", encoding="utf-8") as record_file:
+        now_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for school_name in school_results:
+            record_file.write(now_time + "\t" + school_name + "\n")
+            record_file.write(format_count_line(len(school_results[school_name]), summary[school_name]["count"]))
+    return summary
+
+
+# 统计行（与FrequentQuestionTest相同）
+def format_count_line(question_count: int, count: dict) -> str:
+    return "总问题数%d\t查询语句构造为空数%d\t只有学校关键词数%d\t查询结果为空数%d\t有回答数%d\n" % \
+           (question_count, count["mysql_string_null"], count["mysql_string_only_school"], count["answer_null"],
+            count["answer_not_null"])
+
+
+if __name__ == '__main__':
+    main_logger = MyLog(logger=__name__).getlog()
+    main_logger.info("start...")
+    # 模板路径等相对路径以SystemTest目录为基准
+    os.chdir(os.path.split(os.path.realpath(__file__))[0])
+    test_summary = test_frequent_question_parallel(int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    for test_school, school_summary in test_summary.items():
+        latency = school_summary["latency"]
+        if latency["count"]:
+            main_logger.info("%s\t%s\tp50=%.1fms\tp95=%.1fms\tp99=%.1fms", test_school, school_summary["count"],
+                             latency["p50_ms"], latency["p95_ms"], latency["p99_ms"])
+    main_logger.info("end...")
@@ -6,18 +6,23 @@
 @Desc  : 问答系统界面
 """
 import sys
+import os
 from PyQt5.QtWidgets import (QMainWindow, QApplication, QAction, qApp,
                              QLabel, QLineEdit, QWidget, QTextEdit, QComboBox, QHBoxLayout, QVBoxLayout,
                              QMessageBox, QDesktopWidget, QPushButton, QSplashScreen)
 from PyQt5.QtGui import QIcon, QPixmap, QFont
 from PyQt5.QtCore import Qt
 from InformationGet.MysqlOperation import mysql_query_sentence
-from pypinyin import lazy_pinyin
-from TemplateLoad.QuestionTemplate import load_template_by_file, build_template_by_infos
 from FileRead.FileNameRead import read_all_file_list
-from QuestionAnswer.TemplateAnswerQuestion import answer_question_by_template
+from LazyLoad.LazyImport import lazy_import
 import time
-from QuestionAnalysis.QuestionTypePredict import QTPredictKeyword, QTPredictTemplate, QTPredictModel
+from QuestionAnalysis.QuestionTypePredict import QuestionTypePipeline
+from Monitor.Metrics import start_metrics_server, start_snapshot_writer
+from Monitor.Profiler import profile_request
+
+# 只在部分界面中使用的模块，首次使用时再导入（问答模块在首次提问时导入，HanLP的JVM在首次分词时启动）
+pypinyin = lazy_import("pypinyin")
+question_template = lazy_import("TemplateLoad.QuestionTemplate")
 
 
 # 主界面
@@ -29,9 +34,7 @@ class QASystemMainWindow(QMainWindow):
         self.main_wid = None
         self.mysql_wid = None
         self.template_wid = None
-        self.question_type_predict_keyword = None
-        self.question_type_predict_template = None
-        self.question_type_predict_model = None
+        self.question_type_pipeline = None
         self.init_ui()
 
     # GUI创建
@@ -98,29 +101,17 @@ class QASystemMainWindow(QMainWindow):
         toolbar = self.addToolBar('Exit')
         toolbar.addAction(exit_act)
 
+    # 并行预加载数据，分类模型在界面显示后于后台加载（首次使用时若未加载完成则等待）
     def pre_load_data(self, sp):
-        self.question_type_predict_keyword = QTPredictKeyword()
-        self.question_type_predict_template = QTPredictTemplate()
-        self.question_type_predict_model = QTPredictModel()
-        # 加载数据
-        self.question_type_predict_keyword.pre_load_keyword()
-        sp.showMessage("加载关键词标签映射...20%", Qt.AlignCenter, Qt.black)
-        qApp.processEvents()
-        self.question_type_predict_template.pre_load_question_template()
-        sp.showMessage("加载问题模板标签映射...40%", Qt.AlignCenter, Qt.black)
-        qApp.processEvents()
-        self.question_type_predict_model.pre_load_jieba()
-        sp.showMessage("加载结巴字典树...50%", Qt.AlignCenter, Qt.black)
-        qApp.processEvents()
-        self.question_type_predict_model.pre_load_stop_words()
-        sp.showMessage("加载停用词典...60%", Qt.AlignCenter, Qt.black)
-        qApp.processEvents()
-        self.question_type_predict_model.pre_load_label_name_map()
-        sp.showMessage("加载标签名字映射...70%", Qt.AlignCenter, Qt.black)
-        qApp.processEvents()
-        self.question_type_predict_model.pre_load_fastText_model()
-        sp.showMessage("加载分类模型...100%", Qt.AlignCenter, Qt.black)
-        qApp.processEvents()
+        self.question_type_pipeline = QuestionTypePipeline()
+
+        def show_progress(name, percent):
+            sp.showMessage("%s...%d%%" % (name, percent), Qt.AlignCenter, Qt.black)
+            qApp.processEvents()
+
+        self.question_type_pipeline.pre_load_parallel(show_progress, lazy_model=True)
+        self.main_wid.question_type_pipeline = self.question_type_pipeline
+        self.question_type_pipeline.warm_up_model_async()
 
     # 跳转到数据库查询界面
     def turn_page_mysql(self):
@@ -150,8 +141,15 @@ class QAWidgets(QWidget):
         super().__init__()
         self.clear_btn = None
         self.qa_btn = None
+        self.more_btn = None
         self.question_edit = None
         self.answer_edit = None
+        # 问句类型预测级联，由主窗口加载数据后设置
+        self.question_type_pipeline = None
+        # 当前问题的分析结果与已显示的答案页号（答案分页查询，每页answer_page_size条）
+        self.answer_analysis = None
+        self.answer_page = 0
+        self.answer_page_size = 20
         self.init_ui()
 
     # GUI创建
@@ -168,6 +166,9 @@ class QAWidgets(QWidget):
         self.clear_btn.clicked.connect(self.clear_button)
         self.qa_btn = QPushButton('回答提问')
         self.qa_btn.clicked.connect(self.question_answer)
+        self.more_btn = QPushButton('更多答案')
+        self.more_btn.clicked.connect(self.more_answer)
+        self.more_btn.setEnabled(False)
 
         # 编辑文本框
         self.question_edit = QLineEdit(self)
@@ -186,6 +187,7 @@ class QAWidgets(QWidget):
         button_box = QHBoxLayout()
         button_box.addStretch(1)
         button_box.addWidget(self.clear_btn)
+        button_box.addWidget(self.more_btn)
         button_box.addWidget(self.qa_btn)
 
         vbox = QVBoxLayout()
@@ -198,13 +200,27 @@ class QAWidgets(QWidget):
     # 回答提出的问题
     def question_answer(self):
         self.answer_edit.clear()
+        self.answer_analysis = None
+        self.more_btn.setEnabled(False)
         sentence = self.question_edit.text()
         sentence_type = self.question_type_predict(sentence)
         if sentence_type not in question_can_answer:
-            self.answer_edit.append("抱歉，当前系统无法回答关于%s的问题，尝试问问其它问题！" % sentence_type)
+            # 模板方法无法回答时，检索常问问题集中相似的已回答问题
+            from QuestionAnswer.FrequentQuestionRetrieval import search_frequent_questions
+            faq_results = search_frequent_questions(sentence)
+            if not faq_results:
+                self.answer_edit.append("抱歉，当前系统无法回答关于%s的问题，尝试问问其它问题！" % sentence_type)
+                return
+            self.answer_edit.append("当前系统无法直接回答关于%s的问题，以下为常问问题集中的相似问题：" % sentence_type)
+            for school, school_results in faq_results.items():
+                self.answer_edit.append("【%s】" % school)
+                for result in school_results:
+                    self.answer_edit.append("问：" + result["question"])
+                    self.answer_edit.append("答：" + result["answer"])
         else:
-            # hanlp方法
-            mid_result, result_edit = answer_question_by_template(sentence)
+            from QuestionAnswer.TemplateAnswerQuestion import answer_page_by_question
+            # hanlp方法，分析问题并查询第一页答案
+            mid_result, answers, has_more = answer_page_by_question(sentence, page_size=self.answer_page_size)
             self.answer_edit.append("问句类型：" + sentence_type)
             self.answer_edit.append("分词列表：" + str(mid_result["segment_list"]))
             self.answer_edit.append("问题抽象结果：" + str(mid_result["ab_question"]))
@@ -214,32 +230,37 @@ class QAWidgets(QWidget):
             self.answer_edit.append("匹配答句模板：" + str(mid_result["match_template_answer"]))
             if "mysql_string" in mid_result:
                 self.answer_edit.append("查询语句：" + str(mid_result["mysql_string"]))
-            if "search_result" in mid_result:
-                self.answer_edit.append("查询结果：" + str(mid_result["search_result"]))
             self.answer_edit.append("回答如下：")
-            for item in result_edit:
-                self.answer_edit.append(item)
+            # 先显示第一页答案，其余答案点击“更多答案”后分页查询
+            self.answer_analysis = mid_result
+            self.answer_page = 0
+            self.show_answers(answers, has_more)
+
+    # 显示更多答案
+    def more_answer(self):
+        if self.answer_analysis is not None:
+            from QuestionAnswer.TemplateAnswerQuestion import answer_page_by_analysis
+            self.answer_page += 1
+            answers, has_more = answer_page_by_analysis(self.answer_analysis, self.answer_page,
+                                                        self.answer_page_size)
+            self.show_answers(answers, has_more)
+
+    # 显示一页答案
+    def show_answers(self, answers, has_more):
+        for item in answers:
+            self.answer_edit.append(item)
+        self.more_btn.setEnabled(has_more)
 
     # 判断问题类型,优先级：关键词>模板>模型
     def question_type_predict(self, sentence):
-        # 使用关键词判断
-        sentence_type = QAPage.question_type_predict_keyword.question_predict_by_keyword(sentence)
-        if sentence_type:
-            return sentence_type
-        else:
-            # 使用模板判断
-            sentence_type = QAPage.question_type_predict_template.question_predict_by_template(sentence)
-            if sentence_type:
-                return sentence_type
-            else:
-                # 使用模型判断
-                sentence_type = QAPage.question_type_predict_model.question_predict_by_fastText(sentence)
-                return sentence_type
+        return self.question_type_pipeline.predict(sentence)
 
     # 清空按钮状态
     def clear_button(self):
         self.question_edit.clear()
         self.answer_edit.clear()
+        self.answer_analysis = None
+        self.more_btn.setEnabled(False)
 
 
 # MySQL表查看类
@@ -366,20 +387,21 @@ class MySQLWidgets(QWidget):
 
     # mysql查询
     def mysql_query(self):
-        mysql_string = self.SQL_edit.text()
-        if mysql_string != "":
-            pass
-        else:
-            mysql_string = self.build_mysql_string()
-            self.SQL_edit.setText(mysql_string)
-        myresult = mysql_query_sentence(mysql_string)
-        if len(myresult) == 0:
-            self.result_edit.setText("查询结果为空！")
-            return
-        self.result_edit.clear()
-        for item in myresult:
-            self.result_edit.append(str(item))
-        return myresult
+        with profile_request("MySQLWidgets.mysql_query"):
+            mysql_string = self.SQL_edit.text()
+            if mysql_string != "":
+                pass
+            else:
+                mysql_string = self.build_mysql_string()
+                self.SQL_edit.setText(mysql_string)
+            myresult = mysql_query_sentence(mysql_string)
+            if len(myresult) == 0:
+                self.result_edit.setText("查询结果为空！")
+                return
+            self.result_edit.clear()
+            for item in myresult:
+                self.result_edit.append(str(item))
+            return myresult
 
     # 构造SQL语句
     def build_mysql_string(self):
@@ -390,110 +412,117 @@ class MySQLWidgets(QWidget):
 
     # table_combo发生改变
     def table_combo_activated(self, text):
-        table_names = ["计划招生", "专业分数", "地区分数"]
-        mysql_table_name = ["admission_plan", "admission_score_major", "admission_score_pro"]
-        self.query_table_name = mysql_table_name[table_names.index(text)]
-        # 查询当前选择下（表名）学校数据项
-        mysql_string = "select school from " + self.query_table_name + " group by school;"
-        myresult = mysql_query_sentence(mysql_string)
-        temp = []
-        for item in myresult:
-            temp.append(item["school"])
-        school_names = temp
-        # 重新设置school_combo
-        self.school_combo.clear()
-        school_names = sorted(school_names, key=lambda x: lazy_pinyin(x.lower())[0][0])
-        self.school_combo.addItems(school_names)
-        self.set_SQLedit_content()
+        with profile_request("MySQLWidgets.table_combo_activated"):
+            table_names = ["计划招生", "专业分数", "地区分数"]
+            mysql_table_name = ["admission_plan", "admission_score_major", "admission_score_pro"]
+            self.query_table_name = mysql_table_name[table_names.index(text)]
+            # 查询当前选择下（表名）学校数据项
+            mysql_string = "select school from " + self.query_table_name + " group by school;"
+            myresult = mysql_query_sentence(mysql_string)
+            temp = []
+            for item in myresult:
+                temp.append(item["school"])
+            school_names = temp
+            # 重新设置school_combo
+            self.school_combo.clear()
+            school_names = sorted(school_names, key=lambda x: pypinyin.lazy_pinyin(x.lower())[0][0])
+            self.school_combo.addItems(school_names)
+            self.set_SQLedit_content()
 
     # school_combo发生改变
     def school_combo_activated(self, text):
-        self.query_school_name = text
-        # 查询当前选择下（表名、学校）地区数据项
-        mysql_string = "select district from " + self.query_table_name + " where school='" + self.query_school_name \
-                       + "' group by district;"
-        myresult = mysql_query_sentence(mysql_string)
-        temp = []
-        for item in myresult:
-            temp.append(item["district"])
-        district_names = temp
-        # 重新设置major_combo
-        self.district_combo.clear()
-        district_names = sorted(district_names, key=lambda x: lazy_pinyin(x.lower())[0][0])
-        self.district_combo.addItems(district_names)
-        self.set_SQLedit_content()
+        with profile_request("MySQLWidgets.school_combo_activated"):
+            self.query_school_name = text
+            # 查询当前选择下（表名、学校）地区数据项
+            mysql_string = "select district from " + self.query_table_name + " where school='" \
+                           + self.query_school_name \
+                           + "' group by district;"
+            myresult = mysql_query_sentence(mysql_string)
+            temp = []
+            for item in myresult:
+                temp.append(item["district"])
+            district_names = temp
+            # 重新设置major_combo
+            self.district_combo.clear()
+            district_names = sorted(district_names, key=lambda x: pypinyin.lazy_pinyin(x.lower())[0][0])
+            self.district_combo.addItems(district_names)
+            self.set_SQLedit_content()
 
     # district_combo发生改变
     def district_combo_activated(self, text):
-        self.query_district_name = text
-        # 查询当前选择下（表名、学校、地区）年份数据项
-        mysql_string = "select year from " + self.query_table_name + " where school='" + self.query_school_name \
-                       + "' and district='" + self.query_district_name + "' group by year;"
-        myresult = mysql_query_sentence(mysql_string)
-        temp = []
-        for item in myresult:
-            temp.append(str(item["year"]))
-        year_names = temp
-        # 重新设置year_combo
-        self.year_combo.clear()
-        year_names.sort()
-        self.year_combo.addItems(year_names)
-        self.set_SQLedit_content()
+        with profile_request("MySQLWidgets.district_combo_activated"):
+            self.query_district_name = text
+            # 查询当前选择下（表名、学校、地区）年份数据项
+            mysql_string = "select year from " + self.query_table_name + " where school='" + self.query_school_name \
+                           + "' and district='" + self.query_district_name + "' group by year;"
+            myresult = mysql_query_sentence(mysql_string)
+            temp = []
+            for item in myresult:
+                temp.append(str(item["year"]))
+            year_names = temp
+            # 重新设置year_combo
+            self.year_combo.clear()
+            year_names.sort()
+            self.year_combo.addItems(year_names)
+            self.set_SQLedit_content()
 
     # year_combo发生改变
     def year_combo_activated(self, text):
-        self.query_year_name = text
-        self.set_SQLedit_content()
+        with profile_request("MySQLWidgets.year_combo_activated"):
+            self.query_year_name = text
+            self.set_SQLedit_content()
 
-        # 查询并设置major专业
-        if self.query_table_name == "admission_score_pro":
-            self.major_combo.clear()
-            self.major_combo.addItem("无此项数据")
-        else:
-            mysql_string = "select major from " + self.query_table_name + " where school='" + self.query_school_name \
-                           + "' and district='" + self.query_district_name + "' and year='" + self.query_year_name \
-                           + "' group by major;"
-            myresult = mysql_query_sentence(mysql_string)
-            temp = []
-            for item in myresult:
-                temp.append(item["major"])
-            major_names = temp
-            # 重新设置major_combo
-            self.major_combo.clear()
-            major_names = sorted(major_names, key=lambda x: lazy_pinyin(x.lower())[0][0])
-            self.major_combo.addItems(major_names)
+            # 查询并设置major专业
+            if self.query_table_name == "admission_score_pro":
+                self.major_combo.clear()
+                self.major_combo.addItem("无此项数据")
+            else:
+                mysql_string = "select major from " + self.query_table_name + " where school='" \
+                               + self.query_school_name \
+                               + "' and district='" + self.query_district_name + "' and year='" + self.query_year_name \
+                               + "' group by major;"
+                myresult = mysql_query_sentence(mysql_string)
+                temp = []
+                for item in myresult:
+                    temp.append(item["major"])
+                major_names = temp
+                # 重新设置major_combo
+                self.major_combo.clear()
+                major_names = sorted(major_names, key=lambda x: pypinyin.lazy_pinyin(x.lower())[0][0])
+                self.major_combo.addItems(major_names)
+
+            # 查询并设置batch批次
+            if self.query_table_name == "admission_score_pro":
+                mysql_string = "select batch from " + self.query_table_name + " where school='" \
+                               + self.query_school_name \
+                               + "' and district='" + self.query_district_name + "' and year='" + self.query_year_name \
+                               + "' group by batch;"
+                myresult = mysql_query_sentence(mysql_string)
+                temp = []
+                for item in myresult:
+                    temp.append(item["batch"])
+                batch_names = temp
+                # 重新设置classy_combo
+                self.batch_combo.clear()
+                batch_names = sorted(batch_names, key=lambda x: pypinyin.lazy_pinyin(x.lower())[0][0])
+                self.batch_combo.addItems(batch_names)
+            else:
+                self.batch_combo.clear()
+                self.batch_combo.addItem("无此项数据")
 
-        # 查询并设置batch批次
-        if self.query_table_name == "admission_score_pro":
-            mysql_string = "select batch from " + self.query_table_name + " where school='" + self.query_school_name \
+            # 查询并设置classy科别
+            mysql_string = "select classy from " + self.query_table_name + " where school='" + self.query_school_name \
                            + "' and district='" + self.query_district_name + "' and year='" + self.query_year_name \
-                           + "' group by batch;"
+                           + "' group by classy;"
             myresult = mysql_query_sentence(mysql_string)
             temp = []
             for item in myresult:
-                temp.append(item["batch"])
-            batch_names = temp
+                temp.append(item["classy"])
+            classy_names = temp
             # 重新设置classy_combo
-            self.batch_combo.clear()
-            batch_names = sorted(batch_names, key=lambda x: lazy_pinyin(x.lower())[0][0])
-            self.batch_combo.addItems(batch_names)
-        else:
-            self.batch_combo.clear()
-            self.batch_combo.addItem("无此项数据")
-
-        # 查询并设置classy科别
-        mysql_string = "select classy from " + self.query_table_name + " where school='" + self.query_school_name \
-                       + "' and district='" + self.query_district_name + "' and year='" + self.query_year_name \
-                       + "' group by classy;"
-        myresult = mysql_query_sentence(mysql_string)
-        temp = []
-        for item in myresult:
-            temp.append(item["classy"])
-        classy_names = temp
-        # 重新设置classy_combo
-        self.classy_combo.clear()
-        classy_names = sorted(classy_names, key=lambda x: lazy_pinyin(x.lower())[0][0])
-        self.classy_combo.addItems(classy_names)
+            self.classy_combo.clear()
+            classy_names = sorted(classy_names, key=lambda x: pypinyin.lazy_pinyin(x.lower())[0][0])
+            self.classy_combo.addItems(classy_names)
 
     # major_combo发生改变
     def major_combo_activated(self, text):
@@ -586,7 +615,7 @@ class TemplateCheckWidgets(QWidget):
     # 当点击某个模板时
     def template_combo_activated(self, text):
         template_path = "../TemplateLoad/Template"
-        fq_condition, fq_target, ts_answers, ts_questions = load_template_by_file(template_path + "/" + text)
+        fq_condition, fq_target, ts_answers, ts_questions = question_template.load_template_by_file(template_path + "/" + text)
         self.template_fields_edit.clear()
         self.template_fields_edit.append("问句条件词：")
         self.template_fields_edit.append(str(fq_condition))
@@ -781,12 +810,15 @@ class TemplateBuildWidgets(QWidget):
             ts_answer = [template_sentence_list[i_answer]
                          for i_answer in range(1, len(template_sentence_list), 2)]
             template_root_path = "../TemplateLoad/Template"
-            build_template_by_infos(template_root_path + "/" + name, fq_condition_list, fq_target_list, ts_question,
-                                    ts_answer)
+            question_template.build_template_by_infos(template_root_path + "/" + name, fq_condition_list,
+                                                      fq_target_list, ts_question, ts_answer)
+            # 问答使用的模板缓存已加载时清空，下次提问时读取重新构建的模板
+            if "QuestionAnalysis.QuestionPretreatment" in sys.modules:
+                sys.modules["QuestionAnalysis.QuestionPretreatment"].clear_template_cache()
             self.template_build_result_edit.clear()
             self.template_build_result_edit.append("构造的模板句式如下：")
             fq_condition, fq_target, ts_answers, ts_questions \
-                = load_template_by_file(template_root_path + "/" + name)
+                = question_template.load_template_by_file(template_root_path + "/" + name)
             self.template_build_result_edit.append("模板答案句如下：")
             for i_answer in range(len(ts_answers)):
                 self.template_build_result_edit.append(str(i_answer) + "--" + ts_answers[i_answer])
@@ -798,6 +830,10 @@ class TemplateBuildWidgets(QWidget):
 if __name__ == "__main__":
     # 当前能够回答的问题
     question_can_answer = ["录取分数", "招生计划"]
+    # 运行指标：设置环境变量QA_METRICS_PORT时启动本地指标接口，并定时写入指标快照
+    if os.environ.get("QA_METRICS_PORT"):
+        start_metrics_server(int(os.environ["QA_METRICS_PORT"]))
+        start_snapshot_writer("../Logs/metrics.json", 60)
 
     app = QApplication(sys.argv)
     # 预加载数据界面
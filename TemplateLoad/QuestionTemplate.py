@@ -5,11 +5,15 @@
 @Date  : 2019/3/16 10:27
 @Desc  : 问题模板
 """
-from Log.Logger import MyLog
-import sys
-from openpyxl import load_workbook
+from Log.Logger import MyLog, get_logger
 import re
 import pickle
+from functools import lru_cache
+
+# 模板槽位，如(school)、(year)
+slot_pattern = re.compile(r"[(].*?[)]")
+# 不能作为str.format字段名的字符
+format_unsafe_pattern = re.compile(r"[.\[\]{}:!]|^\d*$")
 
 
 # 求列表元素的子集(二进制法)
@@ -32,23 +36,23 @@ def get_subset_binary(item: list) -> list:
 
 
 # 通过excel表格加载表格内容
-# noinspection PyProtectedMember
 def load_table_content(file_path: str):
     """
     通过excel表格加载表格内容
     :param file_path:
     :return:
     """
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    from openpyxl import load_workbook
+    function_logger = get_logger("load_table_content")
     # 加载excel表格
-    function_logger.info("加载表格:%s" % file_path.split("\\")[-1])
+    function_logger.info("加载表格:%s", file_path.split("\\")[-1])
     wb = load_workbook(file_path)
     sheet_names = wb.sheetnames
     sheet_first = wb.get_sheet_by_name(sheet_names[0])
     table_head = []
     for item in range(1, sheet_first.max_column + 1):
         table_head.append(sheet_first.cell(row=1, column=item).value)
-    function_logger.debug("表头:%s" % str(table_head))
+    function_logger.debug("表头:%s", table_head)
     table_attr = {}
     for i_column in range(1, sheet_first.max_column + 1):
         column_name = sheet_first.cell(row=1, column=i_column).value
@@ -60,9 +64,9 @@ def load_table_content(file_path: str):
         function_logger.debug(key)
         value_list = [value.replace("'", "").strip() for value in table_attr[key][1:-1].split(",")]
         value_list.sort()
-        function_logger.debug("列表长度:%d" % len(value_list))
-        function_logger.debug(str(value_list))
-    function_logger.info("加载表格:%s完成!" % file_path.split("\\")[-1])
+        function_logger.debug("列表长度:%d", len(value_list))
+        function_logger.debug("%s", value_list)
+    function_logger.info("加载表格:%s完成!", file_path.split("\\")[-1])
 
 
 # 通过规定字段构造模板
@@ -136,7 +140,7 @@ def build_template_by_fields_score_major(template_path: str):
 
 
 # 通过提供的信息构造问题模板
-# noinspection PyProtectedMember,PyShadowingNames
+# noinspection PyShadowingNames
 def build_template_by_infos(template_path: str, fields_question_condition: list, fields_question_target: list,
                             template_sentence_questions: list, template_sentence_answers: list):
     """
@@ -148,8 +152,8 @@ def build_template_by_infos(template_path: str, fields_question_condition: list,
     :param template_sentence_answers: 模板答案句
     :return:
     """
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
-    function_logger.info("开始构造%s的问题模板..." % template_path.split("\\")[-1])
+    function_logger = get_logger("build_template_by_infos")
+    function_logger.info("开始构造%s的问题模板...", template_path.split("\\")[-1])
     # 使用pickle存储模板文件
     template_dict = {}
     template_dict["fq_conditon"] = fields_question_condition
@@ -192,11 +196,43 @@ def build_template_by_infos(template_path: str, fields_question_condition: list,
     template_dict["ts_questions"] = build_question_sentences
     with open(template_path, "wb")as p_file:
         pickle.dump(template_dict, p_file)
-    function_logger.info("%s的问题模板构建完成!" % template_path.split("\\")[-1])
+    function_logger.info("%s的问题模板构建完成!", template_path.split("\\")[-1])
+
+
+# 提取模板中的槽位（按模板缓存）
+@lru_cache(maxsize=4096)
+def parse_template_slots(template: str) -> tuple:
+    """
+    提取模板中的槽位，同一模板只解析一次
+    :param template: 模板句
+    :return: 槽位名元组（去掉括号，按出现顺序，可重复）
+    """
+    return tuple(slot[1:-1] for slot in slot_pattern.findall(template))
+
+
+# 将答句模板编译为格式化串（按模板缓存）
+@lru_cache(maxsize=4096)
+def compile_answer_template(template_answer: str) -> tuple:
+    """
+    将答句模板编译为str.format_map格式化串，每行查询结果只需一次格式化
+    槽位名含有格式化串不支持的字符时无法编译，回退为逐槽位替换
+    :param template_answer: 模板答句
+    :return: (格式化串, 槽位名元组)，无法编译时格式化串为None
+    """
+    slots = parse_template_slots(template_answer)
+    if any(format_unsafe_pattern.search(slot) for slot in slots):
+        return None, slots
+    parts = []
+    last_end = 0
+    for match in slot_pattern.finditer(template_answer):
+        parts.append(template_answer[last_end:match.start()].replace("{", "{{").replace("}", "}}"))
+        parts.append("{" + match.group()[1:-1] + "}")
+        last_end = match.end()
+    parts.append(template_answer[last_end:].replace("{", "{{").replace("}", "}}"))
+    return "".join(parts), slots
 
 
 # 通过模板类型（槽位）构造MySQL语句
-# noinspection PyProtectedMember
 def build_mysql_string_by_template(template_question: str, template_question_type: str) -> str:
     """
     通过模板类型（槽位）构造MySQL语句
@@ -204,21 +240,16 @@ def build_mysql_string_by_template(template_question: str, template_question_typ
     :param template_question_type: 模板问句类型
     :return: 对应的mysql语句
     """
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    function_logger = get_logger("build_mysql_string_by_template")
     function_logger.info("开始构造MySQL语句...")
     search_table = template_question_type
     # 提取模板句中的槽
-    pattern = re.compile(r"[(].*?[)]")
-    slots = re.findall(pattern, template_question)
-    # print(slots)
+    slots = parse_template_slots(template_question)
     # 构造SQL语句
-    mysql_string = "select * from " + search_table + " where "
-
-    for i_slot in range(len(slots)):
-        if i_slot == len(slots) - 1:
-            mysql_string += "[" + slots[i_slot][1:-1] + "='" + slots[i_slot] + "'" + "]"
-        else:
-            mysql_string += "[" + slots[i_slot][1:-1] + "='" + slots[i_slot] + "' and " + "]"
+    conditions = ["[" + slot + "='(" + slot + ")'" for slot in slots]
+    mysql_string = "select * from " + search_table + " where " + " and ]".join(conditions)
+    if conditions:
+        mysql_string += "]"
     mysql_string += ";"
     function_logger.info("MySQL语句构造完成！")
     return mysql_string
@@ -232,18 +263,31 @@ def build_mysql_answer_string_by_template(template_answer: str, query_result_ite
     :param query_result_item: 本次查询结果（带属性键值对）
     :return:
     """
-    # 提取槽位
-    pattern = re.compile(r"[(].*?[)]")
-    slots = re.findall(pattern, template_answer)
+    answer_format, slots = compile_answer_template(template_answer)
+    if answer_format is not None:
+        return answer_format.format_map(query_result_item)
     answer_string = template_answer
     for slot in slots:
-        answer_key = query_result_item[slot[1:-1]]
-        answer_string = answer_string.replace(slot, str(answer_key))
+        answer_string = answer_string.replace("(" + slot + ")", str(query_result_item[slot]))
     return answer_string
 
 
+# 通过模板类型构造多条答句
+def build_mysql_answer_strings_by_template(template_answer: str, query_result: list) -> list:
+    """
+    通过模板类型（槽位）对每条查询结果构造mysql答句，模板只查找一次
+    :param template_answer: 模板答句
+    :param query_result: 查询结果列表
+    :return: 答句列表
+    """
+    answer_format, slots = compile_answer_template(template_answer)
+    if answer_format is not None:
+        format_map = answer_format.format_map
+        return [format_map(item) for item in query_result]
+    return [build_mysql_answer_string_by_template(template_answer, item) for item in query_result]
+
+
 # 通过模板类型及关键词键值映射返回mysql语句
-# noinspection PyProtectedMember
 def build_mysql_string_by_template_and_keymap(template_question: str, template_question_type: str,
                                               keyword_dict: dict) -> str:
     """
@@ -253,25 +297,20 @@ def build_mysql_string_by_template_and_keymap(template_question: str, template_q
     :param keyword_dict: 关键词映射
     :return: SQL语句
     """
-    function_logger = MyLog(logger=sys._getframe().f_code.co_name).getlog()
+    function_logger = get_logger("build_mysql_string_by_template_and_keymap")
     function_logger.info("开始构造MySQL语句...")
     search_table = template_question_type
     # 提取模板句中的槽
-    pattern = re.compile(r"[(].*?[)]")
-    slots = re.findall(pattern, template_question)
-    # print(slots)
+    slots = parse_template_slots(template_question)
     # 构造SQL语句
+    conditions = []
+    for slot in slots:
+        key = keyword_dict["search_" + slot]
+        if key != "":
+            conditions.append(slot + "='" + key + "'")
     mysql_string = ""
-    for i_slot in range(len(slots)):
-        # function_logger.debug("slot:"+slots[i_slot][1:-1])
-        key = keyword_dict["search_" + slots[i_slot][1:-1]]
-        # function_logger.debug("key"+key)
-        if key == "":
-            continue
-        else:
-            mysql_string += slots[i_slot][1:-1] + "='" + key + "' and "
-    if mysql_string != "":
-        mysql_string = "select * from " + search_table + " where " + mysql_string[:-5] + ";"
+    if conditions:
+        mysql_string = "select * from " + search_table + " where " + " and ".join(conditions) + ";"
     function_logger.info("MySQL语句构造完成！")
     return mysql_string
 